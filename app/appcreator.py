@@ -1,65 +1,129 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-from .routers import (
-    auth_router,
-    user_router,
-    review_router,
-    book_router
-)  
-from app.db.firebase_config import init_firebase
-from app.services.cache_config import init_cache
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # --- AL ARRANCAR (Startup) ---
-    print("INFO:     Iniciando servicios externos...")
-    
-    # 1. Inicializar Firebase
-    try:
-        init_firebase()
-        print("INFO:     Conexión con Firebase establecida.")
-    except Exception as e:
-        print(f"ERROR:    No se pudo conectar a Firebase: {e}")
-        
-    # 2. Inicializar el Cache de Redis
-    try:
-        await init_cache()
-        print("INFO:    Inicializando el Cache")
-    except Exception as e:
-        print(f"ERROR:    No se pudo iniciar el Cache: {e}")
-
-    print("INFO:     Aplicación lista para recibir peticiones.")
-    
-    yield 
-
-app = FastAPI(
-    title="API-BooksClankers",
-    description="API de Clankers.",
-    version="1.0",
-    lifespan=lifespan  
-)
-
-origins = [
-    "http://localhost:3000",         # Frontend local
-    "http://localhost:8000/docs"     # Swagger Test
-    "https://mis-libros.vercel.app", # Frontend en producción
-    "https://clankers-reading.com"   # Dominio Real
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(auth_router, prefix="/clankers/auth", tags=["Auth"])
-app.include_router(user_router, prefix="/clankers/users", tags=["Users"])
-app.include_router(review_router, prefix="/clankers/reviews", tags=["Reseñas"])
-app.include_router(book_router, prefix="/clankers/books", tags=["Libros"])
-
-@app.get("/", tags=["Root"])
-async def read_root():
-    return {"status": "¡Servidor en línea!", "docs_url": "/docs"}
\ No newline at end of file
+from fastapi import FastAPI, Depends, Request, HTTPException
+from fastapi.responses import PlainTextResponse
+import secrets
+from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from .routers import (
+    auth_router,
+    user_router,
+    review_router,
+    book_router
+)  
+from app.db import init_firebase, init_firestore, close_firestore, DataLoaderMiddleware, loader_stats
+from app.services.cache_config import init_cache, close_cache, cache_stats
+from app.core import settings, MetricsMiddleware, ServerTimingMiddleware, render_metrics
+from app.core.security import get_current_admin
+from app.services.http_client import init_http_client, close_http_client
+from app.services.book_stats import flush_materializations
+from app.services.catalog_indexes import start_catalog_indexes, stop_catalog_indexes, index_stats
+from app.services.catalog_mirror import start_catalog_mirror, stop_catalog_mirror, mirror_stats
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- AL ARRANCAR (Startup) ---
+    print("INFO:     Iniciando servicios externos...")
+    
+    # 1. Inicializar Firebase
+    try:
+        init_firebase()
+        init_firestore()
+        print(f"INFO:     Conexión con Firebase establecida ({settings.FIRESTORE_CHANNELS} canales de Firestore).")
+    except Exception as e:
+        print(f"ERROR:    No se pudo conectar a Firebase: {e}")
+        
+    # 2. Inicializar el Cache de Redis
+    try:
+        await init_cache()
+        print(f"INFO:     Cache inicializado (backend: {settings.CACHE_BACKEND}).")
+    except Exception as e:
+        print(f"ERROR:    No se pudo iniciar el Cache: {e}")
+
+    # 3. Cliente HTTP compartido (login / refresh contra Firebase Auth)
+    await init_http_client()
+    print("INFO:     Cliente HTTP listo.")
+
+    # 4. Índices del catálogo en memoria (libros similares, búsqueda, autocompletado):
+    #    se cargan en segundo plano y se reintentan si Firestore falla
+    start_catalog_indexes()
+
+    # 5. Espejo del catálogo (opcional); si falla, las rutas consultan Firestore
+    if settings.CATALOG_MIRROR_ENABLED:
+        try:
+            total = await start_catalog_mirror()
+            print(f"INFO:     Espejo del catálogo activo ({total} libros).")
+        except Exception as e:
+            # Mientras tanto las rutas consultan Firestore; la supervisión reintenta la suscripción
+            print(f"ERROR:    No se pudo iniciar el espejo del catálogo, se reintentará: {e}")
+
+    print("INFO:     Aplicación lista para recibir peticiones.")
+    
+    yield 
+
+    # --- AL APAGAR (Shutdown) ---
+    # Las estadísticas pendientes del debounce se escriben antes de cerrar Firestore
+    await flush_materializations()
+    stop_catalog_mirror()
+    await stop_catalog_indexes()
+    await close_http_client()
+    await close_cache()
+    await close_firestore()
+
+app = FastAPI(
+    title="API-BooksClankers",
+    description="API de Clankers.",
+    version="1.0",
+    lifespan=lifespan  
+)
+
+origins = [
+    "http://localhost:3000",         # Frontend local
+    "http://localhost:8000/docs"     # Swagger Test
+    "https://mis-libros.vercel.app", # Frontend en producción
+    "https://clankers-reading.com"   # Dominio Real
+]
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.add_middleware(DataLoaderMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+# El último en añadirse es el más externo: mide también los demás middlewares
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(auth_router, prefix="/clankers/auth", tags=["Auth"])
+app.include_router(user_router, prefix="/clankers/users", tags=["Users"])
+app.include_router(review_router, prefix="/clankers/reviews", tags=["Reseñas"])
+app.include_router(book_router, prefix="/clankers/books", tags=["Libros"])
+
+@app.get("/", tags=["Root"])
+async def read_root():
+    return {"status": "¡Servidor en línea!", "docs_url": "/docs"}
+
+@app.get("/stats", tags=["Root"], dependencies=[Depends(get_current_admin)])
+async def read_stats():
+    """
+    Métricas internas (solo administradores).
+    """
+    return {
+        "cache": cache_stats(),
+        "indexes": index_stats(),
+        "mirror": mirror_stats(),
+        "dataloader": loader_stats()
+    }
+
+@app.get("/metrics", tags=["Root"], include_in_schema=False)
+async def read_metrics(request: Request):
+    """
+    Métricas en formato de texto de Prometheus.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not secrets.compare_digest(request.headers.get("Authorization", ""), expected):
+            raise HTTPException(status_code=401, detail="Token de métricas inválido")
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,2 +1,11 @@
-from .config import settings
-from .security import get_current_user
\ No newline at end of file
+from .config import settings
+from .security import (
+    get_current_user,
+    get_token_user,
+    get_current_admin,
+    invalidate_user_cache,
+    forget_user_tokens,
+    sync_user_claims
+)
+from .metrics import MetricsMiddleware, render_metrics
+from .timing import ServerTimingMiddleware, current_timing, timed
\ No newline at end of file
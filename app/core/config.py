@@ -1,25 +1,100 @@
-from pydantic_settings import BaseSettings
-
-class Settings(BaseSettings):
-    FIREBASE_TYPE: str
-    FIREBASE_PROJECT_ID: str
-    FIREBASE_PRIVATE_KEY_ID: str
-    FIREBASE_PRIVATE_KEY: str
-    FIREBASE_CLIENT_EMAIL: str
-    FIREBASE_CLIENT_ID: str
-    FIREBASE_AUTH_URI: str
-    FIREBASE_TOKEN_URI: str
-    FIREBASE_AUTH_PROVIDER_X509_CERT_URL: str
-    FIREBASE_CLIENT_X509_CERT_URL: str
-    FIREBASE_UNIVERSE_DOMAIN: str
-    FIREBASE_API_KEY: str
-    FIREBASE_AUTH_DOMAIN: str
-    FIREBASE_STORAGE_BUCKET: str
-    FIREBASE_MESSAGING_SENDER_ID: str
-    FIREBASE_APP_ID: str
-
-    class Config:
-        
-        env_file = ".env"
-
+from pydantic_settings import BaseSettings
+from typing import Literal
+
+class Settings(BaseSettings):
+    FIREBASE_TYPE: str
+    FIREBASE_PROJECT_ID: str
+    FIREBASE_PRIVATE_KEY_ID: str
+    FIREBASE_PRIVATE_KEY: str
+    FIREBASE_CLIENT_EMAIL: str
+    FIREBASE_CLIENT_ID: str
+    FIREBASE_AUTH_URI: str
+    FIREBASE_TOKEN_URI: str
+    FIREBASE_AUTH_PROVIDER_X509_CERT_URL: str
+    FIREBASE_CLIENT_X509_CERT_URL: str
+    FIREBASE_UNIVERSE_DOMAIN: str
+    FIREBASE_API_KEY: str
+    FIREBASE_AUTH_DOMAIN: str
+    FIREBASE_STORAGE_BUCKET: str
+    FIREBASE_MESSAGING_SENDER_ID: str
+    FIREBASE_APP_ID: str
+
+    # Cache de autenticación (segundos / número de entradas)
+    AUTH_TOKEN_CACHE_TTL: int = 300
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 60
+    USER_CACHE_SIZE: int = 10000
+    # Cada cuánto se vuelve a preguntar a Firebase Auth si un token de admin fue revocado
+    AUTH_REVOCATION_CHECK_TTL: int = 30
+
+    # Endpoints REST de Firebase Auth (se pueden apuntar al emulador o a un stub)
+    FIREBASE_IDENTITY_TOOLKIT_URL: str = "https://identitytoolkit.googleapis.com/v1"
+    FIREBASE_SECURE_TOKEN_URL: str = "https://securetoken.googleapis.com/v1"
+
+    # Pool de clientes de Firestore (un canal gRPC por cliente)
+    FIRESTORE_CHANNELS: int = 2
+    FIRESTORE_KEEPALIVE_MS: int = 30000
+    FIRESTORE_KEEPALIVE_TIMEOUT_MS: int = 10000
+    # Deadline máximo por operación (segundos): lecturas/escrituras sueltas y consultas en streaming
+    FIRESTORE_TIMEOUT: float = 10.0
+    FIRESTORE_STREAM_TIMEOUT: float = 300.0
+
+    # Cliente HTTP compartido
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_RETRIES: int = 2
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+
+    # Cache de respuestas: "memory" (por proceso) o "redis" (compartido entre workers)
+    CACHE_BACKEND: Literal["memory", "redis"] = "memory"
+    CACHE_CODER: Literal["json", "pickle"] = "json"
+    REDIS_URL: str = "redis://localhost:6379"
+    REDIS_MAX_CONNECTIONS: int = 50
+    # Vida de los índices de tags en Redis; debe superar el TTL más largo de las rutas
+    CACHE_TAG_TTL: int = 86400
+    # Segundos extra durante los que una entrada caducada se sirve mientras se refresca
+    CACHE_STALE_TTL: int = 300
+
+    # Contadores de rating repartidos en shards por libro
+    RATING_SHARDS: int = 10
+    RATING_MATERIALIZE_DELAY: float = 2.0
+    # Reseñas más recientes guardadas dentro de books/{id}.reviews
+    REVIEW_SNIPPET_SIZE: int = 5
+
+    # Importación masiva (un batch de Firestore admite hasta 500 escrituras)
+    IMPORT_BATCH_SIZE: int = 400
+    IMPORT_CONCURRENCY: int = 4
+
+    # Exportación NDJSON: documentos leídos por página
+    EXPORT_PAGE_SIZE: int = 500
+
+    # Recomendaciones
+    RECOMMENDATION_NEIGHBORS: int = 50
+    RECOMMENDATION_GENRE_WEIGHT: float = 0.3
+    RECOMMENDATION_CACHE_TTL: int = 3600
+
+    # Espejo del catálogo en memoria alimentado por un listener on_snapshot.
+    # Obligatorio con más de un worker o réplica: sin él, los índices de
+    # /search, /suggest y /similar de cada proceso solo ven sus propias
+    # escrituras hasta que se reinicia
+    CATALOG_MIRROR_ENABLED: bool = False
+    CATALOG_MIRROR_LOAD_TIMEOUT: float = 60.0
+    # Cada cuánto se comprueba el listener y se reintenta la suscripción si falló
+    CATALOG_MIRROR_CHECK_INTERVAL: float = 5.0
+
+    # Token Bearer que debe enviar el scraper de /metrics; vacío = sin protección
+    METRICS_TOKEN: str = ""
+
+    # Cabecera Server-Timing en todas las respuestas (si no, solo cuando un admin envía X-Server-Timing)
+    SERVER_TIMING_ENABLED: bool = False
+    # Línea JSON con el desglose de cada petición, o solo de las que superan SLOW_REQUEST_MS
+    REQUEST_LOG_ENABLED: bool = False
+    SLOW_REQUEST_MS: float = 1000.0
+
+    class Config:
+        
+        env_file = ".env"
+
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,166 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Tuple
+import time
+
+# Buckets de latencia en segundos (los de prometheus_client por defecto)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+_metrics: List = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """
+    Contador con etiquetas. inc() es una suma sobre un dict: barato en el camino caliente.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = defaultdict(float)
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount: float = 1):
+        self._values[label_values] += amount
+
+    def samples(self):
+        for values, total in list(self._values.items()):
+            yield self.name, _format_labels(self.labels, values), total
+
+
+class CallbackCounter(Counter):
+    """
+    Contador cuyos valores se leen de otro sitio al exportar (p.ej. el cache).
+    `collect` devuelve {(valores de etiquetas): total}.
+    """
+
+    def __init__(self, name: str, help: str, labels: Iterable[str], collect: Callable[[], Dict[Tuple, float]]):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def samples(self):
+        for values, total in self.collect().items():
+            yield self.name, _format_labels(self.labels, values), total
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Por etiquetas: [recuento por bucket (+Inf al final), suma]
+        self._values: Dict[Tuple, list] = {}
+        _metrics.append(self)
+
+    def observe(self, value: float, *label_values):
+        series = self._values.get(label_values)
+        if series is None:
+            series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for values, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _format_labels((*self.labels, "le"), (*values, bound)),
+                    cumulative
+                )
+            yield f"{self.name}_sum", _format_labels(self.labels, values), total
+            yield f"{self.name}_count", _format_labels(self.labels, values), cumulative
+
+
+def render_metrics() -> str:
+    """
+    Todas las métricas registradas en formato de texto de Prometheus.
+    """
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+
+http_requests = Counter(
+    "clankers_http_requests_total",
+    "Peticiones HTTP por ruta, método y código de estado.",
+    ("method", "route", "status")
+)
+http_latency = Histogram(
+    "clankers_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta.",
+    ("method", "route")
+)
+firestore_rpcs = Counter(
+    "clankers_firestore_rpcs_total",
+    "Llamadas gRPC a Firestore por método y código de resultado.",
+    ("method", "code")
+)
+firestore_documents = Counter(
+    "clankers_firestore_documents_total",
+    "Documentos leídos (read) y escrituras enviadas (write) a Firestore.",
+    ("operation",)
+)
+
+
+def _route_template(scope) -> str:
+    """
+    Plantilla de la ruta ("/clankers/books/{book_id}") para no crear una serie por URL.
+    Las versiones recientes de FastAPI dejan la ruta con prefijo en el contexto
+    efectivo; las anteriores la copian con prefijo en scope["route"].
+    """
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    if effective is not None:
+        return effective.path
+
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP por plantilla de ruta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = _route_template(scope)
+            http_latency.observe(time.perf_counter() - started, scope["method"], route)
+            http_requests.inc(scope["method"], route, status_code)
@@ -1,71 +1,229 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from firebase_admin import auth, firestore
-
-security_scheme = HTTPBearer(auto_error=True)
-
-async def get_current_user(token: HTTPAuthorizationCredentials = Depends(security_scheme)):
-    """
-    1. Recibe el token 'Bearer ...' del Header.
-    2. Lo decodifica con Firebase Admin.
-    3. Busca los datos completos del usuario en Firestore.
-    4. Retorna el diccionario del usuario o lanza error si algo falla.
-    """
-    try:
-        decoded_token = auth.verify_id_token(token.credentials)
-        uid = decoded_token['uid']
-
-        db = firestore.client()
-        user_ref = db.collection("users").document(uid)
-        user_doc = user_ref.get()
-
-        if not user_doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuario válido en Auth pero no encontrado en Base de Datos."
-            )
-
-        user_data = user_doc.to_dict()
-        
-        user_data['id'] = uid
-        
-        if 'email' not in user_data:
-            user_data['email'] = decoded_token.get('email')
-
-        return user_data
-
-    except auth.ExpiredIdTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="El token ha expirado. Por favor inicia sesión nuevamente.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except auth.InvalidIdTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido o malformado.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except auth.RevokedIdTokenError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="El token ha sido revocado (el usuario cambió contraseña o se cerró sesión).",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        print(f"Error de autenticación: {e}") 
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error al validar las credenciales."
-        )
-    
-
-async def get_current_admin(current_user: dict = Depends(get_current_user)):
-    if current_user.get("role") != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos de administrador para realizar esta acción."
-        )
-    return current_user
\ No newline at end of file
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
+from firebase_admin import auth
+from contextlib import contextmanager
+import hashlib
+import time
+
+from app.core.config import settings
+from app.core.timing import mark_role, timed
+from app.db.dataloader import get_loader
+from app.db.firestore_client import get_db
+from app.utils import TTLCache
+
+security_scheme = HTTPBearer(auto_error=True)
+
+# Custom claim de Firebase Auth con el rol del usuario
+ROLE_CLAIM = "role"
+
+# Tokens ya verificados (clave: sha256 del token) y perfiles de usuario (clave: uid)
+_token_cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_TOKEN_CACHE_TTL)
+_user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+# Tokens de admin comprobados como no revocados (clave: sha256 del token, valor: uid)
+_revocation_cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_REVOCATION_CHECK_TTL)
+
+
+def _token_key(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode()).hexdigest()
+
+
+def _ttl_for(decoded_token: dict, ttl: float) -> float:
+    """
+    Una entrada de cache nunca vive más allá del 'exp' del propio token.
+    """
+    return min(decoded_token.get("exp", 0) - time.time(), ttl)
+
+
+async def verify_token(id_token: str) -> dict:
+    """
+    Verifica el ID token con Firebase Admin y guarda el resultado en memoria.
+    La entrada nunca vive más allá del 'exp' del propio token.
+    """
+    key = _token_key(id_token)
+
+    with timed("auth"):
+        decoded_token = _token_cache.get(key)
+        if decoded_token is not None:
+            return decoded_token
+
+        decoded_token = await run_in_threadpool(auth.verify_id_token, id_token)
+
+    _token_cache.set(key, decoded_token, ttl=_ttl_for(decoded_token, settings.AUTH_TOKEN_CACHE_TTL))
+
+    return decoded_token
+
+
+async def check_not_revoked(id_token: str, decoded_token: dict):
+    """
+    Comprueba contra Firebase Auth (una llamada a get_user) que la sesión
+    no fue revocada. El resultado se recuerda AUTH_REVOCATION_CHECK_TTL
+    segundos: una revocación hecha desde otro worker se ve, como mucho,
+    con ese retraso. Lanza auth.RevokedIdTokenError si fue revocada.
+    """
+    key = _token_key(id_token)
+    if _revocation_cache.get(key) is not None:
+        return
+
+    with timed("auth"):
+        await run_in_threadpool(auth.verify_id_token, id_token, check_revoked=True)
+
+    _revocation_cache.set(
+        key, decoded_token["uid"],
+        ttl=_ttl_for(decoded_token, settings.AUTH_REVOCATION_CHECK_TTL)
+    )
+
+
+def forget_user_tokens(uid: str):
+    """
+    Descarta de este worker los tokens verificados de un usuario, para que
+    la siguiente petición los vuelva a validar con Firebase Auth.
+    Se debe llamar tras revocar sus sesiones o borrar su cuenta.
+    """
+    _token_cache.pop_matching(lambda decoded_token: decoded_token.get("uid") == uid)
+    _revocation_cache.pop_matching(lambda token_uid: token_uid == uid)
+
+
+def invalidate_user_cache(uid: str):
+    """
+    Descarta el perfil cacheado de un usuario.
+    Se debe llamar tras cualquier escritura en users/{uid} (perfil, rol, borrado).
+    """
+    _user_cache.pop(uid)
+
+
+@contextmanager
+def _auth_errors():
+    """
+    Traduce los errores de verificación del token y de lectura del perfil a HTTPException.
+    """
+    try:
+        yield
+    except auth.ExpiredIdTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="El token ha expirado. Por favor inicia sesión nuevamente.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except auth.InvalidIdTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o malformado.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except auth.RevokedIdTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="El token ha sido revocado (el usuario cambió contraseña o se cerró sesión).",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"Error de autenticación: {e}") 
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al validar las credenciales."
+        )
+
+
+async def _load_user(uid: str, decoded_token: dict) -> dict:
+    """
+    Perfil completo users/{uid}, desde el cache de perfiles o Firestore.
+    """
+    cached_user = _user_cache.get(uid)
+    if cached_user is not None:
+        mark_role(cached_user.get("role"))
+        return dict(cached_user)
+
+    db = get_db()
+    user_ref = db.collection("users").document(uid)
+    with timed("profile"):
+        user_doc = await get_loader().load(user_ref)
+
+    if not user_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario válido en Auth pero no encontrado en Base de Datos."
+        )
+
+    user_data = user_doc.to_dict()
+    
+    user_data['id'] = uid
+    
+    if 'email' not in user_data:
+        user_data['email'] = decoded_token.get('email')
+
+    _user_cache.set(uid, user_data)
+    mark_role(user_data.get("role"))
+
+    return dict(user_data)
+
+
+async def get_current_user(token: HTTPAuthorizationCredentials = Depends(security_scheme)):
+    """
+    1. Recibe el token 'Bearer ...' del Header.
+    2. Lo decodifica con Firebase Admin (o lo toma del cache de tokens).
+    3. Busca los datos completos del usuario en Firestore (o en el cache de perfiles).
+    4. Retorna el diccionario del usuario o lanza error si algo falla.
+    Solo para rutas que necesitan el perfil; para autorizar basta get_token_user.
+    """
+    with _auth_errors():
+        decoded_token = await verify_token(token.credentials)
+        return await _load_user(decoded_token['uid'], decoded_token)
+
+
+async def get_token_user(token: HTTPAuthorizationCredentials = Depends(security_scheme)):
+    """
+    Usuario autenticado a partir de los claims del token, sin leer Firestore:
+    {'id', 'email', 'role'}. 'role' es None en tokens emitidos antes de
+    que el usuario tuviera el claim.
+    """
+    with _auth_errors():
+        decoded_token = await verify_token(token.credentials)
+        mark_role(decoded_token.get(ROLE_CLAIM))
+        return {
+            "id": decoded_token['uid'],
+            "email": decoded_token.get('email'),
+            "role": decoded_token.get(ROLE_CLAIM),
+        }
+    
+
+async def get_current_admin(token: HTTPAuthorizationCredentials = Depends(security_scheme)):
+    """
+    Autoriza con el claim 'role' del token ya verificado (cacheado), sin leer
+    el perfil. Un cambio de rol revoca las sesiones del usuario; para que un
+    rol retirado no sobreviva en tokens ya emitidos, a los admins se les
+    comprueba además la revocación (ver check_not_revoked).
+    Si el token aún no trae el claim (usuarios sin migrar) se lee el perfil.
+    """
+    with _auth_errors():
+        decoded_token = await verify_token(token.credentials)
+        uid = decoded_token['uid']
+
+        role = decoded_token.get(ROLE_CLAIM)
+        if role is None:
+            role = (await _load_user(uid, decoded_token)).get("role")
+
+        if role == "admin":
+            await check_not_revoked(token.credentials, decoded_token)
+
+    if role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos de administrador para realizar esta acción."
+        )
+    mark_role(role)
+    return {"id": uid, "email": decoded_token.get('email'), "role": role}
+
+
+async def sync_user_claims(uid: str, role: str):
+    """
+    Refleja en los custom claims de Firebase Auth los campos de autorización
+    del perfil, conservando cualquier otro claim. Los tokens nuevos los traen;
+    los ya emitidos no cambian hasta que el cliente los renueve.
+    """
+    user_record = await run_in_threadpool(auth.get_user, uid)
+    claims = {**(user_record.custom_claims or {}), ROLE_CLAIM: role}
+    if claims != user_record.custom_claims:
+        await run_in_threadpool(auth.set_custom_user_claims, uid, claims)
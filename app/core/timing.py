@@ -0,0 +1,154 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+import json
+import time
+
+from app.core.config import settings
+from app.core.metrics import _route_template
+
+# Cabecera con la que un administrador pide el desglose aunque SERVER_TIMING_ENABLED esté apagado
+SERVER_TIMING_REQUEST_HEADER = b"x-server-timing"
+
+# Fases en el orden en que salen en la cabecera Server-Timing
+PHASES = ("auth", "profile", "cache", "datastore")
+
+
+class RequestTiming:
+    """
+    Desglose de una petición: tiempo por fase y documentos leídos/escritos en Firestore.
+    El tiempo de una fase es el de reloj en que hubo al menos una operación de
+    esa fase en curso: lecturas concurrentes (gather) no se suman dos veces.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.reads = 0
+        self.writes = 0
+        self.admin = False
+        self._active: Dict[str, int] = {}
+        self._since: Dict[str, float] = {}
+
+    def enter(self, phase: str):
+        active = self._active.get(phase, 0)
+        if not active:
+            self._since[phase] = time.perf_counter()
+        self._active[phase] = active + 1
+
+    def exit(self, phase: str):
+        active = self._active[phase] - 1
+        self._active[phase] = active
+        if not active:
+            elapsed = time.perf_counter() - self._since.pop(phase)
+            self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def header(self) -> str:
+        """
+        Valor de la cabecera Server-Timing (duraciones en milisegundos).
+        """
+        entries = [
+            f"{phase};dur={self.phases[phase] * 1000:.1f}"
+            for phase in PHASES if phase in self.phases
+        ]
+        entries.append(f'db-reads;desc="{self.reads}"')
+        entries.append(f'db-writes;desc="{self.writes}"')
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """
+    Desglose de la petición en curso; None fuera de una petición (jobs, tareas de fondo).
+    """
+    return _current_timing.get()
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Atribuye el tiempo del bloque a `phase` en la petición en curso.
+    """
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+
+    timing.enter(phase)
+    try:
+        yield
+    finally:
+        timing.exit(phase)
+
+
+def count_documents(reads: int = 0, writes: int = 0, timing: Optional[RequestTiming] = None):
+    timing = timing or _current_timing.get()
+    if timing is not None:
+        timing.reads += reads
+        timing.writes += writes
+
+
+def mark_role(role: Optional[str]):
+    """
+    Lo llaman las dependencias de autenticación: solo un administrador
+    puede pedir el desglose con la cabecera X-Server-Timing.
+    """
+    timing = _current_timing.get()
+    if timing is not None and role == "admin":
+        timing.admin = True
+
+
+def _log_request(scope, status_code: int, timing: RequestTiming):
+    elapsed = timing.elapsed()
+    print("INFO:     request " + json.dumps({
+        "method": scope["method"],
+        "route": _route_template(scope),
+        "status": status_code,
+        "durationMs": round(elapsed * 1000, 1),
+        "phasesMs": {phase: round(value * 1000, 1) for phase, value in timing.phases.items()},
+        "reads": timing.reads,
+        "writes": timing.writes,
+    }))
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que abre un RequestTiming por petición, añade la cabecera
+    Server-Timing (si está activada o la pide un administrador) y escribe una
+    línea JSON por petición lenta (o por todas con REQUEST_LOG_ENABLED).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timing = RequestTiming()
+        requested = any(name == SERVER_TIMING_REQUEST_HEADER for name, _ in scope["headers"])
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SERVER_TIMING_ENABLED or (requested and timing.admin):
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timing.header().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current_timing.set(timing)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timing.reset(token)
+            if settings.REQUEST_LOG_ENABLED or timing.elapsed() * 1000 >= settings.SLOW_REQUEST_MS:
+                _log_request(scope, status_code, timing)
@@ -1 +1,13 @@
-from .firebase_config import init_firebase, db
\ No newline at end of file
+from .firebase_config import init_firebase
+from .firestore_client import (
+    init_firestore,
+    close_firestore,
+    get_db,
+    override_db
+)
+from .dataloader import (
+    DocumentLoader,
+    DataLoaderMiddleware,
+    get_loader,
+    loader_stats
+)
\ No newline at end of file
@@ -0,0 +1,186 @@
+from contextvars import Context, ContextVar
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import itertools
+
+from app.core.timing import count_documents, timed
+from app.db.firestore_client import get_db
+
+# Límite de documentos por llamada a get_all
+MAX_BATCH_SIZE = 300
+
+
+class _Fetch:
+    """
+    Lectura de un documento compartida por las peticiones que la piden.
+    `dispatched` es el instante (de _clock) en que salió hacia Firestore;
+    None mientras sigue encolada.
+    """
+
+    __slots__ = ("ref", "future", "dispatched")
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.future = asyncio.get_running_loop().create_future()
+        self.dispatched: Optional[int] = None
+
+
+# Reloj lógico que ordena envíos de lecturas y escrituras de las peticiones
+_clock = itertools.count()
+
+# Lecturas encoladas en la vuelta actual del event loop y lecturas en vuelo,
+# compartidas por todas las peticiones del proceso (clave: ruta del documento)
+_queue: Dict[str, _Fetch] = {}
+_inflight: Dict[str, _Fetch] = {}
+_flush_scheduled = False
+
+_stats = {"loads": 0, "memoHits": 0, "joined": 0, "fetched": 0, "batches": 0}
+
+
+def _schedule_flush():
+    global _flush_scheduled
+    if not _flush_scheduled:
+        _flush_scheduled = True
+        # Contexto vacío: el lote es de todas las peticiones, no de la que lo programó
+        asyncio.get_running_loop().call_soon(lambda: asyncio.ensure_future(_flush()), context=Context())
+
+
+async def _flush():
+    """
+    Resuelve todo lo encolado en la vuelta anterior del loop con get_all.
+    """
+    global _flush_scheduled
+    _flush_scheduled = False
+
+    pending = list(_queue.values())
+    _queue.clear()
+
+    for start in range(0, len(pending), MAX_BATCH_SIZE):
+        chunk = pending[start:start + MAX_BATCH_SIZE]
+        futures = {fetch.ref.path: fetch.future for fetch in chunk}
+        _stats["batches"] += 1
+        _stats["fetched"] += len(chunk)
+
+        dispatched = next(_clock)
+        for fetch in chunk:
+            fetch.dispatched = dispatched
+
+        try:
+            async for snap in get_db().get_all([fetch.ref for fetch in chunk]):
+                future = futures.pop(snap.reference.path, None)
+                if future is not None and not future.done():
+                    future.set_result(snap)
+
+            missing = RuntimeError("get_all no devolvió el documento")
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(missing)
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+
+
+def _fetch(ref, written: Optional[int] = None) -> asyncio.Future:
+    """
+    Futuro con el snapshot de `ref`: se une a una lectura ya en vuelo de otra
+    petición o se encola para el siguiente get_all. Si la petición escribió
+    el documento en el instante `written`, no se une a una lectura enviada
+    antes: podría traer el valor anterior a la escritura.
+    """
+    path = ref.path
+    fetch = _inflight.get(path)
+    if fetch is not None and (written is None or fetch.dispatched is None or fetch.dispatched > written):
+        _stats["joined"] += 1
+        return fetch.future
+
+    # La lectura nueva sustituye a la antigua: las peticiones que lleguen después se unen a ella
+    fetch = _inflight[path] = _Fetch(ref)
+
+    def done(_):
+        if _inflight.get(path) is fetch:
+            del _inflight[path]
+
+    fetch.future.add_done_callback(done)
+    _queue[path] = fetch
+    _schedule_flush()
+    return fetch.future
+
+
+class DocumentLoader:
+    """
+    Lecturas de documentos de una petición. Las que se piden en la misma
+    vuelta del event loop salen en un único get_all, y cada documento se lee
+    como mucho una vez por petición. Tras escribir un documento hay que
+    llamar a clear(): el siguiente load() lo vuelve a leer, sin unirse a
+    lecturas de otras peticiones enviadas antes de la escritura.
+    """
+
+    def __init__(self):
+        self._memo: Dict[str, asyncio.Future] = {}
+        # Documento -> instante de la última escritura de la petición
+        self._written: Dict[str, int] = {}
+
+    async def load(self, ref):
+        _stats["loads"] += 1
+        future = self._memo.get(ref.path)
+        if future is None:
+            future = self._memo[ref.path] = _fetch(ref, self._written.get(ref.path))
+            count_documents(reads=1)
+        else:
+            _stats["memoHits"] += 1
+
+        try:
+            with timed("datastore"):
+                return await asyncio.shield(future)
+        except Exception:
+            # Un error no se memoriza: el siguiente load() lo reintenta
+            self._memo.pop(ref.path, None)
+            raise
+
+    async def load_many(self, refs: Iterable) -> List:
+        return list(await asyncio.gather(*(self.load(ref) for ref in refs)))
+
+    def clear(self, ref):
+        self._memo.pop(ref.path, None)
+        self._written[ref.path] = next(_clock)
+
+
+_current_loader: ContextVar[Optional[DocumentLoader]] = ContextVar("document_loader", default=None)
+
+
+def get_loader() -> DocumentLoader:
+    """
+    Loader de la petición en curso. Fuera de una petición (jobs, tareas en
+    segundo plano) devuelve uno nuevo: agrupa lecturas pero no memoriza entre llamadas.
+    """
+    loader = _current_loader.get()
+    return loader if loader is not None else DocumentLoader()
+
+
+class DataLoaderMiddleware:
+    """
+    Middleware ASGI que crea un DocumentLoader por petición HTTP.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = _current_loader.set(DocumentLoader())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_loader.reset(token)
+
+
+def loader_stats() -> dict:
+    """
+    loads: lecturas pedidas; memoHits: resueltas por el memo de la petición;
+    joined: unidas a una lectura en vuelo de otra petición; fetched: documentos
+    leídos de Firestore, en `batches` llamadas a get_all.
+    """
+    return dict(_stats)
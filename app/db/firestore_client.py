@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import firebase_admin
+import grpc
+from firebase_admin import firestore_async
+from google.cloud.firestore import AsyncClient
+from google.cloud.firestore_v1.services.firestore import FirestoreAsyncClient
+from google.cloud.firestore_v1.services.firestore import client as firestore_client
+from google.cloud.firestore_v1.services.firestore.transports import FirestoreGrpcAsyncIOTransport
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.metrics import firestore_documents, firestore_rpcs
+from app.core.timing import count_documents, current_timing, timed
+
+_clients: List[AsyncClient] = []
+_channels: List[grpc.aio.Channel] = []
+_round_robin = None
+_override: Optional[AsyncClient] = None
+
+
+def _with_deadline(details, timeout: float):
+    """
+    Acota el deadline de una llamada gRPC; si ya trae un timeout menor, se respeta.
+    """
+    if details.timeout is not None and details.timeout <= timeout:
+        return details
+    return grpc.aio.ClientCallDetails(
+        details.method, timeout, details.metadata, details.credentials, details.wait_for_ready
+    )
+
+
+# grpc.aio clasifica cada interceptor por un solo tipo: hacen falta dos clases
+class UnaryDeadlineInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """
+    Escrituras, commits y transacciones: FIRESTORE_TIMEOUT.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        return await continuation(_with_deadline(client_call_details, self.timeout), request)
+
+
+class StreamDeadlineInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    """
+    Lecturas (get, get_all) y consultas, que en Firestore son streams: FIRESTORE_STREAM_TIMEOUT.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        return await continuation(_with_deadline(client_call_details, self.timeout), request)
+
+
+def _method_name(details) -> str:
+    method = details.method
+    if isinstance(method, bytes):
+        method = method.decode()
+    return method.rsplit("/", 1)[-1]
+
+
+class UnaryMetricsInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """
+    Cuenta commits, transacciones (BeginTransaction = un intento; Commit
+    ABORTED = un reintento) y el número de escrituras enviadas, en total y
+    en el desglose de la petición en curso.
+    """
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        writes = len(getattr(request, "writes", ()) or ())
+
+        with timed("datastore"):
+            call = await continuation(client_call_details, request)
+            code = await call.code()
+        firestore_rpcs.inc(method, code.name)
+        if writes and code == grpc.StatusCode.OK:
+            firestore_documents.inc("write", amount=writes)
+            count_documents(writes=writes)
+        return call
+
+
+# Campo que trae un documento en cada respuesta: BatchGetDocuments trae
+# 'found' o 'missing'; RunQuery, 'document' o solo progreso de la consulta
+_DOCUMENT_FIELDS = {"BatchGetDocuments": "found", "RunQuery": "document"}
+
+
+class StreamMetricsInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    """
+    Cuenta lecturas y consultas, y los documentos que devuelven.
+    Las lecturas agrupadas del DocumentLoader no pertenecen a ninguna
+    petición: el loader las atribuye él mismo a cada una.
+    """
+
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details)
+        document_field = _DOCUMENT_FIELDS.get(method)
+
+        # El callback de fin no corre en el contexto de la petición: se captura aquí
+        timing = current_timing()
+        call = await continuation(client_call_details, request)
+        if timing is not None:
+            timing.enter("datastore")
+
+        # El SDK no siempre agota el stream (p.ej. get de un documento): el
+        # código se registra cuando termina la llamada, no cuando se lee todo
+        async def record(done_call):
+            firestore_rpcs.inc(method, (await done_call.code()).name)
+
+        def done(done_call):
+            if timing is not None:
+                timing.exit("datastore")
+            asyncio.ensure_future(record(done_call))
+
+        call.add_done_callback(done)
+
+        async def responses():
+            async for response in call:
+                if document_field and document_field in response:
+                    firestore_documents.inc("read")
+                    count_documents(reads=1, timing=timing)
+                yield response
+
+        return responses()
+
+
+def channel_options() -> list:
+    return [
+        ("grpc.keepalive_time_ms", settings.FIRESTORE_KEEPALIVE_MS),
+        ("grpc.keepalive_timeout_ms", settings.FIRESTORE_KEEPALIVE_TIMEOUT_MS),
+        ("grpc.keepalive_permit_without_calls", 1),
+        ("grpc.http2.max_pings_without_data", 0),
+        # Sin esto gRPC puede reutilizar un mismo subcanal para todos los clientes del pool
+        ("grpc.use_local_subchannel_pool", 1),
+    ]
+
+
+def channel_interceptors() -> list:
+    return [
+        UnaryMetricsInterceptor(),
+        StreamMetricsInterceptor(),
+        UnaryDeadlineInterceptor(settings.FIRESTORE_TIMEOUT),
+        StreamDeadlineInterceptor(settings.FIRESTORE_STREAM_TIMEOUT)
+    ]
+
+
+def attach_channel(client: AsyncClient, channel: grpc.aio.Channel):
+    """
+    El SDK no permite pasar opciones de canal: se le entrega el transporte ya construido.
+    """
+    transport = FirestoreGrpcAsyncIOTransport(host=client._target, channel=channel)
+    client._transport = transport
+    client._firestore_api_internal = FirestoreAsyncClient(
+        transport=transport,
+        client_options=client._client_options
+    )
+    firestore_client._client_info = client._client_info
+
+
+def _build_client() -> AsyncClient:
+    app = firebase_admin.get_app()
+    client = AsyncClient(
+        project=settings.FIREBASE_PROJECT_ID,
+        credentials=app.credential.get_credential()
+    )
+
+    # Con el emulador (FIRESTORE_EMULATOR_HOST) se usa el canal que crea el propio cliente
+    if client._emulator_host is not None:
+        return client
+
+    channel = FirestoreGrpcAsyncIOTransport.create_channel(
+        client._target,
+        credentials=client._credentials,
+        options=channel_options(),
+        interceptors=channel_interceptors()
+    )
+    attach_channel(client, channel)
+
+    _channels.append(channel)
+    return client
+
+
+def init_firestore():
+    """
+    Crea el pool de clientes de Firestore (uno por canal gRPC) que usará
+    toda la aplicación. Se llama desde el lifespan tras init_firebase().
+    """
+    global _round_robin
+
+    if _clients:
+        return
+
+    _clients.extend(_build_client() for _ in range(max(1, settings.FIRESTORE_CHANNELS)))
+    _round_robin = itertools.cycle(_clients)
+
+
+async def close_firestore():
+    """
+    Cierra los canales gRPC del pool al apagar la aplicación.
+    """
+    global _round_robin
+
+    for channel in _channels:
+        await channel.close()
+
+    _channels.clear()
+    _clients.clear()
+    _round_robin = None
+
+
+def override_db(client: Optional[AsyncClient]):
+    """
+    Sustituye el cliente en toda la aplicación (routers, servicios y jobs),
+    p.ej. por uno contra el emulador o un fake en pruebas. None lo deshace.
+    """
+    global _override
+    _override = client
+
+
+def get_db() -> AsyncClient:
+    """
+    Cliente de Firestore para la operación en curso. Sirve como dependencia
+    de FastAPI (Depends(get_db)) y como llamada directa desde servicios.
+    Fuera del servidor (jobs/CLI), sin pool, usa el cliente por defecto del SDK.
+    """
+    if _override is not None:
+        return _override
+    if _round_robin is None:
+        return firestore_async.client()
+    return next(_round_robin)
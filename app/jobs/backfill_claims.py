@@ -0,0 +1,75 @@
+"""
+Copia el rol de cada perfil users/{uid} a los custom claims de Firebase Auth.
+
+Uso:
+    python -m app.jobs.backfill_claims
+    python -m app.jobs.backfill_claims --dry-run
+
+Recorre los perfiles por páginas y, por cada bloque de hasta 100 usuarios,
+lee sus claims actuales con una sola llamada a get_users. Solo escribe los
+que cambian, así que se puede relanzar sin efectos. Los usuarios ven el
+claim al renovar su token; hasta entonces get_current_admin lee el perfil.
+"""
+import argparse
+import asyncio
+from firebase_admin import auth
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.core.security import ROLE_CLAIM
+from app.db import init_firebase, get_db
+from app.utils import iter_pages
+
+# Límite de identificadores por llamada a auth.get_users
+BATCH_SIZE = 100
+CONCURRENCY = 8
+
+
+async def backfill_batch(profiles: dict, dry_run: bool, semaphore: asyncio.Semaphore) -> int:
+    identifiers = [auth.UidIdentifier(uid) for uid in profiles]
+    result = await asyncio.to_thread(auth.get_users, identifiers)
+
+    async def update(user_record):
+        claims = {**(user_record.custom_claims or {}), ROLE_CLAIM: profiles[user_record.uid]}
+        if claims == user_record.custom_claims:
+            return 0
+        if not dry_run:
+            async with semaphore:
+                await asyncio.to_thread(auth.set_custom_user_claims, user_record.uid, claims)
+        return 1
+
+    for identifier in result.not_found:
+        print(f"WARNING:  {identifier.uid} tiene perfil pero no existe en Firebase Auth")
+
+    return sum(await asyncio.gather(*(update(user_record) for user_record in result.users)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migra el rol de los usuarios a custom claims")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los usuarios a actualizar")
+    args = parser.parse_args()
+
+    init_firebase()
+    db = get_db()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    query = db.collection("users").select(["role"]).order_by(FieldPath.document_id())
+    profiles, seen, updated = {}, 0, 0
+
+    async for doc in iter_pages(query, BATCH_SIZE):
+        profiles[doc.id] = doc.to_dict().get("role") or "lector"
+        if len(profiles) == BATCH_SIZE:
+            updated += await backfill_batch(profiles, args.dry_run, semaphore)
+            seen += len(profiles)
+            profiles = {}
+            print(f"INFO:     {seen} usuarios revisados, {updated} con claims nuevos")
+
+    if profiles:
+        updated += await backfill_batch(profiles, args.dry_run, semaphore)
+        seen += len(profiles)
+
+    action = "por actualizar" if args.dry_run else "actualizados"
+    print(f"INFO:     {seen} usuarios revisados, {updated} {action}.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
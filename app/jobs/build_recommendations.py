@@ -0,0 +1,189 @@
+"""
+Construye las recomendaciones item-item a partir de todas las reseñas.
+
+Uso:
+    python -m app.jobs.build_recommendations
+
+1. Exporta (usuario, libro, rating) del collection group "reviews".
+2. Monta la matriz dispersa usuario x libro con los ratings centrados en la
+   media de cada usuario (coseno ajustado).
+3. Calcula la similitud coseno entre libros por bloques de columnas, para
+   no materializar nunca la matriz libro x libro completa.
+4. Guarda los N vecinos de cada libro en book_neighbors/{book_id} y los
+   libros mejor valorados de cada género en genre_top_books/{hash del género}.
+"""
+import asyncio
+import math
+import numpy as np
+from scipy import sparse
+from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.core import settings
+from app.db import init_firebase, get_db
+from app.services.recommendations import NEIGHBORS_COLLECTION, GENRE_TOP_COLLECTION, genre_doc_id
+from app.utils import iter_pages
+
+BLOCK_SIZE = 1000
+WRITE_BATCH_SIZE = 400
+
+
+async def export_ratings(db):
+    users, books, ratings = [], [], []
+    query = (
+        db.collection_group("reviews")
+        .select(["userId", "rating"])
+        .order_by(FieldPath.document_id())
+    )
+    async for review in iter_pages(query, settings.EXPORT_PAGE_SIZE):
+        data = review.to_dict()
+        if not data.get("userId"):
+            continue
+        users.append(data["userId"])
+        books.append(review.reference.parent.parent.id)
+        ratings.append(data.get("rating", 0))
+
+    return users, books, np.asarray(ratings, dtype=float)
+
+
+async def export_books(db) -> dict:
+    books = {}
+    query = db.collection("books").select(["title", "author", "coverImage", "genres", "rating", "reviewCount"])
+    async for doc in query.stream():
+        data = doc.to_dict()
+        books[doc.id] = {
+            "title": data.get("title", ""),
+            "author": data.get("author", ""),
+            "coverImage": data.get("coverImage", ""),
+            "genres": [g.get("genre") for g in data.get("genres") or [] if g.get("genre")],
+            "rating": data.get("rating", 0.0),
+            "reviewCount": data.get("reviewCount", 0),
+        }
+    return books
+
+
+def rating_matrix(users, books, ratings):
+    """
+    Matriz CSC usuario x libro con ratings centrados por usuario, e índices.
+    """
+    user_ids, user_idx = np.unique(np.asarray(users, dtype=str), return_inverse=True)
+    book_ids, book_idx = np.unique(np.asarray(books, dtype=str), return_inverse=True)
+
+    counts = np.bincount(user_idx, minlength=len(user_ids))
+    means = np.bincount(user_idx, weights=ratings, minlength=len(user_ids)) / np.maximum(counts, 1)
+
+    matrix = sparse.csc_matrix(
+        (ratings - means[user_idx], (user_idx, book_idx)),
+        shape=(len(user_ids), len(book_ids))
+    )
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+
+    return matrix, book_ids
+
+
+def top_neighbors(matrix, top_n: int):
+    """
+    Para cada libro (columna), los top_n libros más parecidos por coseno.
+    Devuelve una lista de (índices, similitudes) alineada con las columnas.
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = (matrix @ sparse.diags(1.0 / norms)).tocsc()
+    transposed = normalized.T.tocsr()
+
+    n_books = matrix.shape[1]
+    result = []
+    for start in range(0, n_books, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, n_books)
+        block = (transposed[start:stop] @ normalized).tocsr()
+
+        for row in range(stop - start):
+            lo, hi = block.indptr[row], block.indptr[row + 1]
+            cols, sims = block.indices[lo:hi], block.data[lo:hi]
+
+            keep = (sims > 0) & (cols != start + row)
+            cols, sims = cols[keep], sims[keep]
+
+            if len(sims) > top_n:
+                best = np.argpartition(-sims, top_n)[:top_n]
+                cols, sims = cols[best], sims[best]
+
+            order = np.argsort(-sims)
+            result.append((cols[order], sims[order]))
+
+    return result
+
+
+def genre_rankings(books: dict, top_n: int) -> dict:
+    """
+    Mejores libros por género: rating ponderado por log(1 + reviewCount).
+    """
+    by_genre = {}
+    for book_id, book in books.items():
+        score = book["rating"] * math.log1p(book["reviewCount"])
+        for genre in book["genres"]:
+            by_genre.setdefault(genre, []).append((score, book_id))
+
+    return {
+        genre: sorted(entries, reverse=True)[:top_n]
+        for genre, entries in by_genre.items()
+    }
+
+
+def summary(book_id: str, book: dict, score: float) -> dict:
+    return {
+        "bookId": book_id,
+        "title": book["title"],
+        "author": book["author"],
+        "coverImage": book["coverImage"],
+        "genres": book["genres"],
+        "score": round(float(score), 6),
+    }
+
+
+async def write_documents(db, collection: str, documents: dict):
+    items = list(documents.items())
+    for start in range(0, len(items), WRITE_BATCH_SIZE):
+        batch = db.batch()
+        for doc_id, data in items[start:start + WRITE_BATCH_SIZE]:
+            batch.set(db.collection(collection).document(doc_id), data)
+        await batch.commit()
+
+
+async def main():
+    init_firebase()
+    db = get_db()
+    top_n = settings.RECOMMENDATION_NEIGHBORS
+
+    users, books, ratings = await export_ratings(db)
+    catalog = await export_books(db)
+    print(f"INFO:     {len(ratings)} reseñas, {len(set(users))} usuarios, {len(catalog)} libros.")
+
+    neighbor_docs = {}
+    if len(ratings):
+        matrix, book_ids = rating_matrix(users, books, ratings)
+        for book_id, (cols, sims) in zip(book_ids, top_neighbors(matrix, top_n)):
+            neighbors = [
+                summary(book_ids[col], catalog[book_ids[col]], sim)
+                for col, sim in zip(cols, sims)
+                if book_ids[col] in catalog
+            ]
+            neighbor_docs[book_id] = {"neighbors": neighbors, "updatedAt": firestore.SERVER_TIMESTAMP}
+
+    genre_docs = {
+        genre_doc_id(genre): {
+            "genre": genre,
+            "books": [summary(book_id, catalog[book_id], score) for score, book_id in entries],
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        }
+        for genre, entries in genre_rankings(catalog, top_n).items()
+    }
+
+    await write_documents(db, NEIGHBORS_COLLECTION, neighbor_docs)
+    await write_documents(db, GENRE_TOP_COLLECTION, genre_docs)
+    print(f"INFO:     Guardados vecinos de {len(neighbor_docs)} libros y {len(genre_docs)} géneros.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
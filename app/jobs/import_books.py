@@ -0,0 +1,66 @@
+"""
+Importa un fichero NDJSON o CSV de libros al catálogo.
+
+Uso:
+    python -m app.jobs.import_books catalogo.ndjson
+    python -m app.jobs.import_books catalogo.csv --format csv --created-by <uid>
+
+Al terminar invalida el cache compartido del catálogo, así que con varios
+workers debe correr con CACHE_BACKEND=redis, como los servidores. Los índices
+en memoria de los servidores (/search, /suggest, /similar) solo ven los
+libros importados si tienen activo el espejo (CATALOG_MIRROR_ENABLED);
+si no, hasta que se reinicien.
+"""
+import argparse
+import asyncio
+import json
+
+from app.core import settings
+from app.db.firebase_config import init_firebase
+from app.services.bulk_import import import_books, parse_csv, parse_ndjson
+from app.services.cache_config import init_cache, close_cache
+
+
+async def read_lines(path: str):
+    # Los bytes inválidos se marcan y la fila se informa como error (ver parse_ndjson)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def print_progress(report: dict):
+    print(
+        f"INFO:     {report['rows']} filas leídas, {report['created']} creadas, "
+        f"{report['updated']} actualizadas, {report['failed']} con error"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Importación masiva de libros")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default=None)
+    parser.add_argument("--created-by", default="bulk-import")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    parse = parse_csv if fmt == "csv" else parse_ndjson
+
+    init_firebase()
+    await init_cache()
+    if settings.CACHE_BACKEND != "redis":
+        print("INFO:     CACHE_BACKEND no es redis: el cache de los servidores no se invalidará.")
+    if not settings.CATALOG_MIRROR_ENABLED:
+        print("INFO:     Sin CATALOG_MIRROR_ENABLED los índices de los servidores no verán los libros importados hasta reiniciarlos.")
+
+    try:
+        report = await import_books(parse(read_lines(args.path)), args.created_by, on_progress=print_progress)
+    finally:
+        await close_cache()
+
+    for error in report["errors"]:
+        print(f"ERROR:    línea {error['line']}: {error['error']}")
+    print(json.dumps({k: v for k, v in report.items() if k != "errors"}))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
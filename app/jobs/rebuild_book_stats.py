@@ -0,0 +1,109 @@
+"""
+Reconstruye los shards de rating de cada libro a partir de las reseñas y
+vuelve a materializar rating, reviewCount, histograma y el extracto de
+últimas reseñas en books/{id}.
+
+Uso:
+    python -m app.jobs.rebuild_book_stats
+
+Exporta (libro, rating) de todas las reseñas con una sola consulta de
+collection group y calcula sumas, recuentos e histogramas con NumPy.
+Necesario una vez para los libros creados antes de los shards, y como
+reparación si alguna vez se desincronizan. Conviene lanzarlo con poco tráfico:
+las reseñas que lleguen mientras se reconstruye un libro se pueden perder
+del agregado hasta la siguiente ejecución.
+"""
+import asyncio
+import numpy as np
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.core import settings
+from app.db import init_firebase, get_db
+from app.services.book_stats import HISTOGRAM_BUCKETS, SHARDS_COLLECTION, materialize_book_stats
+from app.utils import iter_pages
+
+CONCURRENCY = 16
+
+
+async def export_ratings(db):
+    book_ids, ratings = [], []
+    query = (
+        db.collection_group("reviews")
+        .select(["rating"])
+        .order_by(FieldPath.document_id())
+    )
+    async for review in iter_pages(query, settings.EXPORT_PAGE_SIZE):
+        book_ids.append(review.reference.parent.parent.id)
+        ratings.append(review.to_dict().get("rating", 0))
+
+    return np.asarray(book_ids, dtype=object), np.asarray(ratings, dtype=float)
+
+
+def compute_stats(book_ids: np.ndarray, ratings: np.ndarray) -> dict:
+    """
+    {book_id: (suma, recuento, histograma)} sin bucles por reseña.
+    """
+    if len(ratings) == 0:
+        return {}
+
+    keys, inverse = np.unique(book_ids.astype(str), return_inverse=True)
+    buckets = np.clip(np.floor(ratings + 0.5), 1, 10).astype(int) - 1
+
+    sums = np.bincount(inverse, weights=ratings, minlength=len(keys))
+    counts = np.bincount(inverse, minlength=len(keys))
+    histograms = np.bincount(
+        inverse * 10 + buckets, minlength=len(keys) * 10
+    ).reshape(len(keys), 10)
+
+    return {
+        book_id: (float(sums[i]), int(counts[i]), histograms[i])
+        for i, book_id in enumerate(keys)
+    }
+
+
+async def rebuild_book(db, book_ref, stats):
+    total, count, histogram = stats if stats else (0.0, 0, np.zeros(10, dtype=int))
+
+    batch = db.batch()
+    async for shard in book_ref.collection(SHARDS_COLLECTION).stream():
+        batch.delete(shard.reference)
+    batch.set(book_ref.collection(SHARDS_COLLECTION).document("0"), {
+        "sum": total,
+        "count": count,
+        "hist": {bucket: int(value) for bucket, value in zip(HISTOGRAM_BUCKETS, histogram)}
+    })
+    await batch.commit()
+
+    await materialize_book_stats(book_ref.id)
+    return count
+
+
+async def main():
+    init_firebase()
+    db = get_db()
+
+    book_ids, ratings = await export_ratings(db)
+    stats = compute_stats(book_ids, ratings)
+    print(f"INFO:     {len(ratings)} reseñas exportadas de {len(stats)} libros.")
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    done = 0
+
+    async def rebuild(book_ref):
+        nonlocal done
+        async with semaphore:
+            await rebuild_book(db, book_ref, stats.get(book_ref.id))
+        done += 1
+        if done % 100 == 0:
+            print(f"INFO:     {done} libros reconstruidos")
+
+    tasks = []
+    async for book in db.collection("books").select([]).stream():
+        tasks.append(asyncio.ensure_future(rebuild(book.reference)))
+    await asyncio.gather(*tasks)
+
+    print(f"INFO:     Listo: {done} libros.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,29 +1,37 @@
-#Helpers
-from .helpers_model import (
-    AuthorEmbedded,
-    LectorEmbedded
-)
-
-#Users
-from .user_model import (
-    UsuarioBase,
-    UsuarioCreate,
-    UsuarioPublic,
-    UsuarioLogin,
-    TokenResponse,
-    RefreshRequest
-)
-
-from .libro_model import (
-    BookBase,
-    BookCreate,
-    BookResponse,
-    BookUpdate
-)
-
-#Reviews
-from .review_model import (
-    ReviewCreate,
-    ReviewResponse,
-    ReviewUpdate,
+#Helpers
+from .helpers_model import (
+    AuthorEmbedded,
+    LectorEmbedded
+)
+
+#Users
+from .user_model import (
+    UsuarioBase,
+    UsuarioCreate,
+    UsuarioPublic,
+    UsuarioLogin,
+    TokenResponse,
+    RefreshRequest
+)
+
+from .libro_model import (
+    BookBase,
+    BookCreate,
+    BookResponse,
+    BookUpdate,
+    BookPage,
+    BookBatchRequest,
+    BookBatchItem,
+    BookRecommendation,
+    SimilarBook,
+    BookSearchResult,
+    BookSuggestion
+)
+
+#Reviews
+from .review_model import (
+    ReviewCreate,
+    ReviewResponse,
+    ReviewUpdate,
+    ReviewPage,
 )
\ No newline at end of file
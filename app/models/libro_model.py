@@ -1,40 +1,97 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import date
-from uuid import UUID, uuid4
-
-class Genre(BaseModel):
-    genre: str = Field(..., min_length=1, max_length=100)
-class ReviewEmbedded(BaseModel):
-    reviewerName: str
-    timeAgo: str  
-    rating: float = Field(..., ge=0, le=5, description="Debe estar entre 0 y 5")
-    reviewText: str = Field(..., min_length=1, max_length=5000)
-    avatar: Optional[str] = None
-
-class BookBase(BaseModel):
-    title: str = Field(..., min_length=1 ,max_length=500)
-    author: str = Field(..., min_length=1, max_length=500) 
-    coverImage: str
-    coverAlt: str
-    description: str = Field(..., min_length=1, max_length=5000)
-    genres: List[Genre]
-class BookCreate(BookBase):
-    id: Optional[str] = None 
-
-class BookUpdate(BaseModel):
-    title: Optional[str] = None
-    author: Optional[str] = None
-    coverImage: Optional[str] = None
-    coverAlt: Optional[str] = None
-    description: Optional[str] = None
-    genres: Optional[List[Genre]] = None
-    
-class BookResponse(BookBase):
-    id: str
-    rating: float = 0.0
-    reviewCount: int = 0    
-    reviews: Optional[List[ReviewEmbedded]] = []    
-
-    class Config:
-        from_attributes = True
\ No newline at end of file
+from pydantic import BaseModel, Field, computed_field, field_validator
+from typing import Optional, List, Dict, Literal
+from datetime import date, datetime
+from uuid import UUID, uuid4
+from app.utils.time_utils import calculate_time_ago
+from app.utils.cursor_util import is_document_id
+
+class Genre(BaseModel):
+    genre: str = Field(..., min_length=1, max_length=100)
+class ReviewEmbedded(BaseModel):
+    id: Optional[str] = None
+    reviewerName: str
+    rating: float = Field(..., ge=0, le=10, description="Debe estar entre 0 y 10")
+    reviewText: str = Field(..., min_length=1, max_length=5000)
+    hasSpoilers: bool = False
+    avatar: Optional[str] = None
+    createdAt: Optional[datetime] = None
+
+    @computed_field
+    def timeAgo(self) -> str:
+        return calculate_time_ago(self.createdAt)
+
+class BookBase(BaseModel):
+    title: str = Field(..., min_length=1 ,max_length=500)
+    author: str = Field(..., min_length=1, max_length=500) 
+    coverImage: str
+    coverAlt: str
+    description: str = Field(..., min_length=1, max_length=5000)
+    genres: List[Genre]
+class BookCreate(BookBase):
+    id: Optional[str] = None 
+
+class BookUpdate(BaseModel):
+    title: Optional[str] = None
+    author: Optional[str] = None
+    coverImage: Optional[str] = None
+    coverAlt: Optional[str] = None
+    description: Optional[str] = None
+    genres: Optional[List[Genre]] = None
+    
+class BookResponse(BookBase):
+    id: str
+    rating: float = 0.0
+    reviewCount: int = 0    
+    ratingHistogram: Dict[str, int] = Field(default_factory=dict, description="Número de reseñas por estrella, de '1' a '10'")
+    reviews: Optional[List[ReviewEmbedded]] = []    
+
+    class Config:
+        from_attributes = True
+
+class BookRecommendation(BaseModel):
+    bookId: str
+    title: str
+    author: str
+    coverImage: str
+    genres: List[str] = []
+    score: float
+
+class SimilarBook(BaseModel):
+    id: str
+    title: str
+    author: str
+    coverImage: str
+    score: float = Field(..., description="Parecido (Jaccard) entre 0 y 1")
+
+class BookSearchResult(BaseModel):
+    id: str
+    title: str
+    author: str
+    coverImage: str
+    score: float = Field(..., description="Relevancia BM25")
+
+class BookSuggestion(BaseModel):
+    text: str
+    type: Literal["title", "author"]
+    bookId: Optional[str] = None
+    weight: int = Field(0, description="Popularidad (reviewCount)")
+
+class BookBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=100)
+
+    @field_validator('ids')
+    def validar_ids(cls, v):
+        # Con '/' el ID apuntaría a otro documento (p.ej. "x/reviews/r1") o rompería la ruta
+        invalid = [book_id for book_id in v if not is_document_id(book_id)]
+        if invalid:
+            raise ValueError(f"IDs de libro inválidos: {invalid[:5]}")
+        return v
+
+class BookBatchItem(BaseModel):
+    id: str
+    found: bool
+    book: Optional[BookResponse] = None
+
+class BookPage(BaseModel):
+    items: List[BookResponse]
+    nextCursor: Optional[str] = Field(None, description="Cursor para pedir la siguiente página; null si no hay más")
\ No newline at end of file
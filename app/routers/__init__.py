@@ -1,4 +1,4 @@
-from .router_auth import router as auth_router
-from .router_user import router as user_router
-from .router_libro import router as book_router
+from .router_auth import router as auth_router
+from .router_user import router as user_router
+from .router_libro import router as book_router
 from .router_reviews import router as review_router
\ No newline at end of file
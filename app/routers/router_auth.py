@@ -1,149 +1,182 @@
-from fastapi import APIRouter, HTTPException, status
-from firebase_admin import firestore,auth
-import requests
-from datetime import datetime
-from app.models import (
-    UsuarioPublic,
-    UsuarioCreate,
-    UsuarioLogin,
-    TokenResponse,
-    RefreshRequest
-)
-from app.core import settings
-
-router = APIRouter()
-
-@router.post("/register", response_model=UsuarioPublic, status_code=status.HTTP_201_CREATED)
-async def register_user(user: UsuarioCreate):
-    """
-    Registra un nuevo usuario en Firebase Auth 
-    Crea su perfil en Firestore
-    """
-
-    try:
-        user_record = auth.create_user(
-            email = user.email,
-            password = user.password,
-            display_name= user.username
-        )
-
-        user_data = {
-            "id" : user_record.uid,
-            "username": user.username,
-            "email": user.email,
-            "role": "lector",
-            "preferences": [],
-            "profileImgURL": None,
-            "dateRegister": datetime.now()
-        }
-
-        db = firestore.client()
-
-        db.collection("users").document(user_record.uid).set(user_data)
-
-        return user_data
-    
-    except auth.EmailAlreadyExistsError:
-        raise HTTPException(
-            status_code=400,
-            detail=f"El correo {user.email}"
-        )
-    
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error de validación: {str(e)}"
-        )
-    
-    except Exception as e:
-        print(f"Error no controlado: {e}") 
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ocurrió un error interno al procesar el registro."
-        )
-
-
-@router.post("/login", response_model=TokenResponse)
-async def login_user(user: UsuarioLogin):
-    url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={settings.FIREBASE_API_KEY}"
-    
-    payload = {
-        "email": user.email,
-        "password": user.password,
-        "returnSecureToken": True
-    }
-
-    response = requests.post(url, json=payload)
-    
-    if response.status_code != 200:
-        error_data = response.json()
-        error_msg = error_data.get("error", {}).get("message", "Login failed")
-        
-        if "INVALID_PASSWORD" in error_msg or "EMAIL_NOT_FOUND" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, 
-                detail="Credenciales incorrectas"
-            )
-        elif "USER_DISABLED" in error_msg:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, 
-                detail="Cuenta deshabilitada"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, 
-                detail=error_msg
-            )
-
-    auth_data = response.json()
-    uid = auth_data["localId"]
-    
-    db = firestore.client() 
-    user_ref = db.collection("users").document(uid)
-    try:
-        user_ref.update({"lastConection": datetime.now()})
-    except Exception as e:
-        print(f"Advertencia: No se pudo actualizar ultimaConexion para {uid}: {e}")
-
-    user_doc = user_ref.get()
-
-    user_info = None
-    if user_doc.exists:
-        user_info = user_doc.to_dict()
-        user_info['id'] = uid
-
-    return {
-        "idToken": auth_data["idToken"],           # El Token JWT para usar la API
-        "refreshToken": auth_data["refreshToken"], # Para renovar sesión
-        "expiresIn": auth_data["expiresIn"],
-        "localId": uid,
-        "userData": user_info 
-    }
-
-
-@router.post("/refresh")
-async def refresh_token(data: RefreshRequest):
-
-    url = f"https://securetoken.googleapis.com/v1/token?key={settings.FIREBASE_API_KEY}"
-    
-    payload = {
-        "grant_type": "refresh_token",
-        "refresh_token": data.refreshToken
-    }
-
-    response = requests.post(url, json=payload)
-    
-    if response.status_code != 200:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, 
-            detail="Sesión expirada o inválida"
-        )
-
-    auth_data = response.json()
-    
-    return {
-        "idToken": auth_data["access_token"], 
-        "refreshToken": auth_data["refresh_token"],
-        "expiresIn": auth_data["expires_in"],
-        "localId": auth_data["user_id"]
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from firebase_admin import auth
+from google.cloud.firestore import AsyncClient
+import httpx
+from datetime import datetime
+from app.models import (
+    UsuarioPublic,
+    UsuarioCreate,
+    UsuarioLogin,
+    TokenResponse,
+    RefreshRequest
+)
+from app.core import settings, sync_user_claims
+from app.db import get_db
+from app.services.http_client import get_http_client
+
+router = APIRouter()
+
+@router.post("/register", response_model=UsuarioPublic, status_code=status.HTTP_201_CREATED)
+async def register_user(
+    user: UsuarioCreate,
+    db: AsyncClient = Depends(get_db)
+):
+    """
+    Registra un nuevo usuario en Firebase Auth 
+    Crea su perfil en Firestore
+    """
+
+    try:
+        user_record = await run_in_threadpool(
+            auth.create_user,
+            email = user.email,
+            password = user.password,
+            display_name= user.username
+        )
+
+        user_data = {
+            "id" : user_record.uid,
+            "username": user.username,
+            "email": user.email,
+            "role": "lector",
+            "preferences": [],
+            "profileImgURL": None,
+            "dateRegister": datetime.now()
+        }
+
+        await db.collection("users").document(user_record.uid).set(user_data)
+
+        # El rol viaja en el token: las rutas de admin no necesitan leer el perfil.
+        # Si falla no se aborta el registro; get_current_admin lee el perfil.
+        try:
+            await sync_user_claims(user_record.uid, user_data["role"])
+        except Exception as e:
+            print(f"Advertencia: No se pudieron asignar los claims de {user_record.uid}: {e}")
+
+        return user_data
+    
+    except auth.EmailAlreadyExistsError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El correo {user.email}"
+        )
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error de validación: {str(e)}"
+        )
+    
+    except Exception as e:
+        print(f"Error no controlado: {e}") 
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Ocurrió un error interno al procesar el registro."
+        )
+
+
+@router.post("/login", response_model=TokenResponse)
+async def login_user(
+    user: UsuarioLogin,
+    http: httpx.AsyncClient = Depends(get_http_client),
+    db: AsyncClient = Depends(get_db)
+):
+    url = f"{settings.FIREBASE_IDENTITY_TOOLKIT_URL}/accounts:signInWithPassword?key={settings.FIREBASE_API_KEY}"
+    
+    payload = {
+        "email": user.email,
+        "password": user.password,
+        "returnSecureToken": True
+    }
+
+    try:
+        response = await http.post(url, json=payload)
+    except httpx.HTTPError as e:
+        print(f"Error contactando Firebase Auth: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de autenticación no disponible"
+        )
+    
+    if response.status_code != 200:
+        error_data = response.json()
+        error_msg = error_data.get("error", {}).get("message", "Login failed")
+        
+        if "INVALID_PASSWORD" in error_msg or "EMAIL_NOT_FOUND" in error_msg:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, 
+                detail="Credenciales incorrectas"
+            )
+        elif "USER_DISABLED" in error_msg:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, 
+                detail="Cuenta deshabilitada"
+            )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, 
+                detail=error_msg
+            )
+
+    auth_data = response.json()
+    uid = auth_data["localId"]
+    
+    user_ref = db.collection("users").document(uid)
+    try:
+        await user_ref.update({"lastConection": datetime.now()})
+    except Exception as e:
+        print(f"Advertencia: No se pudo actualizar ultimaConexion para {uid}: {e}")
+
+    user_doc = await user_ref.get()
+
+    user_info = None
+    if user_doc.exists:
+        user_info = user_doc.to_dict()
+        user_info['id'] = uid
+
+    return {
+        "idToken": auth_data["idToken"],           # El Token JWT para usar la API
+        "refreshToken": auth_data["refreshToken"], # Para renovar sesión
+        "expiresIn": auth_data["expiresIn"],
+        "localId": uid,
+        "userData": user_info 
+    }
+
+
+@router.post("/refresh")
+async def refresh_token(
+    data: RefreshRequest,
+    http: httpx.AsyncClient = Depends(get_http_client)
+):
+
+    url = f"{settings.FIREBASE_SECURE_TOKEN_URL}/token?key={settings.FIREBASE_API_KEY}"
+    
+    payload = {
+        "grant_type": "refresh_token",
+        "refresh_token": data.refreshToken
+    }
+
+    try:
+        response = await http.post(url, json=payload)
+    except httpx.HTTPError as e:
+        print(f"Error contactando Firebase Auth: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de autenticación no disponible"
+        )
+    
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, 
+            detail="Sesión expirada o inválida"
+        )
+
+    auth_data = response.json()
+    
+    return {
+        "idToken": auth_data["access_token"], 
+        "refreshToken": auth_data["refresh_token"],
+        "expiresIn": auth_data["expires_in"],
+        "localId": auth_data["user_id"]
     }
\ No newline at end of file
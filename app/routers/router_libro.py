@@ -1,193 +1,404 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from firebase_admin import firestore
-from fastapi_cache.decorator import cache
-from fastapi_cache import FastAPICache
-from typing import List
-
-from app.models.libro_model import BookCreate, BookUpdate, BookResponse
-from app.core.security import get_current_user, get_current_admin
-from app.utils import build_book_key
-router = APIRouter()
-
-
-@router.post("/", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
-async def create_book(
-    book: BookCreate,
-    current_user: dict = Depends(get_current_admin) 
-):
-    db = firestore.client()
-    await FastAPICache.clear(namespace="todos_libros")
-
-    book_dict = book.model_dump(exclude_unset=True)
-    custom_id = book_dict.pop("id", None)
-    
-    defaults = {
-        "rating": 0.0,
-        "reviewCount": 0,
-        "reviews": [],
-        "createdBy": current_user['id'] 
-    }
-    final_data = {**book_dict, **defaults}
-
-    try:
-        if custom_id:
-            doc_ref = db.collection("books").document(custom_id)
-            if doc_ref.get().exists:
-                raise HTTPException(status_code=409, detail="Ya existe un libro con este ID")
-            doc_ref.set(final_data)
-        else:
-            doc_ref = db.collection("books").document()
-            doc_ref.set(final_data)
-
-        return {"id": doc_ref.id, **final_data}
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-
-@router.get("/", response_model=List[BookResponse])
-@cache(expire=1800, namespace="todos_libros")
-async def get_books(
-    current_user: dict = Depends(get_current_user) 
-):
-    if not current_user: 
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo un usuario autenticado puede acceder a esos recursos"
-        )
-
-    db = firestore.client()
-
-    docs = db.collection("books").stream()
-    
-    books_list = []
-    for doc in docs:
-        data = doc.to_dict()
-        books_list.append({
-            "id": doc.id, 
-            **data,
-            "reviewCount": data.get("reviewCount", 0) 
-        })
-        
-    return books_list
-
-@router.get("/genre/{genero}", response_model=List[BookResponse])
-@cache(expire=1800) 
-async def get_books_by_genre(
-    genero: str,
-    current_user: dict = Depends(get_current_user) 
-):
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo un usuario autenticado puede acceder a esos recursos"
-        )
-    
-    db = firestore.client()
-    genre_query_object = {"genre": genero}
-    
-    try:
-        query = db.collection("books").where("genres", "array_contains", genre_query_object)
-        docs = query.stream()
-        
-        results = []
-        for doc in docs:
-            data = doc.to_dict()
-            results.append({"id": doc.id, **data, "reviews": data.get("reviews", [])})
-            
-        return results
-    except Exception as e:
-        print(f"Error buscando genero: {e}")
-        return []
-
-@router.get("/{book_id}", response_model=BookResponse)
-@cache(
-    expire=1800,
-    key_builder=build_book_key
-)
-async def get_book_by_id(
-    book_id: str,
-    current_user: dict = Depends(get_current_user) 
-):
-    if not current_user: 
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo un usuario autenticado puede acceder a esos recursos"
-        )
-    
-    db = firestore.client()
-
-    doc_ref = db.collection("books").document(book_id)
-    doc = doc_ref.get()
-
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
-
-    data = doc.to_dict()
-    return {"id": doc.id, **data, "reviews": data.get("reviews", [])}
-
-@router.patch("/{book_id}", response_model=BookResponse)
-async def update_book(
-    book_id: str, 
-    updates: BookUpdate,
-    current_user: dict = Depends(get_current_admin) 
-):
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo un usuario administrador autenticado puede acceder a esos recursos"
-        )
-
-
-    db = firestore.client()
-    doc_ref = db.collection("books").document(book_id)
-    
-    if not doc_ref.get().exists:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
-
-    data_to_update = {k: v for k, v in updates.model_dump().items() if v is not None}
-    
-    if not data_to_update:
-        current_data = doc_ref.get().to_dict()
-        return {"id": book_id, **current_data}
-
-    try:
-        doc_ref.update(data_to_update)
-        
-        await FastAPICache.get_backend().delete(f"book:{book_id}")
-        await FastAPICache.clear(namespace="todos_libros")
-
-        new_data = doc_ref.get().to_dict()
-        return {"id": book_id, **new_data}
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-@router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_book(
-    book_id: str,
-    current_user: dict = Depends(get_current_admin) 
-):
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Solo un usuario autenticado puede acceder a esos recursos"
-        )
-
-    db = firestore.client()
-
-    doc_ref = db.collection("books").document(book_id)
-    
-    if not doc_ref.get().exists:
-        raise HTTPException(status_code=404, detail="Libro no encontrado")
-
-    try:
-        doc_ref.delete()
-
-        await FastAPICache.get_backend().delete(f"book:{book_id}")
-        await FastAPICache.clear(namespace="todos_libros")
-        
-        return None 
-
-    except Exception as e:
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from google.cloud.firestore import AsyncClient
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import List, Optional
+import asyncio
+import time
+
+from app.models.libro_model import (
+    BookCreate,
+    BookUpdate,
+    BookResponse,
+    BookPage,
+    BookBatchRequest,
+    BookBatchItem,
+    SimilarBook,
+    BookSearchResult,
+    BookSuggestion
+)
+from app.core.security import get_token_user, get_current_admin
+from app.db import get_db, get_loader
+from app.utils import encode_cursor, decode_id_cursor
+from app.services.bulk_import import import_books, iter_lines, parse_csv, parse_ndjson
+from app.services.catalog_export import export_catalog, gzip_stream
+from app.services.catalog_indexes import index_book, unindex_book, indexes_ready
+from app.services.similar_books import similar_books_index
+from app.services.search_index import search_index
+from app.services.typeahead import typeahead_index
+from app.services.catalog_mirror import catalog_mirror
+from app.services.cache_config import (
+    cached,
+    route_key_builder,
+    invalidate_tags,
+    cache_key,
+    cache_tags,
+    read_entry,
+    write_entry
+)
+router = APIRouter()
+
+BOOK_CACHE_NAMESPACE = "libro"
+BOOK_CACHE_EXPIRE = 1800
+book_key_builder = route_key_builder("book_id", tags=("book:{book_id}",))
+
+
+def genre_tags(book_data: dict) -> List[str]:
+    """
+    Tags de cache de las páginas por género en las que aparece un libro.
+    """
+    return [f"genre:{g['genre']}" for g in book_data.get("genres") or [] if g.get("genre")]
+
+
+def book_from_snapshot(doc) -> dict:
+    data = doc.to_dict()
+    return {"id": doc.id, **data, "reviews": data.get("reviews", [])}
+
+
+@router.post("/", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
+async def create_book(
+    book: BookCreate,
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncClient = Depends(get_db)
+):
+    book_dict = book.model_dump(exclude_unset=True)
+    custom_id = book_dict.pop("id", None)
+    
+    defaults = {
+        "rating": 0.0,
+        "reviewCount": 0,
+        "reviews": [],
+        "createdBy": current_user['id'] 
+    }
+    final_data = {**book_dict, **defaults}
+
+    try:
+        if custom_id:
+            doc_ref = db.collection("books").document(custom_id)
+            if (await get_loader().load(doc_ref)).exists:
+                raise HTTPException(status_code=409, detail="Ya existe un libro con este ID")
+            await doc_ref.set(final_data)
+        else:
+            doc_ref = db.collection("books").document()
+            await doc_ref.set(final_data)
+
+        await invalidate_tags("catalog", *genre_tags(final_data))
+        index_book(doc_ref.id, final_data)
+
+        return {"id": doc_ref.id, **final_data}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+
+@router.post("/import")
+async def bulk_import_books(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Importación masiva: el cuerpo es NDJSON (un libro por línea) o CSV con cabecera.
+    Se procesa en streaming y devuelve el recuento y los errores por línea.
+    """
+    parse = parse_csv if format == "csv" else parse_ndjson
+
+    def log_progress(report: dict):
+        print(f"INFO:     Importación: {report['rows']} filas, {report['failed']} con error")
+
+    return await import_books(
+        parse(iter_lines(request.stream())),
+        created_by=current_user['id'],
+        on_progress=log_progress
+    )
+
+
+@router.get("/", response_model=BookPage, dependencies=[Depends(get_token_user)])
+@cached(
+    expire=1800,
+    namespace="todos_libros",
+    key_builder=route_key_builder("limit", "start_after", tags=("catalog",))
+)
+async def get_books(
+    limit: int = Query(20, ge=1, le=100),
+    start_after: Optional[str] = Query(None, description="Valor de 'nextCursor' de la página anterior"),
+    db: AsyncClient = Depends(get_db)
+):
+    """
+    Lista el catálogo paginado por ID de documento.
+    Cada página (limit + cursor) se cachea por separado.
+    """
+    last_id = None
+    if start_after:
+        try:
+            last_id = decode_id_cursor(start_after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+    if catalog_mirror.available:
+        books_list = catalog_mirror.page(limit, last_id)
+    else:
+        books_ref = db.collection("books")
+        query = books_ref.order_by(FieldPath.document_id()).limit(limit + 1)
+
+        if last_id:
+            query = query.start_after({FieldPath.document_id(): books_ref.document(last_id)})
+
+        books_list = []
+        async for doc in query.stream():
+            data = doc.to_dict()
+            books_list.append({
+                "id": doc.id, 
+                **data,
+                "reviewCount": data.get("reviewCount", 0) 
+            })
+
+    next_cursor = None
+    if len(books_list) > limit:
+        books_list = books_list[:limit]
+        next_cursor = encode_cursor({"id": books_list[-1]["id"]})
+
+    return {"items": books_list, "nextCursor": next_cursor}
+
+@router.get("/search", response_model=List[BookSearchResult], dependencies=[Depends(get_token_user)])
+async def search_books(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Búsqueda por texto en título, autor y descripción, ordenada por BM25.
+    No distingue mayúsculas ni acentos.
+    """
+    if not indexes_ready():
+        raise HTTPException(status_code=503, detail="El índice de búsqueda aún no está disponible")
+
+    return search_index.search(q, limit)
+
+@router.get("/suggest", response_model=List[BookSuggestion], dependencies=[Depends(get_token_user)])
+async def suggest_books(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=20)
+):
+    """
+    Autocompletado de títulos y autores por prefijo, los más reseñados primero.
+    """
+    if not indexes_ready():
+        raise HTTPException(status_code=503, detail="El índice de sugerencias aún no está disponible")
+
+    return typeahead_index.suggest(prefix, limit)
+
+@router.get("/genre/{genero}", response_model=List[BookResponse], dependencies=[Depends(get_token_user)])
+@cached(
+    expire=1800,
+    namespace="libros_genero",
+    key_builder=route_key_builder("genero", tags=("genre:{genero}",))
+)
+async def get_books_by_genre(
+    genero: str,
+    db: AsyncClient = Depends(get_db)
+):
+    if catalog_mirror.available:
+        return catalog_mirror.by_genre(genero)
+
+    genre_query_object = {"genre": genero}
+    
+    try:
+        query = db.collection("books").where("genres", "array_contains", genre_query_object)
+        docs = query.stream()
+        
+        results = []
+        async for doc in docs:
+            data = doc.to_dict()
+            results.append({"id": doc.id, **data, "reviews": data.get("reviews", [])})
+            
+        return results
+    except Exception as e:
+        print(f"Error buscando genero: {e}")
+        return []
+
+@router.get("/export", dependencies=[Depends(get_current_admin)])
+async def export_books(
+    include_reviews: bool = True,
+    gzip: bool = False,
+    start_after: Optional[str] = Query(None, description="Último 'cursor' de checkpoint recibido")
+):
+    """
+    Volcado NDJSON del catálogo (y sus reseñas) en streaming, con memoria constante.
+    """
+    # Se valida antes de empezar a responder: dentro del generador ya no se puede devolver un 400
+    if start_after:
+        try:
+            decode_id_cursor(start_after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor de exportación inválido")
+
+    stream = export_catalog(include_reviews=include_reviews, start_after=start_after)
+
+    if gzip:
+        return StreamingResponse(
+            gzip_stream(stream),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="catalog.ndjson.gz"'}
+        )
+
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+@router.post("/batch", response_model=List[BookBatchItem], dependencies=[Depends(get_token_user)])
+async def get_books_batch(
+    request: BookBatchRequest,
+    db: AsyncClient = Depends(get_db)
+):
+    """
+    Devuelve varios libros en el orden pedido.
+    Los que están en cache salen de las entradas book:{id}; el resto se
+    leen con un único get_all y se guardan en cache para get_book_by_id.
+    """
+    unique_ids = list(dict.fromkeys(request.ids))
+    keys = {
+        book_id: cache_key(BOOK_CACHE_NAMESPACE, book_key_builder, book_id=book_id)
+        for book_id in unique_ids
+    }
+
+    entries = await asyncio.gather(*(read_entry(keys[book_id]) for book_id in unique_ids))
+    now = time.time()
+    books = {
+        book_id: entry["value"]
+        for book_id, entry in zip(unique_ids, entries)
+        if entry is not None and entry["freshUntil"] >= now
+    }
+
+    missing = [book_id for book_id in unique_ids if book_id not in books]
+    if missing:
+        refs = [db.collection("books").document(book_id) for book_id in missing]
+
+        for doc in await get_loader().load_many(refs):
+            if doc.exists:
+                books[doc.id] = book_from_snapshot(doc)
+                await write_entry(
+                    keys[doc.id], books[doc.id], BOOK_CACHE_EXPIRE,
+                    tags=cache_tags(book_key_builder, book_id=doc.id)
+                )
+
+    return [
+        {"id": book_id, "found": book_id in books, "book": books.get(book_id)}
+        for book_id in request.ids
+    ]
+
+@router.get("/{book_id}", response_model=BookResponse, dependencies=[Depends(get_token_user)])
+@cached(
+    expire=BOOK_CACHE_EXPIRE,
+    namespace=BOOK_CACHE_NAMESPACE,
+    key_builder=book_key_builder
+)
+async def get_book_by_id(
+    book_id: str,
+    db: AsyncClient = Depends(get_db)
+):
+    if catalog_mirror.available:
+        book = catalog_mirror.get(book_id)
+        if book is None:
+            raise HTTPException(status_code=404, detail="Libro no encontrado")
+        return book
+
+    doc_ref = db.collection("books").document(book_id)
+    doc = await get_loader().load(doc_ref)
+
+    if not doc.exists:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+
+    return book_from_snapshot(doc)
+
+@router.get("/{book_id}/similar", response_model=List[SimilarBook], dependencies=[Depends(get_token_user)])
+async def get_similar_books(
+    book_id: str,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    "Más como este": libros parecidos por géneros, autor y título.
+    Se resuelve con el índice MinHash en memoria, sin leer Firestore.
+    """
+    if not indexes_ready():
+        raise HTTPException(status_code=503, detail="El índice de libros similares aún no está disponible")
+
+    if book_id not in similar_books_index:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+
+    return similar_books_index.similar(book_id, limit)
+
+@router.patch("/{book_id}", response_model=BookResponse)
+async def update_book(
+    book_id: str, 
+    updates: BookUpdate,
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncClient = Depends(get_db)
+):
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo un usuario administrador autenticado puede acceder a esos recursos"
+        )
+
+
+    loader = get_loader()
+    doc_ref = db.collection("books").document(book_id)
+    snapshot = await loader.load(doc_ref)
+    
+    if not snapshot.exists:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+
+    data_to_update = {k: v for k, v in updates.model_dump().items() if v is not None}
+    
+    if not data_to_update:
+        current_data = snapshot.to_dict()
+        return {"id": book_id, **current_data}
+
+    try:
+        await doc_ref.update(data_to_update)
+        loader.clear(doc_ref)
+        
+        # Géneros antiguos y nuevos: el libro puede entrar o salir de esas páginas
+        await invalidate_tags(
+            f"book:{book_id}",
+            "catalog",
+            *genre_tags(snapshot.to_dict()),
+            *genre_tags(data_to_update)
+        )
+
+        # update() solo sustituye campos de primer nivel: no hace falta releer el documento
+        new_data = {**snapshot.to_dict(), **data_to_update}
+        index_book(book_id, new_data)
+        return {"id": book_id, **new_data}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+@router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_book(
+    book_id: str,
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncClient = Depends(get_db)
+):
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo un usuario autenticado puede acceder a esos recursos"
+        )
+
+    loader = get_loader()
+    doc_ref = db.collection("books").document(book_id)
+    snapshot = await loader.load(doc_ref)
+    
+    if not snapshot.exists:
+        raise HTTPException(status_code=404, detail="Libro no encontrado")
+
+    try:
+        await doc_ref.delete()
+        loader.clear(doc_ref)
+
+        await invalidate_tags(f"book:{book_id}", "catalog", *genre_tags(snapshot.to_dict()))
+        unindex_book(book_id)
+        
+        return None 
+
+    except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
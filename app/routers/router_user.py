@@ -1,67 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from firebase_admin import auth, firestore
-from app.models.user_model import UsuarioPublic, UsuarioUpdate, PasswordChange
-from app.core import get_current_user
-
-router = APIRouter()
-
-@router.get("/me", response_model=UsuarioPublic)
-async def read_users_me(current_user: dict = Depends(get_current_user)):
-    return current_user
-
-
-@router.patch("/me", response_model=UsuarioPublic)
-async def update_user_me(
-    datos: UsuarioUpdate, 
-    current_user: dict = Depends(get_current_user)
-):
-    db = firestore.client()
-    
-    uid = current_user['id']
-    update_data = {k: v for k, v in datos.dict().items() if v is not None}
-    
-    if not update_data:
-        return current_user
-    
-    try:
-        user_ref = db.collection("users").document(uid)
-        user_ref.update(update_data)
-        
-        if 'username' in update_data:
-            auth.update_user(uid, display_name=update_data['username'])
-
-        return {**current_user, **update_data}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al actualizar: {str(e)}")
-    
-
-@router.post("/me/change-password")
-async def change_password(
-    datos: PasswordChange,
-    current_user: dict = Depends(get_current_user)
-):
-    db = firestore.client()
-
-    uid = current_user['id']
-    try:
-        auth.update_user(uid, password=datos.password)
-        return {"message": "Contraseña actualizada correctamente"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-
-@router.delete("/me")
-async def delete_account(current_user: dict = Depends(get_current_user)):
-    db = firestore.client()
-    
-
-    uid = current_user['id']
-    try:
-        auth.delete_user(uid)
-        
-        db.collection("users").document(uid).delete()
-        
-        return {"message": "Cuenta eliminada permanentemente"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
+from firebase_admin import auth
+from google.cloud.firestore import AsyncClient
+from typing import List
+from app.models.user_model import UsuarioPublic, UsuarioUpdate, PasswordChange, RoleUpdate
+from app.models.libro_model import BookRecommendation
+from app.core import (
+    get_current_user,
+    get_token_user,
+    get_current_admin,
+    invalidate_user_cache,
+    forget_user_tokens,
+    sync_user_claims
+)
+from app.db import get_db, get_loader
+from app.services.cache_config import invalidate_tags
+from app.services.recommendations import get_recommendations
+
+router = APIRouter()
+
+@router.get("/me", response_model=UsuarioPublic)
+async def read_users_me(current_user: dict = Depends(get_current_user)):
+    return current_user
+
+
+@router.get("/me/recommendations", response_model=List[BookRecommendation])
+async def read_my_recommendations(
+    limit: int = Query(20, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Libros recomendados a partir de las reseñas del usuario y sus géneros preferidos.
+    Se sirven de los vecinos precalculados por app.jobs.build_recommendations.
+    """
+    return await get_recommendations(
+        current_user['id'],
+        current_user.get('preferences') or [],
+        limit
+    )
+
+
+@router.patch("/me", response_model=UsuarioPublic)
+async def update_user_me(
+    datos: UsuarioUpdate, 
+    current_user: dict = Depends(get_current_user),
+    db: AsyncClient = Depends(get_db)
+):
+    uid = current_user['id']
+    update_data = {k: v for k, v in datos.dict().items() if v is not None}
+    
+    if not update_data:
+        return current_user
+    
+    try:
+        user_ref = db.collection("users").document(uid)
+        await user_ref.update(update_data)
+        invalidate_user_cache(uid)
+
+        if 'preferences' in update_data:
+            await invalidate_tags(f"recommendations:{uid}")
+        
+        if 'username' in update_data:
+            await run_in_threadpool(auth.update_user, uid, display_name=update_data['username'])
+
+        return {**current_user, **update_data}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar: {str(e)}")
+    
+
+@router.post("/me/change-password")
+async def change_password(
+    datos: PasswordChange,
+    current_user: dict = Depends(get_token_user)
+):
+    uid = current_user['id']
+    try:
+        await run_in_threadpool(auth.update_user, uid, password=datos.password)
+        return {"message": "Contraseña actualizada correctamente"}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+
+@router.delete("/me")
+async def delete_account(
+    current_user: dict = Depends(get_token_user),
+    db: AsyncClient = Depends(get_db)
+):
+    uid = current_user['id']
+    try:
+        await run_in_threadpool(auth.delete_user, uid)
+        
+        await db.collection("users").document(uid).delete()
+        invalidate_user_cache(uid)
+        # Sin esto, las rutas que solo miran el token lo seguirían aceptando hasta su TTL
+        forget_user_tokens(uid)
+        
+        return {"message": "Cuenta eliminada permanentemente"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/{uid}/role", response_model=UsuarioPublic)
+async def update_user_role(
+    uid: str,
+    datos: RoleUpdate,
+    current_user: dict = Depends(get_current_admin),
+    db: AsyncClient = Depends(get_db)
+):
+    """
+    Cambia el rol de un usuario (solo administradores): custom claims y perfil
+    en Firestore. Se revocan sus sesiones para que el rol anterior no siga
+    valiendo en los tokens ya emitidos.
+    Los claims se escriben primero porque son los que autorizan; si después
+    falla la escritura del perfil se restauran, para que ambos coincidan.
+    """
+    user_ref = db.collection("users").document(uid)
+    user_doc = await get_loader().load(user_ref)
+
+    if not user_doc.exists:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    previous_role = user_doc.to_dict().get("role") or "lector"
+
+    try:
+        await sync_user_claims(uid, datos.role)
+        try:
+            await user_ref.update({"role": datos.role})
+        except Exception:
+            await sync_user_claims(uid, previous_role)
+            raise
+        await run_in_threadpool(auth.revoke_refresh_tokens, uid)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al cambiar el rol: {str(e)}")
+    finally:
+        invalidate_user_cache(uid)
+        forget_user_tokens(uid)
+
+    return {**user_doc.to_dict(), "id": uid, "role": datos.role}
\ No newline at end of file
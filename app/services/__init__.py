@@ -1,4 +1,55 @@
-from .cache_config import (
-    init_cache,
-    book_key_builder
+from .cache_config import (
+    init_cache,
+    close_cache,
+    cache_stats,
+    invalidate_tags,
+    route_key_builder,
+    cache_key,
+    cache_tags,
+    read_entry,
+    write_entry,
+    cached
+)
+from .http_client import (
+    init_http_client,
+    close_http_client,
+    get_http_client
+)
+from .book_stats import (
+    add_rating,
+    materialize_book_stats,
+    schedule_materialization,
+    flush_materializations
+)
+from .bulk_import import (
+    import_books,
+    iter_lines,
+    parse_csv,
+    parse_ndjson
+)
+from .catalog_export import (
+    export_catalog,
+    gzip_stream
+)
+from .recommendations import (
+    compute_recommendations,
+    get_recommendations
+)
+from .catalog_indexes import (
+    register_index,
+    load_catalog_indexes,
+    start_catalog_indexes,
+    stop_catalog_indexes,
+    index_book,
+    unindex_book,
+    index_stats
+)
+from .similar_books import similar_books_index
+from .search_index import search_index
+from .typeahead import typeahead_index
+from .catalog_mirror import (
+    catalog_mirror,
+    start_catalog_mirror,
+    stop_catalog_mirror,
+    mirror_stats
 )
\ No newline at end of file
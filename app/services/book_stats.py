@@ -0,0 +1,170 @@
+from firebase_admin import firestore
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import random
+
+from app.core import settings
+from app.db import get_db
+from app.services.cache_config import invalidate_tags
+from app.services.catalog_indexes import index_book, indexed_book
+
+SHARDS_COLLECTION = "rating_shards"
+HISTOGRAM_BUCKETS = [str(star) for star in range(1, 11)]
+
+# Materializaciones pendientes por libro (debounce dentro del proceso)
+_pending: Dict[str, asyncio.Future] = {}
+# Todas las programadas que aún no terminaron (esperando o escribiendo)
+_running: Set[asyncio.Future] = set()
+
+
+def rating_bucket(rating: float) -> str:
+    """
+    Estrella (1-10) a la que cuenta un rating en el histograma; redondea .5 hacia arriba.
+    """
+    return str(min(10, max(1, int(rating + 0.5))))
+
+
+def add_rating(writer, book_ref, added: Optional[float] = None, removed: Optional[float] = None):
+    """
+    Suma el cambio a uno de los N shards del libro con incrementos atómicos:
+    crear una reseña pasa `added`, borrarla `removed` y editar su rating ambos.
+    `writer` puede ser un batch o una transacción; así varias reseñas del
+    mismo libro no compiten por escribir el documento books/{id}.
+    """
+    histogram = {}
+    if added is not None:
+        histogram[rating_bucket(added)] = histogram.get(rating_bucket(added), 0) + 1
+    if removed is not None:
+        histogram[rating_bucket(removed)] = histogram.get(rating_bucket(removed), 0) - 1
+
+    shard_id = str(random.randrange(settings.RATING_SHARDS))
+    shard_ref = book_ref.collection(SHARDS_COLLECTION).document(shard_id)
+
+    changes = {
+        "sum": firestore.Increment((added or 0) - (removed or 0)),
+        "count": firestore.Increment((added is not None) - (removed is not None)),
+    }
+    # Una edición dentro de la misma estrella no toca el histograma; un mapa
+    # vacío con merge=True sustituiría "hist" entero y borraría el del shard
+    hist = {bucket: firestore.Increment(delta) for bucket, delta in histogram.items() if delta}
+    if hist:
+        changes["hist"] = hist
+
+    writer.set(shard_ref, changes, merge=True)
+
+
+async def read_totals(book_ref, transaction=None) -> Tuple[float, int, Dict[str, int]]:
+    """
+    Suma de ratings, número de reseñas e histograma a partir de los shards.
+    """
+    total, count = 0.0, 0
+    histogram = dict.fromkeys(HISTOGRAM_BUCKETS, 0)
+    async for shard in book_ref.collection(SHARDS_COLLECTION).stream(transaction=transaction):
+        data = shard.to_dict()
+        total += data.get("sum", 0)
+        count += data.get("count", 0)
+        for bucket, value in (data.get("hist") or {}).items():
+            if bucket in histogram:
+                histogram[bucket] += value
+
+    return total, count, histogram
+
+
+async def latest_reviews(book_ref, limit: int, transaction=None) -> List[dict]:
+    """
+    Las `limit` reseñas más recientes, en el formato de ReviewEmbedded.
+    """
+    query = (
+        book_ref.collection("reviews")
+        .order_by("createdAt", direction=firestore.Query.DESCENDING)
+        .limit(limit)
+    )
+
+    snippet = []
+    async for doc in query.stream(transaction=transaction):
+        data = doc.to_dict()
+        snippet.append({
+            "id": doc.id,
+            "reviewerName": data.get("reviewerName", "Anonymous"),
+            "rating": data.get("rating", 0),
+            "reviewText": data.get("reviewText", ""),
+            "hasSpoilers": data.get("hasSpoilers", False),
+            "avatar": data.get("avatar"),
+            "createdAt": data.get("createdAt"),
+        })
+
+    return snippet
+
+
+async def materialize_book_stats(book_id: str):
+    """
+    Escribe en el documento del libro, en una sola actualización, el rating,
+    reviewCount e histograma agregados de los shards y las últimas reseñas. Así la ficha
+    del libro se sirve con una única lectura.
+    Lectura y escritura van en una transacción: si otro worker suma una
+    reseña entre medias se reintenta, y un agregado viejo nunca se escribe
+    encima de uno más nuevo.
+    """
+    db = get_db()
+    book_ref = db.collection("books").document(book_id)
+
+    @firestore.async_transactional
+    async def write_stats(transaction):
+        total, count, histogram = await read_totals(book_ref, transaction)
+        snippet = await latest_reviews(book_ref, settings.REVIEW_SNIPPET_SIZE, transaction)
+
+        stats = {"rating": total / count if count else 0.0, "reviewCount": count}
+        transaction.update(book_ref, {**stats, "ratingHistogram": histogram, "reviews": snippet})
+        return stats
+
+    stats = await write_stats(db.transaction())
+    await invalidate_tags(f"book:{book_id}")
+
+    # reviewCount es el peso de las sugerencias del autocompletado
+    if indexed_book(book_id) is not None:
+        index_book(book_id, stats)
+
+
+async def _materialize_logged(book_id: str):
+    try:
+        await materialize_book_stats(book_id)
+    except Exception as e:
+        print(f"Error materializando estadísticas de {book_id}: {e}")
+
+
+def schedule_materialization(book_id: str):
+    """
+    Programa la materialización del libro tras RATING_MATERIALIZE_DELAY segundos.
+    Una ráfaga de reseñas sobre el mismo libro produce una sola escritura.
+    """
+    if book_id in _pending:
+        return
+
+    async def run():
+        await asyncio.sleep(settings.RATING_MATERIALIZE_DELAY)
+        # Se libera antes de leer los shards: lo que llegue después reprograma
+        _pending.pop(book_id, None)
+        await _materialize_logged(book_id)
+
+    task = asyncio.ensure_future(run())
+    _pending[book_id] = task
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+async def flush_materializations():
+    """
+    Materializa ya los libros que esperaban el debounce y espera a las
+    materializaciones en curso. Se llama al apagar la app: sin esto, un
+    reinicio dentro de la ventana dejaría rating, reviewCount, histograma y
+    últimas reseñas desactualizados hasta la siguiente reseña del libro.
+    """
+    waiting = list(_pending)
+    for book_id in waiting:
+        _pending.pop(book_id).cancel()
+
+    await asyncio.gather(
+        *list(_running),
+        *(_materialize_logged(book_id) for book_id in waiting),
+        return_exceptions=True
+    )
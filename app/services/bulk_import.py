@@ -0,0 +1,258 @@
+from pydantic import ValidationError
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Tuple
+import asyncio
+import csv
+import io
+import json
+
+from app.core import settings
+from app.db import get_db
+from app.models.libro_model import BookCreate
+from app.services.cache_config import invalidate_tags
+from app.services.catalog_indexes import index_book
+from app.utils import is_document_id
+
+MAX_REPORTED_ERRORS = 1000
+
+# Lo que deja la decodificación en lugar de cada byte UTF-8 inválido
+REPLACEMENT_CHAR = "\ufffd"
+INVALID_UTF8 = "La fila contiene bytes que no son UTF-8 válido"
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Parte un flujo de bytes (p.ej. request.stream()) en líneas de texto
+    sin cargar el cuerpo completo en memoria. Un byte inválido no corta la
+    importación: se sustituye por REPLACEMENT_CHAR y los parsers informan
+    esa fila como errónea.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def parse_ndjson(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, object]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        if REPLACEMENT_CHAR in line:
+            yield line_no, ValueError(INVALID_UTF8)
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, ValueError(f"JSON inválido: {e}")
+
+
+async def parse_csv(lines: AsyncIterable[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    CSV con cabecera: id,title,author,coverImage,coverAlt,description,genres
+    (los géneros separados por '|'). Admite campos entre comillas con saltos de línea.
+    """
+    header = None
+    buffer = ""
+    line_no = 0
+    start_line = 0
+
+    async for line in lines:
+        line_no += 1
+        if not buffer:
+            start_line = line_no
+        buffer = f"{buffer}\n{line}" if buffer else line
+
+        # Comillas impares: el registro continúa en la siguiente línea
+        if buffer.count('"') % 2 == 1:
+            continue
+
+        record, buffer = buffer, ""
+        if not record.strip():
+            continue
+
+        values = next(csv.reader(io.StringIO(record)))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if REPLACEMENT_CHAR in record:
+            yield start_line, ValueError(INVALID_UTF8)
+            continue
+
+        row = dict(zip(header, values))
+        if row.get("genres") is not None:
+            row["genres"] = [g.strip() for g in row["genres"].split("|") if g.strip()]
+        if not row.get("id"):
+            row.pop("id", None)
+
+        yield start_line, row
+
+
+def validate_row(row) -> BookCreate:
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("Cada fila debe ser un objeto")
+
+    genres = row.get("genres")
+    if isinstance(genres, list):
+        row = {**row, "genres": [{"genre": g} if isinstance(g, str) else g for g in genres]}
+
+    book = BookCreate.model_validate(row)
+    if book.id and not is_document_id(book.id):
+        raise ValueError("id inválido: debe ser un ID de documento sin '/'")
+
+    return book
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.tags = {"catalog"}
+
+    def add_error(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def _genre_tags(data: dict) -> List[str]:
+    return [f"genre:{g['genre']}" for g in data.get("genres") or [] if g.get("genre")]
+
+
+async def _commit_chunk(db, chunk: List[Tuple[int, BookCreate]], created_by: str) -> List[Tuple[str, dict, Optional[dict]]]:
+    """
+    Escribe un bloque en un solo batch. Los IDs que ya existen se actualizan
+    con merge (sin tocar rating, reviewCount ni reseñas); el resto se crean.
+    Devuelve (id, datos escritos, datos previos o None si el libro es nuevo).
+    """
+    books = db.collection("books")
+    rows = []
+    for _, book in chunk:
+        data = book.model_dump(exclude_unset=True)
+        custom_id = data.pop("id", None)
+        ref = books.document(custom_id) if custom_id else books.document()
+        rows.append((ref, data, custom_id))
+
+    existing = {}
+    custom_refs = [ref for ref, _, custom_id in rows if custom_id]
+    if custom_refs:
+        async for snap in db.get_all(custom_refs):
+            if snap.exists:
+                existing[snap.id] = snap.to_dict()
+
+    batch = db.batch()
+    for ref, data, _ in rows:
+        if ref.id in existing:
+            batch.set(ref, data, merge=True)
+        else:
+            batch.set(ref, {**data, "rating": 0.0, "reviewCount": 0, "reviews": [], "createdBy": created_by})
+
+    await batch.commit()
+    return [(ref.id, data, existing.get(ref.id)) for ref, data, _ in rows]
+
+
+async def _write_chunk(db, chunk: List[Tuple[int, BookCreate]], created_by: str, report: ImportReport):
+    """
+    Escribe el bloque y lo anota en el informe. Cualquier fallo (lectura de
+    los existentes o commit) marca todas sus filas como erróneas.
+    """
+    try:
+        written = await _commit_chunk(db, chunk, created_by)
+    except Exception as e:
+        for line, _ in chunk:
+            report.add_error(line, f"Error escribiendo el bloque: {e}")
+        return
+
+    for book_id, data, previous in written:
+        if previous is None:
+            report.created += 1
+        else:
+            report.updated += 1
+            report.tags.add(f"book:{book_id}")
+            # Las páginas de los géneros que el libro pierde también cambian
+            report.tags.update(_genre_tags(previous))
+        report.tags.update(_genre_tags(data))
+
+        try:
+            index_book(book_id, data)
+        except Exception as e:
+            print(f"ERROR:    No se pudo indexar el libro {book_id}: {e}")
+
+
+def _log_task_error(task: asyncio.Future):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"ERROR:    Error en un bloque de la importación: {task.exception()}")
+
+
+async def import_books(
+    rows: AsyncIterable[Tuple[int, object]],
+    created_by: str,
+    on_progress: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """
+    Valida cada fila con BookCreate y escribe en bloques de IMPORT_BATCH_SIZE,
+    con como mucho IMPORT_CONCURRENCY commits en vuelo. El cache del catálogo
+    se invalida una sola vez al terminar, también si la entrada se corta a medias.
+    """
+    db = get_db()
+    report = ImportReport()
+    semaphore = asyncio.Semaphore(settings.IMPORT_CONCURRENCY)
+    tasks = set()
+    chunk: List[Tuple[int, BookCreate]] = []
+
+    async def flush(current_chunk):
+        try:
+            await _write_chunk(db, current_chunk, created_by, report)
+        finally:
+            semaphore.release()
+            if on_progress:
+                on_progress(report.to_dict())
+
+    async def submit(current_chunk):
+        # Esperar turno aquí da contrapresión: no se lee más entrada de la que se puede escribir
+        await semaphore.acquire()
+        task = asyncio.ensure_future(flush(current_chunk))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        task.add_done_callback(_log_task_error)
+
+    try:
+        async for line, row in rows:
+            report.rows += 1
+            try:
+                chunk.append((line, validate_row(row)))
+            except (ValidationError, ValueError) as e:
+                report.add_error(line, str(e))
+                continue
+
+            if len(chunk) >= settings.IMPORT_BATCH_SIZE:
+                await submit(chunk)
+                chunk = []
+
+        if chunk:
+            await submit(chunk)
+    finally:
+        # Los bloques ya enviados terminan (y se invalidan) aunque la lectura falle
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await invalidate_tags(*report.tags)
+
+    return report.to_dict()
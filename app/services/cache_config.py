@@ -1,24 +1,402 @@
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
-from fastapi_cache.coder import PickleCoder
-
-async def init_cache():
-    FastAPICache.init(
-        backend = InMemoryBackend(), 
-        prefix = "Clankers_API_Cache",
-        coder = PickleCoder
-    )
-
-def book_key_builder(
-    func,
-    namespace: str = "",
-    request = None,
-    response = None,
-    *args,
-    **kwargs
-):    
-    prefix = namespace if namespace else "Clankers_API_Cache"
-
-    item_id = kwargs.get("kwargs", {}).get("libro_id") or kwargs.get("kwargs",{}).get("id")
-
-    return f"{prefix}:{item_id}"
\ No newline at end of file
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.coder import Coder, PickleCoder
+from fastapi_cache.types import Backend
+from redis.asyncio import ConnectionPool, Redis
+from collections import defaultdict
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import asyncio
+import datetime
+import json
+import time
+
+from app.core import settings
+from app.core.metrics import CallbackCounter
+from app.core.timing import timed
+
+CACHE_PREFIX = "Clankers_API_Cache"
+
+_redis: Optional[Redis] = None
+
+# Cálculos en curso por clave (single-flight dentro del proceso)
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+
+class CompactJsonCoder(Coder):
+    """
+    Guarda la respuesta ya serializada como JSON compacto (UTF-8),
+    legible desde cualquier worker o lenguaje.
+    """
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        # jsonable_encoder solo para lo que json no sabe serializar (fechas, modelos):
+        # recorrer toda la respuesta con él multiplicaba por 40 el coste de guardarla
+        return json.dumps(
+            value, separators=(",", ":"), ensure_ascii=False, default=_json_default
+        ).encode()
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return json.loads(value)
+
+
+CODERS = {
+    "json": CompactJsonCoder,
+    "pickle": PickleCoder,
+}
+
+
+class MemoryTagIndex:
+    """
+    Índice tag -> claves de cache, para el backend en memoria.
+    """
+
+    def __init__(self):
+        self._keys = defaultdict(set)
+
+    async def add(self, key: str, tags: Iterable[str]):
+        for tag in tags:
+            self._keys[tag].add(key)
+
+    async def invalidate(self, backend: Backend, tags: Iterable[str]) -> int:
+        keys = set()
+        for tag in tags:
+            keys |= self._keys.pop(tag, set())
+
+        for key in keys:
+            try:
+                await backend.clear(key=key)
+            except KeyError:
+                # La entrada ya había expirado
+                pass
+
+        return len(keys)
+
+
+class RedisTagIndex:
+    """
+    Índice tag -> claves guardado en sets de Redis, compartido por todos los workers.
+    """
+
+    # Une los sets de los tags, borra las claves y los propios sets en un solo viaje
+    INVALIDATE_SCRIPT = """
+    local keys = redis.call('SUNION', unpack(KEYS))
+    for i = 1, #keys, 500 do
+        redis.call('DEL', unpack(keys, i, math.min(i + 499, #keys)))
+    end
+    redis.call('DEL', unpack(KEYS))
+    return #keys
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{CACHE_PREFIX}:tag:{tag}"
+
+    async def add(self, key: str, tags: Iterable[str]):
+        pipe = self.redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), key)
+            pipe.expire(self._tag_key(tag), settings.CACHE_TAG_TTL)
+        await pipe.execute()
+
+    async def invalidate(self, backend: Backend, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        return await self.redis.eval(self.INVALIDATE_SCRIPT, len(tag_keys), *tag_keys)
+
+
+class InstrumentedBackend(Backend):
+    """
+    Envuelve el backend real: cuenta aciertos y fallos por namespace.
+    `tag_index` es el índice de tags que usan write_entry e invalidate_tags.
+    """
+
+    def __init__(self, backend: Backend, tag_index):
+        self.backend = backend
+        self.tag_index = tag_index
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.stale = defaultdict(int)
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        ttl, value = await self.backend.get_with_ttl(key)
+        if value is None:
+            self.misses[_namespace_of(key)] += 1
+        else:
+            self.hits[_namespace_of(key)] += 1
+        return ttl, value
+
+    def record_stale(self, key: str):
+        self.stale[_namespace_of(key)] += 1
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await self.backend.set(key, value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        return await self.backend.clear(namespace, key)
+
+
+def _namespace_of(key: str) -> str:
+    if key.startswith(f"{CACHE_PREFIX}:"):
+        key = key[len(CACHE_PREFIX) + 1:]
+    return key.split(":", 1)[0]
+
+
+async def init_cache():
+    """
+    Elige el backend según CACHE_BACKEND. Con Redis todos los workers
+    comparten entradas e invalidaciones a través de un pool de conexiones.
+    """
+    global _redis
+
+    if settings.CACHE_BACKEND == "redis":
+        pool = ConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS
+        )
+        _redis = Redis(connection_pool=pool)
+        backend = InstrumentedBackend(RedisBackend(_redis), RedisTagIndex(_redis))
+    else:
+        backend = InstrumentedBackend(InMemoryBackend(), MemoryTagIndex())
+
+    FastAPICache.init(
+        backend = backend, 
+        prefix = CACHE_PREFIX,
+        coder = CODERS[settings.CACHE_CODER]
+    )
+
+
+async def close_cache():
+    global _redis
+    if _redis is not None:
+        await _redis.connection_pool.disconnect()
+        _redis = None
+
+
+async def invalidate_tags(*tags: str) -> int:
+    """
+    Borra todas las entradas que dependen de alguno de los tags
+    (p.ej. "book:{id}", "genre:{nombre}", "catalog"). Devuelve cuántas eran.
+    """
+    tags = [tag for tag in tags if tag]
+    if not tags:
+        return 0
+
+    try:
+        backend = FastAPICache.get_backend()
+    except AssertionError:
+        # Cache sin inicializar (p.ej. desde un job de línea de comandos)
+        return 0
+
+    return await backend.tag_index.invalidate(backend.backend, tags)
+
+
+def cache_stats() -> dict:
+    """
+    Aciertos, fallos y tasa de acierto del cache, en total y por namespace.
+    """
+    backend = FastAPICache.get_backend()
+    if not isinstance(backend, InstrumentedBackend):
+        return {}
+
+    def summary(hits: int, misses: int, stale: int) -> dict:
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "staleServed": stale,
+            "hitRate": round(hits / total, 4) if total else 0.0
+        }
+
+    namespaces = sorted(set(backend.hits) | set(backend.misses))
+    return {
+        **summary(
+            sum(backend.hits.values()),
+            sum(backend.misses.values()),
+            sum(backend.stale.values())
+        ),
+        "namespaces": {
+            ns: summary(backend.hits[ns], backend.misses[ns], backend.stale[ns]) for ns in namespaces
+        }
+    }
+
+
+def _cache_samples() -> dict:
+    try:
+        namespaces = cache_stats().get("namespaces", {})
+    except AssertionError:
+        # Cache sin inicializar
+        return {}
+
+    samples = {}
+    for ns, stats in namespaces.items():
+        samples[(ns, "hit")] = stats["hits"]
+        samples[(ns, "miss")] = stats["misses"]
+        samples[(ns, "stale")] = stats["staleServed"]
+    return samples
+
+
+CallbackCounter(
+    "clankers_cache_requests_total",
+    "Lecturas del cache por namespace: hit, miss y stale (servida caducada mientras se refresca).",
+    ("namespace", "result"),
+    _cache_samples
+)
+
+
+def route_key_builder(*params: str, tags: Iterable[str] = ()):
+    """
+    Genera un key_builder para @cached que solo usa el namespace de la ruta
+    y los parámetros indicados. Dependencias como current_user nunca forman
+    parte de la clave, así todos los lectores comparten la misma entrada.
+
+    `tags` son plantillas ("book:{book_id}") que se rellenan con los parámetros
+    de la llamada (key_builder.tags_for); invalidate_tags() borra las
+    entradas que los declaran.
+    """
+    tags = tuple(tags)
+
+    def tags_for(params: dict) -> Tuple[str, ...]:
+        return tuple(tag.format(**params) for tag in tags)
+
+    def key_builder(
+        func,
+        namespace: str = "",
+        request = None,
+        response = None,
+        *args,
+        **kwargs
+    ):
+        real_kwargs = kwargs.get("kwargs", {})
+        values = ["" if real_kwargs.get(p) is None else str(real_kwargs.get(p)) for p in params]
+        return ":".join([namespace, *values])
+
+    key_builder.tags_for = tags_for
+    return key_builder
+
+
+def cache_key(namespace: str, key_builder: Callable, **params) -> str:
+    """
+    Clave que usaría @cached(namespace=..., key_builder=...) para esos parámetros.
+    Permite leer o rellenar entradas de una ruta desde otra (p.ej. lecturas en lote).
+    """
+    return key_builder(None, f"{CACHE_PREFIX}:{namespace}", kwargs=params)
+
+
+def cache_tags(key_builder: Callable, **params) -> Tuple[str, ...]:
+    """
+    Tags que @cached declararía para esos parámetros; se pasan a write_entry.
+    """
+    tags_for = getattr(key_builder, "tags_for", None)
+    return tags_for(params) if tags_for else ()
+
+
+async def read_entry(key: str) -> Optional[dict]:
+    """
+    Devuelve {"value", "freshUntil"} o None si la clave no está en cache.
+    """
+    backend = FastAPICache.get_backend()
+    try:
+        with timed("cache"):
+            _, raw = await backend.get_with_ttl(key)
+    except Exception as e:
+        print(f"Error leyendo cache {key}: {e}")
+        return None
+
+    return None if raw is None else FastAPICache.get_coder().decode(raw)
+
+
+async def write_entry(
+    key: str,
+    value: Any,
+    expire: int,
+    stale_ttl: Optional[int] = None,
+    tags: Iterable[str] = ()
+):
+    """
+    Guarda la entrada y la registra en el índice bajo `tags`.
+    """
+    stale_ttl = settings.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+    entry = {"value": value, "freshUntil": time.time() + expire}
+    try:
+        with timed("cache"):
+            backend = FastAPICache.get_backend()
+            await backend.set(key, FastAPICache.get_coder().encode(entry), expire + stale_ttl)
+            if tags:
+                await backend.tag_index.add(key, tags)
+    except Exception as e:
+        print(f"Error guardando en cache {key}: {e}")
+
+
+def _single_flight(key: str, compute: Callable) -> asyncio.Future:
+    """
+    Devuelve el cálculo en curso para `key` o lanza uno nuevo.
+    Todas las peticiones concurrentes de la misma clave comparten el resultado.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return task
+
+
+def _log_refresh_error(task: asyncio.Future):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error refrescando cache en segundo plano: {task.exception()}")
+
+
+def cached(
+    expire: int,
+    namespace: str,
+    key_builder: Callable,
+    stale_ttl: Optional[int] = None
+):
+    """
+    Decorador de cache para rutas, sobre el backend y coder de FastAPICache.
+
+    - Entrada fresca (menos de `expire` segundos): se devuelve tal cual.
+    - Entrada caducada pero dentro de `stale_ttl`: se devuelve y una sola
+      tarea en segundo plano la recalcula (stale-while-revalidate).
+    - Sin entrada: las peticiones concurrentes de la misma clave esperan
+      un único cálculo (single-flight) en lugar de ir todas a Firestore.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = key_builder(func, f"{CACHE_PREFIX}:{namespace}", args=args, kwargs=kwargs)
+
+            async def compute():
+                value = await func(*args, **kwargs)
+                await write_entry(key, value, expire, stale_ttl, cache_tags(key_builder, **kwargs))
+                return value
+
+            entry = await read_entry(key)
+            if entry is None:
+                return await asyncio.shield(_single_flight(key, compute))
+
+            if entry["freshUntil"] < time.time():
+                FastAPICache.get_backend().record_stale(key)
+                if key not in _inflight:
+                    _single_flight(key, compute).add_done_callback(_log_refresh_error)
+
+            return entry["value"]
+
+        return wrapper
+
+    return decorator
\ No newline at end of file
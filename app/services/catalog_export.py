@@ -0,0 +1,67 @@
+from google.cloud.firestore_v1.field_path import FieldPath
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Optional
+import json
+import zlib
+
+from app.core import settings
+from app.db import get_db
+from app.utils import encode_cursor, decode_id_cursor, iter_pages
+
+FLUSH_BYTES = 64 * 1024
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _line(record: dict) -> bytes:
+    return (json.dumps(record, default=_json_default, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+
+async def export_catalog(include_reviews: bool = True, start_after: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Genera el catálogo como NDJSON:
+      {"type": "book", "id", "data"}
+      {"type": "review", "bookId", "id", "data"}   (si include_reviews)
+      {"type": "checkpoint", "cursor"}            tras cada libro completo
+    Para reanudar una exportación cortada se pasa el último cursor como start_after.
+    """
+    db = get_db()
+    books = db.collection("books")
+    query = books.order_by(FieldPath.document_id())
+
+    if start_after:
+        last_ref = books.document(decode_id_cursor(start_after))
+        query = query.start_after({FieldPath.document_id(): last_ref})
+
+    buffer = bytearray()
+    async for book in iter_pages(query, settings.EXPORT_PAGE_SIZE):
+        buffer += _line({"type": "book", "id": book.id, "data": book.to_dict()})
+
+        if include_reviews:
+            reviews = book.reference.collection("reviews").order_by(FieldPath.document_id())
+            async for review in iter_pages(reviews, settings.EXPORT_PAGE_SIZE):
+                buffer += _line({"type": "review", "bookId": book.id, "id": review.id, "data": review.to_dict()})
+                if len(buffer) >= FLUSH_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+
+        buffer += _line({"type": "checkpoint", "cursor": encode_cursor({"id": book.id})})
+        if len(buffer) >= FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31 = cabecera gzip
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,167 @@
+from google.cloud.firestore_v1.field_path import FieldPath
+from typing import AsyncIterable, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+from app.core import settings
+from app.db import get_db
+from app.utils import iter_pages
+
+# Campos del libro que usan los índices en memoria; el resto no se guarda
+INDEXED_FIELDS = ("title", "author", "description", "coverImage", "genres", "rating", "reviewCount")
+
+# Espera entre reintentos de la carga (segundos): se dobla tras cada fallo
+RETRY_MIN_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+
+# Tiempo máximo que la construcción ocupa el event loop antes de ceder el turno
+LOAD_SLICE_SECONDS = 0.02
+
+_indexes: List = []
+_books: Dict[str, dict] = {}
+_state = {"loaded": False, "loadedAt": None, "loadSeconds": None, "failures": 0, "lastError": None}
+_loader_task: Optional[asyncio.Future] = None
+
+# Escrituras hechas mientras se construyen los índices: id -> campos cambiados,
+# o None si el libro se borró. Mandan sobre lo que traigan las páginas leídas antes.
+_changes_during_load: Optional[Dict[str, Optional[dict]]] = None
+
+
+def register_index(index):
+    """
+    Registra un índice en memoria del catálogo. Debe implementar
+    add(book_id, book), remove(book_id) y clear().
+    """
+    _indexes.append(index)
+    return index
+
+
+def indexes_ready() -> bool:
+    return _state["loaded"]
+
+
+def indexed_book(book_id: str):
+    return _books.get(book_id)
+
+
+async def build_catalog_indexes(books: AsyncIterable[Tuple[str, dict]]) -> int:
+    """
+    Construye todos los índices registrados a partir de (id, datos).
+    Cede el event loop cada LOAD_SLICE_SECONDS: con 100k libros la
+    construcción dura decenas de segundos y no debe bloquear las peticiones.
+    Los libros que se crean, editan o borran mientras tanto quedan con su
+    última versión aunque su página se hubiera leído antes.
+    """
+    global _changes_during_load
+    started = time.perf_counter()
+
+    _books.clear()
+    for index in _indexes:
+        index.clear()
+
+    _changes_during_load = changes = {}
+    try:
+        slice_started = time.perf_counter()
+        async for book_id, data in books:
+            if book_id in changes:
+                if changes[book_id] is None:
+                    continue
+                data = {**data, **changes[book_id]}
+            _index(book_id, data)
+
+            if time.perf_counter() - slice_started >= LOAD_SLICE_SECONDS:
+                await asyncio.sleep(0)
+                slice_started = time.perf_counter()
+    finally:
+        _changes_during_load = None
+
+    _state.update(loaded=True, loadedAt=time.time(), loadSeconds=round(time.perf_counter() - started, 3))
+    return len(_books)
+
+
+async def load_catalog_indexes():
+    """
+    Lee el catálogo una sola vez (solo los campos indexados) y construye
+    los índices con build_catalog_indexes.
+    """
+    db = get_db()
+    query = (
+        db.collection("books")
+        .select(list(INDEXED_FIELDS))
+        .order_by(FieldPath.document_id())
+    )
+    return await build_catalog_indexes(
+        (doc.id, doc.to_dict()) async for doc in iter_pages(query, settings.EXPORT_PAGE_SIZE)
+    )
+
+
+async def _load_with_retries():
+    delay = RETRY_MIN_SECONDS
+    while True:
+        try:
+            total = await load_catalog_indexes()
+            _state["lastError"] = None
+            print(f"INFO:     Índices del catálogo cargados ({total} libros).")
+            return
+        except Exception as e:
+            _state["failures"] += 1
+            _state["lastError"] = str(e)
+            print(f"ERROR:    No se pudieron cargar los índices del catálogo (reintento en {delay:.0f}s): {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+
+def start_catalog_indexes():
+    """
+    Carga los índices en segundo plano y reintenta hasta conseguirlo: un fallo
+    de Firestore al arrancar no deja /search, /suggest y /similar en 503 para
+    siempre. Mientras tanto esas rutas responden 503.
+    """
+    global _loader_task
+    if _loader_task is None or _loader_task.done():
+        _loader_task = asyncio.ensure_future(_load_with_retries())
+
+
+async def stop_catalog_indexes():
+    global _loader_task
+    if _loader_task is not None and not _loader_task.done():
+        _loader_task.cancel()
+        try:
+            await _loader_task
+        except asyncio.CancelledError:
+            pass
+    _loader_task = None
+
+
+def _index(book_id: str, data: dict):
+    book = {**_books.get(book_id, {}), **{k: v for k, v in data.items() if k in INDEXED_FIELDS}}
+    _books[book_id] = book
+
+    for index in _indexes:
+        index.remove(book_id)
+        index.add(book_id, book)
+
+
+def index_book(book_id: str, data: dict):
+    """
+    Añade o actualiza un libro en todos los índices. `data` puede ser parcial
+    (p.ej. lo que cambió en un PATCH): se mezcla con lo ya indexado.
+    Solo cambia los índices de este proceso: con varios workers o réplicas,
+    los demás solo ven la escritura si tienen CATALOG_MIRROR_ENABLED.
+    """
+    if _changes_during_load is not None:
+        changed = {k: v for k, v in data.items() if k in INDEXED_FIELDS}
+        _changes_during_load[book_id] = {**(_changes_during_load.get(book_id) or {}), **changed}
+    _index(book_id, data)
+
+
+def unindex_book(book_id: str):
+    if _changes_during_load is not None:
+        _changes_during_load[book_id] = None
+    _books.pop(book_id, None)
+    for index in _indexes:
+        index.remove(book_id)
+
+
+def index_stats() -> dict:
+    return {**_state, "books": len(_books), "indexes": [type(index).__name__ for index in _indexes]}
@@ -0,0 +1,290 @@
+from bisect import bisect_left, bisect_right, insort
+from firebase_admin import firestore
+from typing import Dict, List, Optional, Set
+import asyncio
+import time
+
+from app.core import settings
+from app.services.cache_config import invalidate_tags
+from app.services.catalog_indexes import index_book, unindex_book
+
+
+def _genres(book: dict) -> Set[str]:
+    return {g["genre"] for g in book.get("genres") or [] if g.get("genre")}
+
+
+def _book(book_id: str, data: dict) -> dict:
+    return {"id": book_id, **data, "reviews": data.get("reviews", [])}
+
+
+class CatalogMirror:
+    """
+    Copia en memoria de la colección books, mantenida por un listener
+    on_snapshot de Firestore. El listener corre en un hilo del SDK; los
+    cambios se aplican en el event loop con call_soon_threadsafe, así que
+    las lecturas desde las rutas no necesitan locks.
+
+    Estado del listener: "stopped", "loading" (esperando la carga completa),
+    "live" o "failed". Una tarea supervisora comprueba el listener cada
+    CATALOG_MIRROR_CHECK_INTERVAL segundos y, si falló, abre uno nuevo cuya
+    primera instantánea recarga la copia.
+    """
+
+    def __init__(self):
+        self._books: Dict[str, dict] = {}
+        self._ids: List[str] = []
+        self._by_genre: Dict[str, Set[str]] = {}
+        self._watch = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loaded: Optional[asyncio.Event] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._timeout = settings.CATALOG_MIRROR_LOAD_TIMEOUT
+        self._synced = False
+        # Cada listener abierto tiene su número: se ignoran los cambios de uno ya sustituido
+        self._generation = 0
+        self.state = "stopped"
+        self.metrics = {
+            "snapshots": 0,
+            "changes": 0,
+            "errors": 0,
+            "resyncs": 0,
+            "lastLagSeconds": None,
+            "maxLagSeconds": 0.0,
+            "lastSnapshotAt": None,
+            "lastError": None,
+        }
+
+    # --- Listener ---
+
+    async def start(self, timeout: float):
+        """
+        Abre el listener y espera la carga completa. Si falla, la supervisión
+        sigue reintentando en segundo plano y el error se propaga.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._timeout = timeout
+        try:
+            await self._subscribe()
+        finally:
+            if self._supervisor is None:
+                self._supervisor = asyncio.ensure_future(self._supervise())
+
+    def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        self._close_watch()
+        self.state = "stopped"
+
+    def _close_watch(self):
+        self._generation += 1
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    async def _subscribe(self):
+        """
+        Sustituye el listener por uno nuevo y espera su primera instantánea.
+        """
+        self._close_watch()
+        generation = self._generation
+        self._loaded = asyncio.Event()
+        self.state = "loading"
+
+        def on_snapshot(docs, changes, read_time):
+            # Hilo del SDK: solo se reenvía al event loop
+            try:
+                self._loop.call_soon_threadsafe(self._apply, generation, changes, read_time)
+            except RuntimeError:
+                # El loop ya se cerró (apagado)
+                pass
+
+        try:
+            db = firestore.client()
+            self._watch = db.collection("books").on_snapshot(on_snapshot)
+            await asyncio.wait_for(self._loaded.wait(), self._timeout)
+        except Exception as e:
+            self._fail(e)
+            raise
+
+    def _fail(self, error):
+        self.state = "failed"
+        self.metrics["errors"] += 1
+        self.metrics["lastError"] = str(error) or type(error).__name__
+        print(f"ERROR:    Espejo del catálogo caído, se volverá a suscribir: {self.metrics['lastError']}")
+
+    async def _supervise(self):
+        """
+        Un listener caído se detecta en una comprobación y se sustituye en la
+        siguiente; mientras tanto las rutas consultan Firestore.
+        """
+        while True:
+            await asyncio.sleep(settings.CATALOG_MIRROR_CHECK_INTERVAL)
+            if self.state == "live" and not self._watch.is_active:
+                self._fail(RuntimeError("el listener de Firestore se cerró"))
+            elif self.state == "failed":
+                try:
+                    await self._subscribe()
+                except Exception:
+                    # Ya registrado por _fail; se reintenta en la siguiente comprobación
+                    continue
+                self.metrics["resyncs"] += 1
+                print(f"INFO:     Espejo del catálogo resincronizado ({len(self._books)} libros).")
+
+    def _apply(self, generation: int, changes, read_time):
+        if generation != self._generation or self.state == "failed":
+            return
+
+        tags = set()
+        try:
+            if self.state == "loading":
+                self._reload(changes, tags)
+            else:
+                self._apply_changes(changes, tags)
+        except Exception as e:
+            # El cambio que falló no llegó a la copia: al recargarla, la supervisión lo verá como diferencia
+            self._fail(e)
+            self._invalidate(tags)
+            return
+
+        lag = max(0.0, time.time() - read_time.timestamp())
+        self.metrics["snapshots"] += 1
+        self.metrics["changes"] += len(changes)
+        self.metrics["lastLagSeconds"] = round(lag, 3)
+        self.metrics["maxLagSeconds"] = round(max(self.metrics["maxLagSeconds"], lag), 3)
+        self.metrics["lastSnapshotAt"] = time.time()
+
+        if self.state == "loading":
+            self.state = "live"
+            self._loaded.set()
+        self._invalidate(tags)
+
+    def _invalidate(self, tags: Set[str]):
+        if tags:
+            # Cambios hechos por otros procesos: el cache compartido tampoco debe servirlos viejos
+            asyncio.ensure_future(invalidate_tags("catalog", *tags))
+
+    def _apply_changes(self, changes, tags: Set[str]):
+        for change in changes:
+            doc = change.document
+            if change.type.name == "REMOVED":
+                self._delete(doc.id, tags)
+            else:
+                self._upsert(doc.id, doc.to_dict(), tags)
+
+    def _reload(self, changes, tags: Set[str]):
+        """
+        Primera instantánea de un listener: la colección completa. En la carga
+        inicial solo se copia; tras un fallo, se aplican a índices y cache las
+        diferencias con la copia anterior, que pudo perderse cambios.
+        """
+        if not self._synced:
+            self._books, self._ids, self._by_genre = {}, [], {}
+            for change in changes:
+                self._put(change.document.id, _book(change.document.id, change.document.to_dict()))
+            self._synced = True
+            return
+
+        current = set()
+        for change in changes:
+            doc = change.document
+            current.add(doc.id)
+            data = doc.to_dict()
+            if self._books.get(doc.id) != _book(doc.id, data):
+                self._upsert(doc.id, data, tags)
+        for book_id in [book_id for book_id in self._books if book_id not in current]:
+            self._delete(book_id, tags)
+
+    def _upsert(self, book_id: str, data: dict, tags: Set[str]):
+        # Primero los índices: si fallan, la copia sigue con el valor anterior
+        index_book(book_id, data)
+        previous = self._books.get(book_id)
+        book = _book(book_id, data)
+        self._put(book_id, book)
+
+        genres = _genres(book) | (_genres(previous) if previous is not None else set())
+        tags.add(f"book:{book_id}")
+        tags.update(f"genre:{genre}" for genre in genres)
+
+    def _delete(self, book_id: str, tags: Set[str]):
+        unindex_book(book_id)
+        previous = self._books.get(book_id)
+        self._remove(book_id)
+
+        tags.add(f"book:{book_id}")
+        if previous is not None:
+            tags.update(f"genre:{genre}" for genre in _genres(previous))
+
+    def _put(self, book_id: str, book: dict):
+        self._remove(book_id)
+        self._books[book_id] = book
+        insort(self._ids, book_id)
+        for genre in _genres(book):
+            self._by_genre.setdefault(genre, set()).add(book_id)
+
+    def _remove(self, book_id: str):
+        book = self._books.pop(book_id, None)
+        if book is None:
+            return
+
+        position = bisect_left(self._ids, book_id)
+        if position < len(self._ids) and self._ids[position] == book_id:
+            del self._ids[position]
+
+        for genre in _genres(book):
+            members = self._by_genre.get(genre)
+            if members is not None:
+                members.discard(book_id)
+                if not members:
+                    del self._by_genre[genre]
+
+    # --- Lecturas ---
+
+    def __len__(self):
+        return len(self._books)
+
+    @property
+    def available(self) -> bool:
+        """
+        Si el listener cayó (o aún no terminó la carga) las rutas vuelven a
+        consultar Firestore directamente.
+        """
+        return self.state == "live"
+
+    def get(self, book_id: str) -> Optional[dict]:
+        return self._books.get(book_id)
+
+    def page(self, limit: int, start_after: Optional[str]) -> List[dict]:
+        """
+        Hasta limit + 1 libros ordenados por ID, como la consulta paginada.
+        """
+        start = bisect_right(self._ids, start_after) if start_after else 0
+        return [self._books[book_id] for book_id in self._ids[start:start + limit + 1]]
+
+    def by_genre(self, genre: str) -> List[dict]:
+        return [self._books[book_id] for book_id in sorted(self._by_genre.get(genre, ()))]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.CATALOG_MIRROR_ENABLED,
+            "available": self.available,
+            "state": self.state,
+            "books": len(self._books),
+            **self.metrics,
+        }
+
+
+catalog_mirror = CatalogMirror()
+
+
+async def start_catalog_mirror():
+    await catalog_mirror.start(settings.CATALOG_MIRROR_LOAD_TIMEOUT)
+    return len(catalog_mirror)
+
+
+def stop_catalog_mirror():
+    catalog_mirror.stop()
+
+
+def mirror_stats() -> dict:
+    return catalog_mirror.stats()
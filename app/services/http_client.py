@@ -0,0 +1,47 @@
+import httpx
+from typing import Optional
+
+from app.core import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def init_http_client():
+    """
+    Crea el cliente HTTP compartido (keep-alive + pool de conexiones).
+    Los reintentos del transporte solo cubren fallos de conexión,
+    así que nunca se repite una petición que ya llegó al servidor.
+    """
+    global _client
+
+    transport = httpx.AsyncHTTPTransport(
+        retries=settings.HTTP_RETRIES,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+    _client = httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+    )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """
+    Dependencia de FastAPI. En tests se puede sustituir con
+    app.dependency_overrides para apuntar a un servidor stub.
+    """
+    if _client is None:
+        await init_http_client()
+    return _client
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from typing import List
+import hashlib
+
+from app.core import settings
+from app.db import get_db
+from app.services.cache_config import cache_key, cache_tags, read_entry, route_key_builder, write_entry
+
+NEIGHBORS_COLLECTION = "book_neighbors"
+GENRE_TOP_COLLECTION = "genre_top_books"
+
+# Reseñas del usuario que se usan como semilla
+MAX_SEED_REVIEWS = 100
+
+recommendations_key_builder = route_key_builder("uid", "limit", tags=("recommendations:{uid}",))
+
+
+def genre_doc_id(genre: str) -> str:
+    """
+    ID de genre_top_books/{...} para un género. Los nombres vienen de los
+    libros y de las preferencias del usuario, y no siempre son IDs válidos
+    ("", ".", "..", "__x__", con '/'...): se usa su hash.
+    """
+    return hashlib.sha1(genre.encode("utf-8")).hexdigest()
+
+
+def _review_weight(rating: float) -> float:
+    """
+    Rating 1-10 centrado en el punto medio de la escala: -1 (lo odió) a 1 (le encantó).
+    """
+    return (rating - 5.5) / 4.5
+
+
+async def _seed_reviews(db, uid: str) -> dict:
+    query = db.collection_group("reviews").where("userId", "==", uid).limit(MAX_SEED_REVIEWS)
+    rated = {}
+    async for review in query.stream():
+        rated[review.reference.parent.parent.id] = review.to_dict().get("rating", 0)
+    return rated
+
+
+async def compute_recommendations(uid: str, preferences: List[str], limit: int) -> List[dict]:
+    """
+    Mezcla los vecinos precalculados de los libros que el usuario reseñó
+    (ponderados por su rating) con un extra por coincidir con sus géneros
+    preferidos. Sin reseñas, usa los mejores libros de esos géneros.
+    """
+    db = get_db()
+    preferred = {p.lower() for p in preferences}
+    rated = await _seed_reviews(db, uid)
+
+    scores = defaultdict(float)
+    books = {}
+
+    if rated:
+        refs = [db.collection(NEIGHBORS_COLLECTION).document(book_id) for book_id in rated]
+        async for snap in db.get_all(refs):
+            if not snap.exists:
+                continue
+            weight = _review_weight(rated[snap.id])
+            for neighbor in snap.to_dict().get("neighbors", []):
+                if neighbor["bookId"] in rated:
+                    continue
+                scores[neighbor["bookId"]] += weight * neighbor["score"]
+                books[neighbor["bookId"]] = neighbor
+
+    if not scores and preferences:
+        refs = [db.collection(GENRE_TOP_COLLECTION).document(genre_doc_id(genre)) for genre in preferences]
+        async for snap in db.get_all(refs):
+            if not snap.exists:
+                continue
+            for entry in snap.to_dict().get("books", []):
+                if entry["bookId"] in rated:
+                    continue
+                scores[entry["bookId"]] = max(scores[entry["bookId"]], entry["score"])
+                books[entry["bookId"]] = entry
+
+    results = []
+    for book_id, score in scores.items():
+        book = books[book_id]
+        if preferred:
+            overlap = len(preferred & {g.lower() for g in book.get("genres", [])})
+            score += settings.RECOMMENDATION_GENRE_WEIGHT * overlap / len(preferred)
+        if score > 0:
+            results.append({**book, "score": round(score, 6)})
+
+    results.sort(key=lambda item: item["score"], reverse=True)
+    return results[:limit]
+
+
+async def get_recommendations(uid: str, preferences: List[str], limit: int) -> List[dict]:
+    """
+    Recomendaciones del usuario desde el cache; solo se recalculan al caducar
+    o al invalidar el tag recommendations:{uid} (p.ej. si cambia sus preferencias).
+    """
+    key = cache_key("recomendaciones", recommendations_key_builder, uid=uid, limit=limit)
+
+    entry = await read_entry(key)
+    if entry is not None:
+        return entry["value"]
+
+    value = await compute_recommendations(uid, preferences, limit)
+    await write_entry(
+        key, value, settings.RECOMMENDATION_CACHE_TTL,
+        tags=cache_tags(recommendations_key_builder, uid=uid, limit=limit)
+    )
+    return value
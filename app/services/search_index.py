@@ -0,0 +1,106 @@
+from collections import Counter, defaultdict
+from typing import Dict, List
+import heapq
+import math
+
+from app.services.catalog_indexes import register_index
+from app.utils.text_util import tokenize
+
+# Parámetros estándar de BM25
+K1 = 1.2
+B = 0.75
+
+# Cuántas veces cuenta cada aparición según el campo
+FIELD_WEIGHTS = {"title": 3, "author": 2, "description": 1}
+
+
+def stem(word: str) -> str:
+    """
+    Plurales regulares de español e inglés ("novelas" -> "novela",
+    "books" -> "book"). Se aplica igual al indexar y al buscar.
+    """
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    return [stem(word) for word in tokenize(text)]
+
+
+class SearchIndex:
+    """
+    Índice invertido en memoria sobre título, autor y descripción, con ranking BM25.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._terms: Dict[str, List[str]] = {}
+        self._summaries: Dict[str, dict] = {}
+        self._total_length = 0
+
+    def add(self, book_id: str, book: dict):
+        frequencies = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in analyze(book.get(field) or ""):
+                frequencies[term] += weight
+
+        if not frequencies:
+            return
+
+        for term, tf in frequencies.items():
+            self._postings[term][book_id] = tf
+
+        length = sum(frequencies.values())
+        self._lengths[book_id] = length
+        self._total_length += length
+        self._terms[book_id] = list(frequencies)
+        self._summaries[book_id] = {
+            "id": book_id,
+            "title": book.get("title", ""),
+            "author": book.get("author", ""),
+            "coverImage": book.get("coverImage", ""),
+        }
+
+    def remove(self, book_id: str):
+        for term in self._terms.pop(book_id, []):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(book_id, None)
+                if not postings:
+                    del self._postings[term]
+
+        self._total_length -= self._lengths.pop(book_id, 0)
+        self._summaries.pop(book_id, None)
+
+    def clear(self):
+        self._postings.clear()
+        self._lengths.clear()
+        self._terms.clear()
+        self._summaries.clear()
+        self._total_length = 0
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        total_docs = len(self._lengths)
+        if not total_docs:
+            return []
+
+        avg_length = self._total_length / total_docs
+        scores = defaultdict(float)
+
+        for term in set(analyze(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for book_id, tf in postings.items():
+                norm = K1 * (1 - B + B * self._lengths[book_id] / avg_length)
+                scores[book_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [{**self._summaries[book_id], "score": round(score, 4)} for book_id, score in best]
+
+
+search_index = register_index(SearchIndex())
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from typing import Dict, List, Set
+import hashlib
+import heapq
+import numpy as np
+
+from app.services.catalog_indexes import register_index
+from app.utils.text_util import fold_text, tokenize
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+# Primo de Mersenne 2^31 - 1: (a * h + b) cabe en int64 sin desbordar
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, size=NUM_PERMUTATIONS, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERMUTATIONS, dtype=np.int64)
+
+# Palabras del título que no aportan parecido
+STOPWORDS = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "y", "e", "o",
+    "en", "a", "al", "por", "para", "con", "the", "of", "and", "an", "in", "on", "to",
+}
+
+
+def book_features(book: dict) -> Set[str]:
+    """
+    Conjunto de rasgos del libro: cada género, el autor completo y las
+    palabras significativas del título, con prefijo para no mezclarlos.
+    """
+    features = {f"g:{fold_text(g.get('genre', ''))}" for g in book.get("genres") or [] if g.get("genre")}
+    if book.get("author"):
+        features.add(f"a:{' '.join(tokenize(book['author']))}")
+    features.update(f"t:{word}" for word in tokenize(book.get("title", "")) if word not in STOPWORDS)
+    return features
+
+
+def _feature_hash(feature: str) -> int:
+    # Hash estable entre procesos (hash() de Python cambia en cada arranque)
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little") % _PRIME
+
+
+def minhash(features: Set[str]) -> np.ndarray:
+    hashes = np.fromiter((_feature_hash(f) for f in features), dtype=np.int64, count=len(features))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def _bands(signature: np.ndarray) -> List[tuple]:
+    return [
+        (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+        for band in range(BANDS)
+    ]
+
+
+class SimilarBooksIndex:
+    """
+    Índice MinHash + LSH por bandas sobre géneros, autor y título.
+    Dos libros comparten cubo si coinciden en todas las filas de alguna banda;
+    los candidatos se ordenan por Jaccard exacto de sus rasgos.
+    """
+
+    def __init__(self):
+        self._features: Dict[str, Set[str]] = {}
+        self._band_keys: Dict[str, List[tuple]] = {}
+        self._buckets: Dict[tuple, Set[str]] = defaultdict(set)
+        self._summaries: Dict[str, dict] = {}
+
+    def add(self, book_id: str, book: dict):
+        features = book_features(book)
+        if not features:
+            return
+
+        keys = _bands(minhash(features))
+        for key in keys:
+            self._buckets[key].add(book_id)
+
+        self._features[book_id] = features
+        self._band_keys[book_id] = keys
+        self._summaries[book_id] = {
+            "id": book_id,
+            "title": book.get("title", ""),
+            "author": book.get("author", ""),
+            "coverImage": book.get("coverImage", ""),
+        }
+
+    def remove(self, book_id: str):
+        for key in self._band_keys.pop(book_id, []):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(book_id)
+                if not bucket:
+                    del self._buckets[key]
+
+        self._features.pop(book_id, None)
+        self._summaries.pop(book_id, None)
+
+    def clear(self):
+        self._features.clear()
+        self._band_keys.clear()
+        self._buckets.clear()
+        self._summaries.clear()
+
+    def __contains__(self, book_id: str) -> bool:
+        return book_id in self._features
+
+    def similar(self, book_id: str, limit: int) -> List[dict]:
+        features = self._features.get(book_id)
+        if features is None:
+            return []
+
+        candidates = set()
+        for key in self._band_keys[book_id]:
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(book_id)
+
+        scored = []
+        for candidate in candidates:
+            other = self._features[candidate]
+            scored.append((len(features & other) / len(features | other), candidate))
+
+        return [
+            {**self._summaries[candidate], "score": round(score, 4)}
+            for score, candidate in heapq.nlargest(limit, scored)
+        ]
+
+
+similar_books_index = register_index(SimilarBooksIndex())
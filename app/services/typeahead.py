@@ -0,0 +1,195 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+import heapq
+
+from app.services.catalog_indexes import register_index
+from app.utils.text_util import fold_text, tokenize
+
+# Prefijos (en caracteres de la clave normalizada) con su top precalculado
+TOP_PREFIX_LENGTH = 4
+# Máximo de sugerencias por petición (límite de /suggest)
+MAX_SUGGESTIONS = 20
+# Entradas guardadas por prefijo: margen para bajas sin recalcular enseguida
+TOP_CAPACITY = 2 * MAX_SUGGESTIONS
+# Un prefijo más largo guarda su top (al consultarse) si su rango supera este tamaño
+LONG_PREFIX_MIN_RANGE = 256
+
+# (-peso, clave, tipo, id): ordenar tuplas da el ranking, los más pesados primero
+Item = Tuple[float, str, str, str]
+
+
+def normalize_key(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+class TypeaheadIndex:
+    """
+    Sugerencias por prefijo sobre títulos y autores normalizados.
+    Un array ordenado de claves; el rango de un prefijo se localiza con
+    bisect. Los prefijos cortos (los más tecleados y con rangos enormes)
+    guardan además sus TOP_CAPACITY mejores entradas por peso (reviewCount),
+    que se mantienen en cada alta, baja o cambio de peso. Un prefijo largo
+    con un rango grande ("ciudad" en un catálogo de 100k) pasa a tener su
+    propio top la primera vez que se consulta.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str, str]] = []  # (clave, tipo, id)
+        self._books: Dict[str, dict] = {}
+        self._authors: Dict[str, dict] = {}
+        self._top: Dict[str, List[Item]] = {}
+        self._prefix_counts: Dict[str, int] = {}
+
+    def _insert(self, entry: Tuple[str, str, str]):
+        insort(self._entries, entry)
+
+    def _delete(self, entry: Tuple[str, str, str]):
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def _ranked_prefixes(self, key: str):
+        for n in range(1, len(key) + 1):
+            prefix = key[:n]
+            if n <= TOP_PREFIX_LENGTH or prefix in self._prefix_counts:
+                yield prefix
+
+    def _rank(self, item: Item):
+        """
+        Añade la entrada al top de cada prefijo corto de su clave. Un top
+        completo (todas las entradas del prefijo) la acepta siempre; uno
+        recortado solo si supera a su última, porque no sabe qué hay detrás.
+        """
+        for prefix in self._ranked_prefixes(item[1]):
+            count = self._prefix_counts.get(prefix, 0)
+            self._prefix_counts[prefix] = count + 1
+            top = self._top.setdefault(prefix, [])
+
+            if len(top) == count or (top and item < top[-1]):
+                insort(top, item)
+                if len(top) > TOP_CAPACITY:
+                    top.pop()
+
+    def _unrank(self, item: Item):
+        for prefix in list(self._ranked_prefixes(item[1])):
+            count = self._prefix_counts[prefix] - 1
+            if not count:
+                del self._prefix_counts[prefix]
+                del self._top[prefix]
+                continue
+
+            self._prefix_counts[prefix] = count
+            top = self._top[prefix]
+            position = bisect_left(top, item)
+            if position < len(top) and top[position] == item:
+                del top[position]
+
+    def _author_item(self, author_key: str) -> Item:
+        return (-self._authors[author_key]["weight"], author_key, "author", author_key)
+
+    def add(self, book_id: str, book: dict):
+        title_key = normalize_key(book.get("title", ""))
+        author_key = normalize_key(book.get("author", ""))
+        weight = book.get("reviewCount") or 0
+
+        if title_key:
+            self._insert((title_key, "title", book_id))
+            self._rank((-weight, title_key, "title", book_id))
+
+        if author_key:
+            author = self._authors.get(author_key)
+            if author is None:
+                author = self._authors[author_key] = {"text": book.get("author", ""), "weight": 0, "books": 0}
+                self._insert((author_key, "author", author_key))
+            else:
+                self._unrank(self._author_item(author_key))
+            author["weight"] += weight
+            author["books"] += 1
+            self._rank(self._author_item(author_key))
+
+        self._books[book_id] = {
+            "text": book.get("title", ""),
+            "weight": weight,
+            "titleKey": title_key,
+            "authorKey": author_key,
+        }
+
+    def remove(self, book_id: str):
+        book = self._books.pop(book_id, None)
+        if book is None:
+            return
+
+        if book["titleKey"]:
+            self._delete((book["titleKey"], "title", book_id))
+            self._unrank((-book["weight"], book["titleKey"], "title", book_id))
+
+        author = self._authors.get(book["authorKey"])
+        if author is not None:
+            self._unrank(self._author_item(book["authorKey"]))
+            author["weight"] -= book["weight"]
+            author["books"] -= 1
+            if author["books"] <= 0:
+                del self._authors[book["authorKey"]]
+                self._delete((book["authorKey"], "author", book["authorKey"]))
+            else:
+                self._rank(self._author_item(book["authorKey"]))
+
+    def clear(self):
+        self._entries.clear()
+        self._books.clear()
+        self._authors.clear()
+        self._top.clear()
+        self._prefix_counts.clear()
+
+    def _suggestion(self, kind: str, ref: str) -> dict:
+        if kind == "title":
+            book = self._books[ref]
+            return {"text": book["text"], "type": "title", "bookId": ref, "weight": book["weight"]}
+        author = self._authors[ref]
+        return {"text": author["text"], "type": "author", "bookId": None, "weight": author["weight"]}
+
+    def _weight(self, kind: str, ref: str) -> float:
+        return (self._books if kind == "title" else self._authors)[ref]["weight"]
+
+    def _range(self, key: str) -> Tuple[int, int]:
+        start = bisect_left(self._entries, (key,))
+        return start, bisect_left(self._entries, (key + "\uffff",), lo=start)
+
+    def _scan(self, start: int, end: int, limit: int) -> List[Item]:
+        """
+        Las `limit` mejores entradas del rango, comparando tuplas
+        (sin construir un dict por entrada).
+        """
+        items = (
+            (-self._weight(kind, ref), entry_key, kind, ref)
+            for entry_key, kind, ref in self._entries[start:end]
+        )
+        return heapq.nsmallest(limit, items)
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        key = " ".join(tokenize(prefix))
+        # "cien a" debe seguir casando con "cien anos": se conserva el espacio final
+        if key and fold_text(prefix).endswith(" "):
+            key += " "
+        if not key:
+            return []
+
+        top = self._top.get(key) if limit <= TOP_CAPACITY else None
+        if top is None:
+            start, end = self._range(key)
+            if limit > TOP_CAPACITY or end - start <= LONG_PREFIX_MIN_RANGE:
+                items = self._scan(start, end, limit)
+            else:
+                top = self._top[key] = self._scan(start, end, TOP_CAPACITY)
+                self._prefix_counts[key] = end - start
+                items = top[:limit]
+        else:
+            # Las bajas pueden dejar el top recortado más corto que lo pedido: se rellena una vez
+            if len(top) < min(limit, self._prefix_counts[key]):
+                top[:] = self._scan(*self._range(key), TOP_CAPACITY)
+            items = top[:limit]
+
+        return [self._suggestion(kind, ref) for _, _, kind, ref in items]
+
+
+typeahead_index = register_index(TypeaheadIndex())
@@ -1,3 +1,7 @@
-from .time_utils import calculate_time_ago
-from .build_book_key_util import build_book_key
+from .time_utils import calculate_time_ago
+from .ttl_cache import TTLCache
+from .cursor_util import encode_cursor, decode_cursor, decode_id_cursor, is_document_id
+from .paging_util import iter_pages
+from .text_util import fold_text, tokenize
+# Al final: depende de app.db, que a su vez carga app.core
 from .simple_review import get_review_simple
\ No newline at end of file
@@ -0,0 +1,52 @@
+import base64
+import json
+
+
+def encode_cursor(values: dict) -> str:
+    """
+    Convierte la posición de la última fila de una página en un token opaco
+    (JSON compacto en base64 url-safe, sin padding).
+    """
+    raw = json.dumps(values, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> dict:
+    """
+    Inverso de encode_cursor. Lanza ValueError si el token no es válido.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {e}")
+
+    if not isinstance(values, dict):
+        raise ValueError("Cursor inválido")
+
+    return values
+
+
+def is_document_id(value) -> bool:
+    """
+    ID válido para collection().document(): una cadena no vacía y sin '/'
+    (con '/' apuntaría a otra colección o rompería la ruta).
+    """
+    return (
+        isinstance(value, str)
+        and 0 < len(value.encode()) <= 1500
+        and "/" not in value
+        and value not in (".", "..")
+        and not (value.startswith("__") and value.endswith("__"))
+    )
+
+
+def decode_id_cursor(token: str) -> str:
+    """
+    ID de documento de un cursor {"id": ...} de las paginaciones por ID.
+    Lanza ValueError si el token o el ID no son válidos.
+    """
+    doc_id = decode_cursor(token).get("id")
+    if not is_document_id(doc_id):
+        raise ValueError("Cursor inválido")
+    return doc_id
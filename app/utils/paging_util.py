@@ -0,0 +1,25 @@
+from typing import AsyncIterator
+
+
+async def iter_pages(query, page_size: int) -> AsyncIterator:
+    """
+    Recorre una consulta de Firestore por páginas (limit + start_after) en lugar
+    de un único stream largo: la memoria es la de una página y ninguna llamada
+    dura minutos. La consulta debe tener un orden estable (p.ej. por ID).
+    Cada página se lee entera antes de entregarla, así el stream de Firestore
+    ya está cerrado mientras quien consume trabaja (p.ej. otras consultas
+    anidadas), por lento que sea.
+    """
+    last = None
+    while True:
+        page = query.limit(page_size)
+        if last is not None:
+            page = page.start_after(last)
+
+        docs = [doc async for doc in page.stream()]
+        for doc in docs:
+            yield doc
+
+        if len(docs) < page_size:
+            return
+        last = docs[-1]
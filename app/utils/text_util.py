@@ -0,0 +1,31 @@
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Diacríticos combinantes del bloque latino (U+034F no lo es)
+_LATIN_COMBINING_RE = re.compile("[\u0300-\u034e\u0350-\u036f]")
+
+
+def fold_text(text: str) -> str:
+    """
+    Minúsculas y sin acentos ni diacríticos ("Él Niño" -> "el nino"),
+    para que las búsquedas no dependan de cómo se escribió el texto.
+    El texto ASCII y el latino con tildes evitan el recorrido carácter a
+    carácter, que dominaba la construcción de los índices.
+    """
+    text = text or ""
+    if text.isascii():
+        return text.lower()
+
+    decomposed = _LATIN_COMBINING_RE.sub("", unicodedata.normalize("NFKD", text))
+    if decomposed.isascii():
+        return decomposed.lower()
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Palabras alfanuméricas del texto ya normalizado con fold_text.
+    """
+    return _TOKEN_RE.findall(fold_text(text))
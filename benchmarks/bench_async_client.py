@@ -0,0 +1,59 @@
+"""
+Peticiones concurrentes con el cliente síncrono de Firestore (como estaban
+los routers antes) frente al AsyncClient actual.
+
+Uso:
+    python -m benchmarks.bench_async_client [--requests 200] [--concurrency 50] [--latency 0.005]
+
+Cada "petición" lee un libro. Con el cliente síncrono dentro de un
+`async def` cada lectura bloquea el event loop, así que las peticiones se
+atienden de una en una aunque lleguen a la vez; con AsyncClient se solapan.
+"""
+import argparse
+import asyncio
+import time
+
+from google.cloud.firestore import Client
+
+from benchmarks.harness import PROJECT, async_client, firestore_server
+
+
+async def run(handler, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await handler(f"b{i % 50}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    client = async_client()
+    for i in range(50):
+        await client.collection("books").document(f"b{i}").set({"title": f"Libro {i}", "reviewCount": i})
+
+    sync_client = Client(project=PROJECT)
+
+    async def blocking_handler(book_id: str):
+        sync_client.collection("books").document(book_id).get()
+
+    async def async_handler(book_id: str):
+        await client.collection("books").document(book_id).get()
+
+    for label, handler in (("cliente síncrono", blocking_handler), ("AsyncClient", async_handler)):
+        elapsed = await run(handler, args.requests, args.concurrency)
+        print(f"{label:17} {args.requests / elapsed:8.0f} peticiones/s  ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del cliente síncrono frente a AsyncClient")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="Latencia simulada por RPC (s)")
+    args = parser.parse_args()
+
+    with firestore_server(args.latency):
+        asyncio.run(main(args))
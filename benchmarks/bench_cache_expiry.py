@@ -0,0 +1,106 @@
+"""
+Caducidad del cache bajo carga: TTL simple, en el que cada petición que falla
+consulta Firestore (como el @cache de fastapi-cache), frente a
+stale-while-revalidate con single-flight de cache_config.cached.
+
+Uso:
+    python -m benchmarks.bench_cache_expiry [--books 500] [--concurrency 50] [--rounds 5] [--latency 0.005]
+
+En cada ronda caducan las entradas y llega una ráfaga de peticiones
+concurrentes al listado del catálogo. Se mide la latencia de la ráfaga
+(p50/p99) y cuántas consultas llegan a Firestore por caducidad.
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+from app.appcreator import app
+from app.core import settings
+from app.services import cache_config
+from app.services.cache_config import init_cache, read_entry, write_entry
+from benchmarks.harness import READER, api_client, async_client, firestore_server, install_fake_auth, percentile
+
+
+async def expire_entries(keep_stale: bool):
+    for key in list(InMemoryBackend._store):
+        if keep_stale:
+            entry = await read_entry(key)
+            await write_entry(key, entry["value"], expire=-1)
+        else:
+            del InMemoryBackend._store[key]
+
+
+def without_coalescing(key, compute):
+    # Cada fallo calcula por su cuenta, sin compartir el cálculo en curso
+    return asyncio.ensure_future(compute())
+
+
+async def burst(api, concurrency: int, limit: int):
+    latencies = []
+
+    async def one():
+        started = time.perf_counter()
+        response = await api.get(f"/clankers/books/?limit={limit}", headers=READER)
+        assert response.status_code == 200, response.text
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    return latencies
+
+
+async def main(args, fake):
+    client = async_client()
+    for i in range(args.books):
+        await client.collection("books").document(f"b{i:05}").set({
+            "title": f"Libro {i}", "author": "Autora", "coverImage": "https://img/cover.jpg",
+            "coverAlt": "Portada", "description": "Descripción", "genres": [{"genre": "Fantasía"}],
+            "rating": 7.5, "reviewCount": i, "reviews": [],
+        })
+
+    install_fake_auth()
+    # Las entradas se caducan a mano sobre el store en memoria
+    settings.CACHE_BACKEND = "memory"
+    await init_cache()
+    single_flight = cache_config._single_flight
+
+    async with api_client(app) as api:
+        for label, keep_stale, flight in (
+            ("TTL sin coalescing", False, without_coalescing),
+            ("SWR + single-flight", True, single_flight),
+        ):
+            cache_config._single_flight = flight
+            await burst(api, 1, args.limit)
+            latencies, queries = [], 0
+
+            for _ in range(args.rounds):
+                await expire_entries(keep_stale)
+                before = fake.calls.get("RunQuery", 0)
+                latencies += await burst(api, args.concurrency, args.limit)
+                # Espera a que termine el refresco en segundo plano antes de contar
+                while cache_config._inflight:
+                    await asyncio.sleep(0.01)
+                await asyncio.sleep(0.1)
+                queries += fake.calls.get("RunQuery", 0) - before
+
+            print(
+                f"{label:20} p50={percentile(latencies, 0.5) * 1000:7.1f} ms  "
+                f"p99={percentile(latencies, 0.99) * 1000:7.1f} ms  "
+                f"consultas por caducidad={queries / args.rounds:5.1f}"
+            )
+
+    cache_config._single_flight = single_flight
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de caducidad del cache bajo carga")
+    parser.add_argument("--books", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.005, help="Latencia simulada por RPC (s)")
+    args = parser.parse_args()
+
+    with firestore_server(args.latency) as fake:
+        asyncio.run(main(args, fake))
@@ -0,0 +1,78 @@
+"""
+Construcción de los índices del catálogo (búsqueda, similares, sugerencias)
+y latencia de sus consultas.
+
+Uso:
+    python -m benchmarks.bench_catalog_indexes [--books 100000]
+
+Además del tiempo total mide la mayor pausa del event loop durante la
+construcción: es lo que notan las peticiones que llegan mientras tanto.
+"""
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import time
+
+from app.services.catalog_indexes import build_catalog_indexes
+from app.services.search_index import search_index
+from app.services.similar_books import similar_books_index
+from benchmarks.catalog import synthetic_books
+
+QUERIES = ["amor", "dragón en la montaña", "el último rey", "historia secreta de la ciudad"]
+
+
+async def build(books: dict):
+    stalls = []
+
+    async def heartbeat():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0)
+            stalls.append(time.perf_counter() - started)
+
+    async def source():
+        for book_id, book in books.items():
+            yield book_id, book
+
+    task = asyncio.ensure_future(heartbeat())
+    started = time.perf_counter()
+    await build_catalog_indexes(source())
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    return elapsed, max(stalls, default=0.0)
+
+
+def latency(call, rounds: int) -> str:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return f"p50 {statistics.median(samples) * 1000:.2f} ms  p99 {samples[int(len(samples) * 0.99)] * 1000:.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los índices del catálogo")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    books = synthetic_books(args.books)
+    # En producción el catálogo llega por páginas: el sintético no debe cargar al GC
+    gc.freeze()
+
+    elapsed, stall = asyncio.run(build(books))
+    print(f"construcción: {elapsed:.1f} s ({args.books} libros), pausa máxima del event loop {stall * 1000:.1f} ms")
+
+    rng = random.Random(1)
+    book_ids = list(books)
+    for query in QUERIES:
+        print(f"search({query!r}) {latency(lambda: search_index.search(query, 10), args.rounds)}")
+    print(f"similar()          {latency(lambda: similar_books_index.similar(rng.choice(book_ids), 10), args.rounds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Coders del cache: tiempo de encode/decode y tamaño de la entrada guardada.
+
+Uso:
+    python -m benchmarks.bench_coders [--rounds 2000]
+
+Las entradas imitan las de las rutas cacheadas: una página del catálogo
+(20 libros con extracto de reseñas) y un libro suelto, con fechas como las
+que devuelve Firestore.
+"""
+import argparse
+import datetime
+import time
+
+from app.services.cache_config import CODERS
+from benchmarks.catalog import synthetic_books
+
+
+def sample_entries() -> dict:
+    created = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+    books = []
+    for book_id, book in synthetic_books(20).items():
+        books.append({
+            **book,
+            "id": book_id,
+            "coverImage": f"https://images.example.com/covers/{book_id}.jpg",
+            "coverAlt": f"Portada de {book['title']}",
+            "ratingHistogram": {str(star): star * 3 for star in range(1, 11)},
+            "reviews": [
+                {"id": f"r{i}", "reviewerName": f"Lector {book_id}-{i}", "rating": 7 + i % 3,
+                 "comment": f"Reseña {i} de {book['title']}: " + book["description"][:200], "createdAt": created}
+                for i in range(3)
+            ],
+        })
+    return {
+        "página (20 libros)": {"value": books, "freshUntil": time.time() + 1800},
+        "libro": {"value": books[0], "freshUntil": time.time() + 1800},
+    }
+
+
+def measure(call, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        call()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los coders del cache")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    for label, entry in sample_entries().items():
+        print(label)
+        for name, coder in CODERS.items():
+            encoded = coder.encode(entry)
+            encode_us = measure(lambda: coder.encode(entry), args.rounds)
+            decode_us = measure(lambda: coder.decode(encoded), args.rounds)
+            print(f"  {name:7} {len(encoded):7} bytes  encode {encode_us:8.1f} µs  decode {decode_us:8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
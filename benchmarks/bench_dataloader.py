@@ -0,0 +1,118 @@
+"""
+Lecturas de Firestore por petición con el DocumentLoader frente a leer cada
+documento con su propio get(), en una ráfaga de peticiones concurrentes:
+reseñas de usuarios distintos sobre unos pocos libros populares (perfil del
+usuario + existencia del libro) y consultas /books/batch que se solapan.
+
+Uso:
+    python -m benchmarks.bench_dataloader [--requests 400] [--concurrency 50] [--latency 0.005]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from firebase_admin import auth
+
+from app.appcreator import app
+from app.core import security, settings
+from app.db import dataloader
+from app.services.cache_config import init_cache
+from benchmarks.harness import api_client, async_client, firestore_server
+
+USERS = 100
+HOT_BOOKS = 5
+BOOKS = 200
+
+
+class DirectLoader:
+    """
+    Sin loader: cada load() es un get() propio, sin agrupar ni memorizar.
+    """
+
+    async def load(self, ref):
+        return await ref.get()
+
+    async def load_many(self, refs):
+        return list(await asyncio.gather(*(ref.get() for ref in refs)))
+
+    def clear(self, ref):
+        pass
+
+
+def install_user_tokens():
+    def verify_id_token(id_token, check_revoked=False):
+        uid = id_token.removeprefix("token-")
+        return {"uid": uid, "email": f"{uid}@bench.com", "role": "lector", "exp": time.time() + 3600}
+
+    auth.verify_id_token = verify_id_token
+
+
+async def burst(api, requests: int, concurrency: int):
+    rng = random.Random(7)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        headers = {"Authorization": f"Bearer token-u{i % USERS}"}
+        async with semaphore:
+            if i % 2:
+                response = await api.post(
+                    f"/clankers/reviews/h{i % HOT_BOOKS}/reviews",
+                    json={"rating": rng.randint(1, 10), "reviewText": "Reseña"}, headers=headers,
+                )
+            else:
+                ids = [f"b{rng.randrange(BOOKS)}" for _ in range(10)] + [f"h{i % HOT_BOOKS}"]
+                response = await api.post("/clankers/books/batch", json={"ids": ids}, headers=headers)
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - started
+
+
+async def main(args, fake):
+    client = async_client()
+    for i in range(USERS):
+        await client.collection("users").document(f"u{i}").set({
+            "username": f"lector{i:03}", "email": f"u{i}@bench.com", "role": "lector",
+        })
+    book = {"title": "Libro", "author": "Autora", "coverImage": "https://img/cover.jpg", "coverAlt": "Portada",
+            "description": "Descripción", "genres": [{"genre": "Fantasía"}], "rating": 0.0, "reviewCount": 0,
+            "reviews": []}
+    for book_id in [f"h{i}" for i in range(HOT_BOOKS)] + [f"b{i}" for i in range(BOOKS)]:
+        await client.collection("books").document(book_id).set(book)
+
+    install_user_tokens()
+    settings.CACHE_BACKEND = "memory"
+    # La materialización de las reseñas queda fuera de la ráfaga
+    settings.RATING_MATERIALIZE_DELAY = 3600
+    await init_cache()
+    document_loader = dataloader.DocumentLoader
+
+    async with api_client(app) as api:
+        for label, loader in (("get() por lectura", DirectLoader), ("DocumentLoader", document_loader)):
+            dataloader.DocumentLoader = loader
+            InMemoryBackend._store.clear()
+            security._user_cache.clear()
+            fake.calls.clear()
+            elapsed = await burst(api, args.requests, args.concurrency)
+            print(
+                f"{label:18} {args.requests / elapsed:6.0f} peticiones/s  "
+                f"lecturas/petición={fake.calls.get('documentsRead', 0) / args.requests:5.2f}  "
+                f"RPCs de lectura/petición={fake.calls.get('BatchGetDocuments', 0) / args.requests:5.2f}"
+            )
+
+    dataloader.DocumentLoader = document_loader
+    print(f"loader_stats: {dataloader.loader_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de lecturas por petición con el DocumentLoader")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="Latencia simulada por RPC (s)")
+    args = parser.parse_args()
+
+    with firestore_server(args.latency) as fake:
+        asyncio.run(main(args, fake))
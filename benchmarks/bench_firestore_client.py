@@ -0,0 +1,81 @@
+"""
+Coste por petición de obtener el cliente de Firestore y leer un documento,
+contra el Firestore en memoria sin latencia (solo se mide el cliente):
+
+- cliente nuevo por petición: AsyncClient + canal gRPC nuevos en cada una.
+- pool sin instrumentar: cliente del SDK reutilizado, canal por defecto.
+- pool (get_db): clientes gestionados de firestore_client, con las opciones
+  de canal y los interceptores de deadline y métricas.
+
+Uso:
+    python -m benchmarks.bench_firestore_client [--requests 2000]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+
+import grpc
+from google.cloud.firestore import AsyncClient
+
+from app.core import settings
+from app.db import firestore_client, get_db
+from app.db.firestore_client import attach_channel, channel_interceptors, channel_options
+from benchmarks.harness import PROJECT, firestore_server
+
+
+def managed_pool(channels: int):
+    """
+    El mismo pool que init_firestore, con canales sin TLS hacia el servidor en memoria.
+    """
+    host = os.environ["FIRESTORE_EMULATOR_HOST"]
+    for _ in range(channels):
+        client = AsyncClient(project=PROJECT)
+        channel = grpc.aio.insecure_channel(host, options=channel_options(), interceptors=channel_interceptors())
+        attach_channel(client, channel)
+        firestore_client._clients.append(client)
+        firestore_client._channels.append(channel)
+    firestore_client._round_robin = itertools.cycle(firestore_client._clients)
+
+
+async def measure(client_for_request, requests: int):
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        client = client_for_request()
+        await client.collection("books").document(f"b{i % 10}").get()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def main(args):
+    shared = AsyncClient(project=PROJECT)
+    for i in range(10):
+        await shared.collection("books").document(f"b{i}").set({"title": f"Libro {i}"})
+
+    managed_pool(settings.FIRESTORE_CHANNELS)
+    variants = (
+        ("cliente nuevo por petición", lambda: AsyncClient(project=PROJECT)),
+        ("pool sin instrumentar", lambda: shared),
+        ("pool (get_db)", get_db),
+    )
+    for label, client_for_request in variants:
+        await measure(client_for_request, 50)
+        samples = await measure(client_for_request, args.requests)
+        print(
+            f"{label:27} media={statistics.fmean(samples) * 1e6:7.0f} µs  "
+            f"p50={statistics.median(samples) * 1e6:7.0f} µs"
+        )
+
+    await firestore_client.close_firestore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark del cliente de Firestore por petición")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with firestore_server():
+        asyncio.run(main(args))
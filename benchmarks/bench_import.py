@@ -0,0 +1,89 @@
+"""
+Importación masiva frente a crear los libros de uno en uno, contra el
+Firestore en memoria con latencia simulada.
+
+Uso:
+    python -m benchmarks.bench_import [--books 5000] [--single-books 300] [--latency 0.005]
+
+"uno a uno" reproduce lo que hacía create_book por cada libro: lectura de
+existencia, escritura e invalidación del catálogo. import_books valida las
+filas y escribe en batches de IMPORT_BATCH_SIZE con IMPORT_CONCURRENCY
+commits en vuelo; se prueba con varias concurrencias.
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import settings
+from app.models import BookCreate
+from app.services.bulk_import import import_books
+from app.services.cache_config import invalidate_tags
+from app.services.catalog_indexes import index_book
+from benchmarks.catalog import synthetic_books
+from benchmarks.harness import async_client, firestore_server
+
+
+def import_rows(books: dict, prefix: str):
+    return [
+        {
+            "id": f"{prefix}-{book_id}", "title": data["title"], "author": data["author"],
+            "coverImage": "https://img/cover.jpg", "coverAlt": "Portada",
+            "description": data["description"], "genres": [g["genre"] for g in data["genres"]],
+        }
+        for book_id, data in books.items()
+    ]
+
+
+async def one_by_one(client, rows):
+    for row in rows:
+        book = BookCreate.model_validate({**row, "genres": [{"genre": g} for g in row["genres"]]})
+        data = book.model_dump(exclude_unset=True)
+        ref = client.collection("books").document(data.pop("id"))
+        if (await ref.get()).exists:
+            continue
+        await ref.set({**data, "rating": 0.0, "reviewCount": 0, "reviews": [], "createdBy": "bench"})
+        await invalidate_tags("catalog")
+        index_book(ref.id, data)
+
+
+async def bulk(rows):
+    async def numbered():
+        for line, row in enumerate(rows, 1):
+            yield line, row
+
+    report = await import_books(numbered(), created_by="bench")
+    assert report["failed"] == 0, report["errors"][:3]
+
+
+async def main(args, fake):
+    client = async_client()
+    books = synthetic_books(args.books)
+
+    rows = import_rows(dict(list(books.items())[:args.single_books]), "single")
+    fake.calls.clear()
+    started = time.perf_counter()
+    await one_by_one(client, rows)
+    elapsed = time.perf_counter() - started
+    print(f"{'uno a uno':22} {len(rows) / elapsed:8.0f} libros/s  commits={fake.calls.get('Commit', 0):6}")
+
+    for concurrency in args.concurrency:
+        settings.IMPORT_CONCURRENCY = concurrency
+        rows = import_rows(books, f"bulk{concurrency}")
+        fake.calls.clear()
+        started = time.perf_counter()
+        await bulk(rows)
+        elapsed = time.perf_counter() - started
+        label = f"import_books (x{concurrency})"
+        print(f"{label:22} {len(rows) / elapsed:8.0f} libros/s  commits={fake.calls.get('Commit', 0):6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la importación masiva de libros")
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--single-books", type=int, default=300, help="Libros de la variante uno a uno")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.005, help="Latencia simulada por RPC (s)")
+    args = parser.parse_args()
+
+    with firestore_server(args.latency) as fake:
+        asyncio.run(main(args, fake))
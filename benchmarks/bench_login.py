@@ -0,0 +1,94 @@
+"""
+Logins concurrentes contra un Firebase Auth simulado (tests/identity_stub.py)
+con una latencia de red fija: una llamada bloqueante con conexión nueva por
+login (como hacía `requests.post` en router_auth) frente al cliente HTTP
+asíncrono compartido con keep-alive.
+
+Uso:
+    python -m benchmarks.bench_login [--logins 200] [--concurrency 50] [--latency 0.02]
+
+Las dos variantes pasan por la ruta /clankers/auth/login real; solo cambia
+el cliente HTTP que recibe por dependencia.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.appcreator import app
+from app.core import settings
+from app.services.http_client import close_http_client, get_http_client
+from benchmarks.harness import api_client, async_client, firestore_server, percentile, serve_in_thread
+from tests.identity_stub import IdentityStub
+
+USERS = 50
+
+
+class BlockingHttp:
+    """
+    Lo que hacía la ruta antes: petición síncrona, conexión nueva cada vez.
+    """
+
+    async def post(self, url, json):
+        return httpx.post(url, json=json, timeout=settings.HTTP_TIMEOUT)
+
+
+async def burst(api, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await api.post(
+                "/clankers/auth/login",
+                json={"email": f"user{i % USERS}@bench.com", "password": "secreto123"},
+            )
+            assert response.status_code == 200, response.text
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(logins)))
+    return time.perf_counter() - started, latencies
+
+
+async def main(args, stub):
+    client = async_client()
+    for i in range(USERS):
+        await client.collection("users").document(f"u{i}").set({
+            "username": f"lector{i:03}", "email": f"user{i}@bench.com", "role": "lector",
+        })
+
+    async with api_client(app) as api:
+        for label, http in (("bloqueante", BlockingHttp()), ("cliente compartido", None)):
+            if http is not None:
+                app.dependency_overrides[get_http_client] = lambda: http
+            stub.requests = 0
+            stub.connections.clear()
+            elapsed, latencies = await burst(api, args.logins, args.concurrency)
+            app.dependency_overrides.pop(get_http_client, None)
+            print(
+                f"{label:18} {args.logins / elapsed:7.0f} logins/s  "
+                f"p50={percentile(latencies, 0.5) * 1000:6.1f} ms  p99={percentile(latencies, 0.99) * 1000:6.1f} ms  "
+                f"conexiones={len(stub.connections)}"
+            )
+
+    await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de logins concurrentes")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia simulada de Firebase Auth (s)")
+    args = parser.parse_args()
+
+    stub = IdentityStub(latency=args.latency)
+    for i in range(USERS):
+        stub.add_account(f"user{i}@bench.com", "secreto123", f"u{i}")
+
+    with serve_in_thread(stub) as base_url, firestore_server():
+        settings.FIREBASE_IDENTITY_TOOLKIT_URL = f"{base_url}/identitytoolkit/v1"
+        settings.FIREBASE_SECURE_TOKEN_URL = f"{base_url}/securetoken/v1"
+        asyncio.run(main(args, stub))
@@ -0,0 +1,98 @@
+"""
+Sobrecoste de la instrumentación por petición: la misma ruta trivial de
+FastAPI sin middlewares, con MetricsMiddleware y con MetricsMiddleware +
+ServerTimingMiddleware, llamada directamente por ASGI (sin red ni cliente
+HTTP, para que el coste del middleware no quede tapado). Mide también el
+registro en los contadores/histograma y el render de /metrics.
+
+Uso:
+    python -m benchmarks.bench_metrics [--requests 20000] [--rounds 20] [--routes 50]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from app.core import MetricsMiddleware, ServerTimingMiddleware, render_metrics, settings
+from app.core.metrics import http_latency, http_requests
+
+SCOPE = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+    "scheme": "http", "path": "/books/b1", "raw_path": b"/books/b1", "root_path": "",
+    "query_string": b"", "headers": [], "server": ("bench", 80), "client": ("127.0.0.1", 50000),
+}
+
+
+def build_app(*middlewares) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/books/{book_id}")
+    async def get_book(book_id: str):
+        return {"id": book_id}
+
+    for middleware in middlewares:
+        app.add_middleware(middleware)
+    return app
+
+
+async def per_request(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def main(args):
+    variants = (
+        ("sin middlewares", build_app()),
+        ("MetricsMiddleware", build_app(MetricsMiddleware)),
+        ("+ ServerTimingMiddleware", build_app(ServerTimingMiddleware, MetricsMiddleware)),
+    )
+    # Rondas intercaladas y el mínimo de cada variante: el ruido de la máquina
+    # es del orden del sobrecoste que se quiere medir
+    best = {label: float("inf") for label, _ in variants}
+    for _ in range(args.rounds):
+        for label, app in variants:
+            best[label] = min(best[label], await per_request(app, args.requests // args.rounds))
+
+    baseline = best["sin middlewares"]
+    for label, seconds in best.items():
+        print(f"{label:25} {seconds * 1e6:7.1f} µs/petición  (+{(seconds - baseline) * 1e6:5.1f} µs)")
+
+    started = time.perf_counter()
+    for i in range(args.requests):
+        http_latency.observe(0.0123, "GET", "/books/{book_id}")
+        http_requests.inc("GET", "/books/{book_id}", 200)
+    print(f"{'observe + inc':25} {(time.perf_counter() - started) / args.requests * 1e6:7.2f} µs")
+
+    # Series de un servicio con --routes rutas y varios códigos de estado
+    for i in range(args.routes):
+        for status in (200, 404, 500):
+            http_latency.observe(0.05, "GET", f"/ruta/{i}")
+            http_requests.inc("GET", f"/ruta/{i}", status)
+    samples = []
+    for _ in range(20):
+        started = time.perf_counter()
+        text = render_metrics()
+        samples.append(time.perf_counter() - started)
+    print(f"{'render /metrics':25} {statistics.median(samples) * 1000:7.2f} ms  ({len(text.splitlines())} líneas)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del sobrecoste de las métricas")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--routes", type=int, default=50)
+    args = parser.parse_args()
+
+    # Sin líneas de log de peticiones lentas ni cabecera Server-Timing: solo el registro
+    settings.SLOW_REQUEST_MS = float("inf")
+    asyncio.run(main(args))
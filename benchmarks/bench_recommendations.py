@@ -0,0 +1,178 @@
+"""
+Recomendaciones sobre un catálogo sintético de 100k usuarios x 50k libros:
+el job de vecinos (app.jobs.build_recommendations) por fases y la latencia de
+compute_recommendations contra el Firestore en memoria con latencia simulada.
+
+Uso:
+    python -m benchmarks.bench_recommendations [--users 100000] [--books 50000] [--reviews 20]
+
+Los ratings salen de gustos por grupos (cada usuario y cada libro pertenecen
+a uno) y la popularidad de los libros tiene cola larga, como en un catálogo
+real: los vecinos resultantes tienen sentido y los bloques de similitud de
+los libros populares son densos.
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+import numpy as np
+
+from app.core import settings
+from app.jobs.build_recommendations import genre_rankings, rating_matrix, summary, top_neighbors
+from app.services.recommendations import NEIGHBORS_COLLECTION, compute_recommendations
+from benchmarks.catalog import synthetic_books
+from benchmarks.harness import async_client, firestore_server, percentile
+
+TASTE_GROUPS = 20
+
+
+def synthetic_ratings(n_users: int, n_books: int, reviews_per_user: int, seed: int = 7):
+    """
+    (usuarios, libros, ratings) como los exporta export_ratings, con IDs de texto.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.minimum(rng.zipf(1.8, n_users) + reviews_per_user // 2, 500)
+    counts = np.maximum(1, np.round(counts * reviews_per_user / counts.mean())).astype(int)
+
+    popularity = 1.0 / np.arange(1, n_books + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    user_idx = np.repeat(np.arange(n_users), counts)
+    book_idx = rng.choice(n_books, size=len(user_idx), p=popularity)
+    # Una reseña por usuario y libro
+    pairs = np.unique(user_idx.astype(np.int64) * n_books + book_idx)
+    user_idx, book_idx = pairs // n_books, pairs % n_books
+
+    user_group = rng.integers(TASTE_GROUPS, size=n_users)
+    book_group = rng.integers(TASTE_GROUPS, size=n_books)
+    liked = user_group[user_idx] == book_group[book_idx]
+    ratings = np.clip(np.round(np.where(liked, 8.0, 4.5) + rng.normal(0, 1.5, len(user_idx))), 1, 10)
+
+    users = [f"u{i:06d}" for i in user_idx]
+    books = [f"b{i:07d}" for i in book_idx]
+    return users, books, ratings
+
+
+def catalog_for(n_books: int) -> dict:
+    """
+    Catálogo en el formato de export_books.
+    """
+    return {
+        book_id: {
+            "title": data["title"],
+            "author": data["author"],
+            "coverImage": "https://img/cover.jpg",
+            "genres": [g["genre"] for g in data["genres"]],
+            "rating": data["rating"],
+            "reviewCount": data["reviewCount"],
+        }
+        for book_id, data in synthetic_books(n_books).items()
+    }
+
+
+def peak_memory_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_job(users, books, ratings, catalog, top_n: int) -> dict:
+    """
+    Las fases en memoria del job, cronometradas por separado.
+    Devuelve los documentos de vecinos como los escribiría main().
+    """
+    started = time.perf_counter()
+    matrix, book_ids = rating_matrix(users, books, ratings)
+    print(f"matriz:      {time.perf_counter() - started:6.1f} s  {matrix.shape[0]} x {matrix.shape[1]}, {matrix.nnz} ratings")
+
+    started = time.perf_counter()
+    neighbors = top_neighbors(matrix, top_n)
+    print(f"vecinos:     {time.perf_counter() - started:6.1f} s  (bloques de columnas)")
+
+    started = time.perf_counter()
+    neighbor_docs = {
+        book_id: {
+            "neighbors": [
+                summary(book_ids[col], catalog[book_ids[col]], sim)
+                for col, sim in zip(cols, sims)
+                if book_ids[col] in catalog
+            ]
+        }
+        for book_id, (cols, sims) in zip(book_ids, neighbors)
+    }
+    genre_rankings(catalog, top_n)
+    print(f"documentos:  {time.perf_counter() - started:6.1f} s  {len(neighbor_docs)} libros con vecinos")
+    print(f"memoria pico {peak_memory_mb():6.0f} MB")
+
+    return neighbor_docs
+
+
+async def online(args, users, books, ratings, neighbor_docs):
+    """
+    compute_recommendations para una muestra de usuarios: lee sus reseñas
+    (collection group) y los vecinos de los libros que reseñaron.
+    """
+    client = async_client()
+    sample = sorted(set(users))[:args.sample_users]
+    wanted = set(sample)
+
+    rated_by = {}
+    batch = client.batch()
+    pending = 0
+    for uid, book_id, rating in zip(users, books, ratings):
+        if uid not in wanted:
+            continue
+        rated_by.setdefault(uid, set()).add(book_id)
+        review = client.collection("books").document(book_id).collection("reviews").document(f"{uid}-{book_id}")
+        batch.set(review, {"userId": uid, "rating": float(rating)})
+        pending += 1
+        if pending == 400:
+            await batch.commit()
+            batch, pending = client.batch(), 0
+
+    for book_id in set().union(*rated_by.values()):
+        if book_id in neighbor_docs:
+            batch.set(client.collection(NEIGHBORS_COLLECTION).document(book_id), neighbor_docs[book_id])
+            pending += 1
+            if pending == 400:
+                await batch.commit()
+                batch, pending = client.batch(), 0
+    if pending:
+        await batch.commit()
+
+    # La primera llamada abre el canal gRPC
+    await compute_recommendations(sample[0], [], 20)
+
+    samples = []
+    for uid in sample:
+        started = time.perf_counter()
+        await compute_recommendations(uid, ["Fantasía", "Misterio"], 20)
+        samples.append(time.perf_counter() - started)
+
+    seeds = [len(rated_by[uid]) for uid in sample]
+    print(
+        f"compute_recommendations ({len(sample)} usuarios, {np.mean(seeds):.0f} reseñas de media): "
+        f"p50 {percentile(samples, 0.5) * 1000:.1f} ms  p99 {percentile(samples, 0.99) * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las recomendaciones")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--books", type=int, default=50_000)
+    parser.add_argument("--reviews", type=int, default=20, help="Reseñas por usuario de media")
+    parser.add_argument("--sample-users", type=int, default=50, help="Usuarios de la fase en línea")
+    parser.add_argument("--latency", type=float, default=0.005, help="Latencia simulada por RPC (s)")
+    args = parser.parse_args()
+
+    users, books, ratings = synthetic_ratings(args.users, args.books, args.reviews)
+    catalog = catalog_for(args.books)
+    print(f"{len(ratings)} reseñas, {args.users} usuarios, {args.books} libros")
+
+    neighbor_docs = build_job(users, books, ratings, catalog, settings.RECOMMENDATION_NEIGHBORS)
+
+    with firestore_server(args.latency):
+        asyncio.run(online(args, users, books, ratings, neighbor_docs))
+
+
+if __name__ == "__main__":
+    main()
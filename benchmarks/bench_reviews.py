@@ -0,0 +1,91 @@
+"""
+Ráfaga de reseñas sobre un mismo libro: transacción de lectura-modificación-
+escritura sobre books/{id} (como estaban create_review y compañía antes)
+frente a los incrementos en shards de book_stats.add_rating.
+
+Uso:
+    python -m benchmarks.bench_reviews [--reviews 200] [--concurrency 50] [--latency 0.005]
+
+El Firestore en memoria aborta (ABORTED) una transacción si el libro que
+leyó cambió antes del commit; el SDK la reintenta hasta 5 veces y después
+falla. Con shards cada reseña es un único batch sin lecturas.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from google.cloud.firestore import async_transactional
+
+from app.services.book_stats import add_rating, materialize_book_stats
+from benchmarks.harness import async_client, firestore_server
+
+BOOK_ID = "hot-book"
+
+
+async def burst(write_review, reviews: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = 0
+
+    async def one(i: int):
+        nonlocal failed
+        async with semaphore:
+            try:
+                await write_review(i, random.randint(1, 10))
+            except ValueError:
+                # El SDK agotó los reintentos de la transacción
+                failed += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(reviews)))
+    return time.perf_counter() - started, failed
+
+
+async def main(args, fake):
+    client = async_client()
+    book_ref = client.collection("books").document(BOOK_ID)
+
+    @async_transactional
+    async def update_in_transaction(transaction, review_ref, rating):
+        snapshot = await book_ref.get(transaction=transaction)
+        data = snapshot.to_dict()
+        count = data.get("reviewCount", 0)
+        average = (data.get("rating", 0.0) * count + rating) / (count + 1)
+        transaction.set(review_ref, {"rating": rating})
+        transaction.update(book_ref, {"rating": average, "reviewCount": count + 1})
+
+    async def transactional_review(i: int, rating: int):
+        review_ref = book_ref.collection("reviews").document(f"t{i}")
+        await update_in_transaction(client.transaction(), review_ref, rating)
+
+    async def sharded_review(i: int, rating: int):
+        batch = client.batch()
+        batch.set(book_ref.collection("reviews").document(f"s{i}"), {"rating": rating})
+        add_rating(batch, book_ref, added=rating)
+        await batch.commit()
+
+    for label, write_review in (("transacción", transactional_review), ("shards", sharded_review)):
+        await book_ref.set({"title": "Libro popular", "rating": 0.0, "reviewCount": 0})
+        fake.calls.clear()
+        elapsed, failed = await burst(write_review, args.reviews, args.concurrency)
+        ok = args.reviews - failed
+        print(
+            f"{label:12} {ok / elapsed:7.0f} reseñas/s  fallidas={failed:4}  "
+            f"abortos={fake.calls.get('Aborted', 0):5}  commits={fake.calls.get('Commit', 0):5}"
+        )
+
+    # La ficha se materializa una vez con la suma de los shards
+    await materialize_book_stats(BOOK_ID)
+    book = (await book_ref.get()).to_dict()
+    print(f"materializado: reviewCount={book['reviewCount']} rating={book['rating']:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de reseñas concurrentes sobre un libro")
+    parser.add_argument("--reviews", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="Latencia simulada por RPC (s)")
+    args = parser.parse_args()
+
+    with firestore_server(args.latency) as fake:
+        asyncio.run(main(args, fake))
@@ -0,0 +1,70 @@
+"""
+Latencia de /books/suggest sobre el índice de prefijos.
+
+Uso:
+    python -m benchmarks.bench_typeahead [--books 100000]
+
+Mide la construcción del índice, suggest() para prefijos de 1 a 6
+caracteres y el coste de un cambio de reviewCount (baja + alta).
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.typeahead import TypeaheadIndex
+from benchmarks.catalog import synthetic_books
+
+PREFIXES = ["a", "e", "s", "ma", "la", "sol", "amor", "ciuda", "anillo"]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del índice de autocompletado")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    books = synthetic_books(args.books)
+    index = TypeaheadIndex()
+
+    started = time.perf_counter()
+    for book_id, book in books.items():
+        index.add(book_id, book)
+    print(f"construcción: {time.perf_counter() - started:.2f} s ({args.books} libros)")
+
+    rng = random.Random(1)
+    book_ids = list(books)
+    for prefix in PREFIXES:
+        samples = []
+        for _ in range(args.rounds):
+            # Cambios de peso entre consultas, como las reseñas en producción
+            book_id = rng.choice(book_ids)
+            books[book_id]["reviewCount"] += 1
+            index.remove(book_id)
+            index.add(book_id, books[book_id])
+
+            started = time.perf_counter()
+            index.suggest(prefix, 10)
+            samples.append(time.perf_counter() - started)
+        p50, p99 = percentiles(samples)
+        print(f"suggest({prefix!r:9}) p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+    samples = []
+    for _ in range(args.rounds):
+        book_id = rng.choice(book_ids)
+        books[book_id]["reviewCount"] += 1
+        started = time.perf_counter()
+        index.remove(book_id)
+        index.add(book_id, books[book_id])
+        samples.append(time.perf_counter() - started)
+    p50, p99 = percentiles(samples)
+    print(f"actualización        p50 {p50:.3f} ms  p99 {p99:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
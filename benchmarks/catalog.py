@@ -0,0 +1,39 @@
+"""
+Catálogo sintético para los benchmarks: títulos, autores, descripciones y
+géneros con un vocabulario de tamaño realista y reviewCount con cola larga.
+"""
+import random
+from typing import Dict
+
+WORDS = [
+    "amor", "guerra", "noche", "sombra", "ciudad", "mar", "sol", "luna", "tiempo", "casa",
+    "camino", "fuego", "agua", "tierra", "viento", "silencio", "memoria", "sueño", "rey", "reina",
+    "dragón", "bosque", "isla", "puerto", "historia", "secreto", "jardín", "último", "canción", "montaña",
+    "anillo", "espada", "torre", "puente", "invierno", "verano", "hijo", "padre", "madre", "hermano",
+]
+SYLLABLES = ["ma", "ri", "lo", "sa", "te", "an", "do", "ver", "gal", "mon", "tor", "ca", "be", "ni", "ru"]
+GENRES = ["Fantasía", "Ciencia ficción", "Terror", "Romance", "Historia", "Misterio", "Poesía", "Ensayo"]
+
+
+def synthetic_books(n: int, seed: int = 42) -> Dict[str, dict]:
+    rng = random.Random(seed)
+
+    def name() -> str:
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+    authors = [f"{name()} {name()}" for _ in range(max(1, n // 5))]
+    # Vocabulario ampliado con palabras inventadas, como un catálogo real
+    vocabulary = WORDS + [name().lower() for _ in range(5000)]
+
+    books = {}
+    for i in range(n):
+        title_words = [rng.choice(WORDS if rng.random() < 0.6 else vocabulary) for _ in range(rng.randint(1, 5))]
+        books[f"b{i:07d}"] = {
+            "title": " ".join(title_words).capitalize(),
+            "author": rng.choice(authors),
+            "description": " ".join(rng.choice(vocabulary) for _ in range(rng.randint(20, 60))),
+            "genres": [{"genre": g} for g in rng.sample(GENRES, rng.randint(1, 3))],
+            "reviewCount": int(rng.paretovariate(1.2)) - 1,
+            "rating": round(rng.uniform(1, 10), 1),
+        }
+    return books
@@ -0,0 +1,96 @@
+"""
+Utilidades comunes de los benchmarks: Firestore en memoria con latencia
+simulada en su propio hilo, autenticación falsa y cliente HTTP contra la app.
+
+El servidor corre en otro hilo (con su propio event loop) para que un
+cliente que bloquea el loop, como el síncrono, no lo bloquee también a él.
+"""
+from contextlib import contextmanager
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+from firebase_admin import auth
+from google.cloud.firestore import AsyncClient
+
+from app.core import settings
+from app.db import override_db
+from tests.fake_firestore import FakeFirestore
+
+PROJECT = "bench-project"
+
+# Token -> claims que devolvería Firebase Auth
+TOKENS = {
+    "admin-token": {"uid": "admin", "email": "admin@bench.com", "role": "admin"},
+    "reader-token": {"uid": "reader", "email": "reader@bench.com", "role": "lector"},
+}
+ADMIN = {"Authorization": "Bearer admin-token"}
+READER = {"Authorization": "Bearer reader-token"}
+
+
+@contextmanager
+def serve_in_thread(server):
+    """
+    Corre `server` (con `async start() -> dirección` y `async stop()`) en el
+    event loop de otro hilo. Devuelve la dirección que da start().
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+
+@contextmanager
+def firestore_server(latency: float = 0.0):
+    """
+    Arranca FakeFirestore (con `latency` segundos por RPC) en un hilo y
+    apunta FIRESTORE_EMULATOR_HOST a él. Devuelve el FakeFirestore.
+    """
+    fake = FakeFirestore(latency=latency)
+    previous = os.environ.get("FIRESTORE_EMULATOR_HOST")
+    with serve_in_thread(fake) as host:
+        os.environ["FIRESTORE_EMULATOR_HOST"] = host
+        try:
+            yield fake
+        finally:
+            if previous is None:
+                os.environ.pop("FIRESTORE_EMULATOR_HOST", None)
+            else:
+                os.environ["FIRESTORE_EMULATOR_HOST"] = previous
+
+
+def async_client() -> AsyncClient:
+    """
+    AsyncClient contra el servidor en memoria, instalado con override_db
+    para que rutas y servicios lo usen.
+    """
+    client = AsyncClient(project=PROJECT)
+    override_db(client)
+    return client
+
+
+def install_fake_auth():
+    def verify_id_token(id_token, check_revoked=False):
+        if id_token not in TOKENS:
+            raise auth.InvalidIdTokenError("Token desconocido")
+        return {**TOKENS[id_token], "exp": time.time() + 3600}
+
+    auth.verify_id_token = verify_id_token
+
+
+def api_client(app) -> httpx.AsyncClient:
+    # Bajo carga casi todas las peticiones superarían SLOW_REQUEST_MS y el log taparía los resultados
+    settings.SLOW_REQUEST_MS = float("inf")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+def percentile(samples, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
@@ -0,0 +1,105 @@
+import os
+
+# La configuración exige las credenciales de Firebase al importar la app
+for _name in (
+    "FIREBASE_TYPE", "FIREBASE_PROJECT_ID", "FIREBASE_PRIVATE_KEY_ID", "FIREBASE_PRIVATE_KEY",
+    "FIREBASE_CLIENT_EMAIL", "FIREBASE_CLIENT_ID", "FIREBASE_AUTH_URI", "FIREBASE_TOKEN_URI",
+    "FIREBASE_AUTH_PROVIDER_X509_CERT_URL", "FIREBASE_CLIENT_X509_CERT_URL", "FIREBASE_UNIVERSE_DOMAIN",
+    "FIREBASE_API_KEY", "FIREBASE_AUTH_DOMAIN", "FIREBASE_STORAGE_BUCKET",
+    "FIREBASE_MESSAGING_SENDER_ID", "FIREBASE_APP_ID",
+):
+    os.environ.setdefault(_name, "test")
+os.environ["FIREBASE_PROJECT_ID"] = "test-project"
+os.environ["CACHE_BACKEND"] = "memory"
+
+import time
+
+import httpx
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from firebase_admin import auth
+from google.cloud.firestore import AsyncClient
+
+from app.appcreator import app
+from app.core import security
+from app.db import dataloader, override_db
+from app.services import book_stats, cache_config, catalog_indexes
+from app.services.cache_config import init_cache
+from tests.fake_firestore import FakeFirestore
+from tests.helpers import TOKENS
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def fake_auth(monkeypatch):
+    def verify_id_token(id_token, check_revoked=False):
+        if id_token not in TOKENS:
+            raise auth.InvalidIdTokenError("Token desconocido")
+        return {**TOKENS[id_token], "exp": time.time() + 3600}
+
+    monkeypatch.setattr(auth, "verify_id_token", verify_id_token)
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """
+    Estado de módulo (caches, índices, lecturas en vuelo) limpio en cada prueba.
+    """
+    security._token_cache.clear()
+    security._user_cache.clear()
+    security._revocation_cache.clear()
+    cache_config._inflight.clear()
+    dataloader._queue.clear()
+    dataloader._inflight.clear()
+    dataloader._flush_scheduled = False
+    book_stats._pending.clear()
+    book_stats._running.clear()
+    catalog_indexes._books.clear()
+    for index in catalog_indexes._indexes:
+        index.clear()
+    catalog_indexes._state.update(loaded=False, loadedAt=None, loadSeconds=None, failures=0, lastError=None)
+    catalog_indexes._loader_task = None
+    catalog_indexes._changes_during_load = None
+    yield
+    # Materializaciones programadas por las rutas de reseñas que no llegaron a correr
+    for task in book_stats._pending.values():
+        task.cancel()
+
+
+@pytest.fixture
+async def firestore(monkeypatch):
+    """
+    Servidor Firestore en memoria y un AsyncClient real conectado a él,
+    instalado con override_db para rutas, servicios y jobs.
+    """
+    fake = FakeFirestore()
+    monkeypatch.setenv("FIRESTORE_EMULATOR_HOST", await fake.start())
+    client = AsyncClient(project="test-project")
+    override_db(client)
+    fake.client = client
+    try:
+        yield fake
+    finally:
+        override_db(None)
+        await fake.stop()
+
+
+@pytest.fixture
+async def db(firestore):
+    return firestore.client
+
+
+@pytest.fixture
+async def api(firestore):
+    # Cache en memoria nuevo en cada prueba (el store de InMemoryBackend es de clase)
+    FastAPICache.reset()
+    InMemoryBackend._store.clear()
+    await init_cache()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
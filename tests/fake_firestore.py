@@ -0,0 +1,616 @@
+"""
+Servidor gRPC de Firestore en memoria para las pruebas.
+
+Se arranca en un puerto local y el AsyncClient real del SDK se conecta a él
+como al emulador (FIRESTORE_EMULATOR_HOST). Así las pruebas ejercitan el
+mismo código que producción: consultas con filtros, orden y cursores,
+get_all, batches, transacciones y transforms (Increment, ArrayUnion,
+SERVER_TIMESTAMP...) y listeners (Listen) de consultas. No implementa
+índices ni límites.
+
+Para los benchmarks admite una latencia fija por RPC (`latency`) y aborta
+(ABORTED) el commit de una transacción si alguno de los documentos que leyó
+cambió después, como el control de concurrencia optimista del emulador.
+"""
+from functools import cmp_to_key
+from typing import Dict, List, Optional
+import asyncio
+import itertools
+import time
+
+import grpc
+from google.cloud.firestore_v1.field_path import parse_field_path
+from google.cloud.firestore_v1.types import document as document_types
+from google.cloud.firestore_v1.types import firestore as firestore_types
+from google.cloud.firestore_v1.types import query as query_types
+from google.protobuf import empty_pb2, timestamp_pb2
+
+Document = document_types.Document.pb()
+Value = document_types.Value.pb()
+MapValue = document_types.MapValue.pb()
+
+FieldOperator = query_types.StructuredQuery.FieldFilter.Operator
+UnaryOperator = query_types.StructuredQuery.UnaryFilter.Operator
+CompositeOperator = query_types.StructuredQuery.CompositeFilter.Operator
+Direction = query_types.StructuredQuery.Direction
+
+_TYPE_ORDER = {
+    "null_value": 0,
+    "boolean_value": 1,
+    "integer_value": 2,
+    "double_value": 2,
+    "timestamp_value": 3,
+    "string_value": 4,
+    "bytes_value": 5,
+    "reference_value": 6,
+    "geo_point_value": 7,
+    "array_value": 8,
+    "map_value": 9,
+}
+
+
+def sort_key(value) -> tuple:
+    """
+    Clave de orden de un Value con el orden de tipos de Firestore.
+    Dos valores son iguales para Firestore si sus claves son iguales (1 == 1.0).
+    """
+    kind = value.WhichOneof("value_type")
+    if kind is None or kind == "null_value":
+        return (0,)
+    if kind in ("integer_value", "double_value"):
+        return (2, getattr(value, kind))
+    if kind == "timestamp_value":
+        return (3, value.timestamp_value.seconds, value.timestamp_value.nanos)
+    if kind == "string_value":
+        return (4, value.string_value.encode())
+    if kind == "reference_value":
+        return (6, tuple(value.reference_value.split("/")))
+    if kind == "geo_point_value":
+        return (7, value.geo_point_value.latitude, value.geo_point_value.longitude)
+    if kind == "array_value":
+        return (8, tuple(sort_key(item) for item in value.array_value.values))
+    if kind == "map_value":
+        return (9, tuple(sorted((k, sort_key(v)) for k, v in value.map_value.fields.items())))
+    return (_TYPE_ORDER[kind], getattr(value, kind))
+
+
+def _compare(a: tuple, b: tuple) -> int:
+    return (a > b) - (a < b)
+
+
+def get_field(fields, parts: List[str]):
+    """
+    Valor en la ruta `parts` de un map<string, Value>, o None si no existe.
+    """
+    value = None
+    for part in parts:
+        if part not in fields:
+            return None
+        value = fields[part]
+        fields = value.map_value.fields
+    return value
+
+
+def set_field(fields, parts: List[str], value):
+    for part in parts[:-1]:
+        if fields[part].WhichOneof("value_type") != "map_value":
+            fields[part].map_value.SetInParent()
+        fields = fields[part].map_value.fields
+    fields[parts[-1]].CopyFrom(value)
+
+
+def delete_field(fields, parts: List[str]):
+    for part in parts[:-1]:
+        if part not in fields:
+            return
+        fields = fields[part].map_value.fields
+    if parts[-1] in fields:
+        del fields[parts[-1]]
+
+
+def _number(value) -> Optional[float]:
+    kind = value.WhichOneof("value_type") if value is not None else None
+    if kind in ("integer_value", "double_value"):
+        return getattr(value, kind)
+    return None
+
+
+def _number_value(number, integer: bool):
+    value = Value()
+    if integer:
+        value.integer_value = int(number)
+    else:
+        value.double_value = float(number)
+    return value
+
+
+class FakeFirestore:
+    """
+    Almacén de documentos (nombre completo -> Document) más los manejadores
+    gRPC de google.firestore.v1.Firestore que usa el SDK.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.documents: Dict[str, object] = {}
+        self.calls: Dict[str, int] = {}
+        self.latency = latency
+        self._server: Optional[grpc.aio.Server] = None
+        self._transactions = itertools.count(1)
+        # Transacción -> {documento: update_time leído (None si no existía)}
+        self._transaction_reads: Dict[bytes, Dict[str, object]] = {}
+        self._last_time = 0
+        # Colas de los listeners abiertos: reciben los documentos de cada commit
+        self._listeners: List[asyncio.Queue] = []
+
+    # --- Arranque ---
+
+    async def start(self) -> str:
+        rpcs = {
+            "BatchGetDocuments": grpc.unary_stream_rpc_method_handler(
+                self.batch_get_documents,
+                request_deserializer=firestore_types.BatchGetDocumentsRequest.pb().FromString,
+                response_serializer=lambda message: message.SerializeToString()
+            ),
+            "RunQuery": grpc.unary_stream_rpc_method_handler(
+                self.run_query,
+                request_deserializer=firestore_types.RunQueryRequest.pb().FromString,
+                response_serializer=lambda message: message.SerializeToString()
+            ),
+            "Commit": grpc.unary_unary_rpc_method_handler(
+                self.commit,
+                request_deserializer=firestore_types.CommitRequest.pb().FromString,
+                response_serializer=lambda message: message.SerializeToString()
+            ),
+            "BeginTransaction": grpc.unary_unary_rpc_method_handler(
+                self.begin_transaction,
+                request_deserializer=firestore_types.BeginTransactionRequest.pb().FromString,
+                response_serializer=lambda message: message.SerializeToString()
+            ),
+            "Rollback": grpc.unary_unary_rpc_method_handler(
+                self.rollback,
+                request_deserializer=firestore_types.RollbackRequest.pb().FromString,
+                response_serializer=lambda message: message.SerializeToString()
+            ),
+            "Listen": grpc.stream_stream_rpc_method_handler(
+                self.listen,
+                request_deserializer=firestore_types.ListenRequest.pb().FromString,
+                response_serializer=lambda message: message.SerializeToString()
+            ),
+        }
+        self._server = grpc.aio.server()
+        self._server.add_generic_rpc_handlers(
+            (grpc.method_handlers_generic_handler("google.firestore.v1.Firestore", rpcs),)
+        )
+        port = self._server.add_insecure_port("127.0.0.1:0")
+        await self._server.start()
+        return f"127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._server is not None:
+            await self._server.stop(None)
+            self._server = None
+
+    def _count(self, method: str):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _record_read(self, transaction: Optional[bytes], name: str, document):
+        if transaction:
+            seen = None if document is None else document.update_time
+            self._transaction_reads.setdefault(transaction, {}).setdefault(name, seen)
+
+    def _conflicts(self, transaction: bytes) -> bool:
+        for name, seen in self._transaction_reads.pop(transaction, {}).items():
+            current = self.documents.get(name)
+            if (current is None) != (seen is None) or (current is not None and current.update_time != seen):
+                return True
+        return False
+
+    def reads(self) -> int:
+        return self.calls.get("documentsRead", 0)
+
+    def _now(self):
+        # Estrictamente creciente: update_time distingue cada escritura
+        now = max(time.time_ns(), self._last_time + 1000)
+        self._last_time = now
+        timestamp = timestamp_pb2.Timestamp()
+        timestamp.FromNanoseconds(now)
+        return timestamp
+
+    # --- Lecturas ---
+
+    def _project(self, document, mask_paths):
+        if mask_paths is None:
+            return document
+        projected = Document(name=document.name, create_time=document.create_time, update_time=document.update_time)
+        for path in mask_paths:
+            parts = parse_field_path(path)
+            value = get_field(document.fields, parts)
+            if value is not None:
+                set_field(projected.fields, parts, value)
+        return projected
+
+    async def batch_get_documents(self, request, context):
+        self._count("BatchGetDocuments")
+        read_time = self._now()
+        mask = list(request.mask.field_paths) if request.HasField("mask") else None
+        transaction = None
+        if request.HasField("new_transaction"):
+            transaction = str(next(self._transactions)).encode()
+        reading_in = transaction or request.transaction
+
+        # Los documentos se leen al llegar la petición; la latencia es la de la
+        # respuesta, así una lectura en vuelo trae el valor anterior a una escritura
+        responses = []
+        for name in request.documents:
+            response = firestore_types.BatchGetDocumentsResponse.pb()(read_time=read_time)
+            if transaction is not None:
+                response.transaction = transaction
+                transaction = None
+            document = self.documents.get(name)
+            self._record_read(reading_in, name, document)
+            if document is None:
+                response.missing = name
+            else:
+                self._count("documentsRead")
+                response.found.CopyFrom(self._project(document, mask))
+            responses.append(response)
+
+        await self._delay()
+        for response in responses:
+            yield response
+
+    async def run_query(self, request, context):
+        self._count("RunQuery")
+        await self._delay()
+        read_time = self._now()
+        response_type = firestore_types.RunQueryResponse.pb()
+        transaction = None
+        if request.HasField("new_transaction"):
+            transaction = str(next(self._transactions)).encode()
+
+        results = self._query(request.parent, request.structured_query)
+        for document in results:
+            self._record_read(transaction or request.transaction, document.name, document)
+        if not results:
+            response = response_type(read_time=read_time)
+            if transaction is not None:
+                response.transaction = transaction
+            yield response
+            return
+
+        for document in results:
+            self._count("documentsRead")
+            response = response_type(read_time=read_time, document=document)
+            if transaction is not None:
+                response.transaction = transaction
+                transaction = None
+            yield response
+
+    def _query(self, parent: str, query) -> list:
+        selector = query.from_[0]
+        prefix = parent + "/"
+        candidates = []
+        for name, document in self.documents.items():
+            if not name.startswith(prefix):
+                continue
+            segments = name[len(prefix):].split("/")
+            if selector.all_descendants:
+                if segments[-2] != selector.collection_id:
+                    continue
+            elif len(segments) != 2 or segments[0] != selector.collection_id:
+                continue
+            if query.HasField("where") and not self._matches(document, query.where):
+                continue
+            candidates.append(document)
+
+        orders = [(order.field.field_path, order.direction) for order in query.order_by]
+        if not any(path == "__name__" for path, _ in orders):
+            last_direction = orders[-1][1] if orders else Direction.ASCENDING
+            orders.append(("__name__", last_direction))
+
+        rows = []
+        for document in candidates:
+            values = [self._value(document, path) for path, _ in orders]
+            if any(value is None for value in values):
+                continue
+            rows.append(([sort_key(value) for value in values], document))
+
+        def compare_keys(a_keys, b_keys) -> int:
+            for (_, direction), a, b in zip(orders, a_keys, b_keys):
+                result = _compare(a, b)
+                if result:
+                    return -result if direction == Direction.DESCENDING else result
+            return 0
+
+        rows.sort(key=cmp_to_key(lambda a, b: compare_keys(a[0], b[0])))
+
+        if query.HasField("start_at"):
+            cursor = [sort_key(value) for value in query.start_at.values]
+            before = query.start_at.before
+            rows = [
+                row for row in rows
+                if (compare_keys(row[0][:len(cursor)], cursor) >= 0 if before else compare_keys(row[0][:len(cursor)], cursor) > 0)
+            ]
+        if query.HasField("end_at"):
+            cursor = [sort_key(value) for value in query.end_at.values]
+            before = query.end_at.before
+            rows = [
+                row for row in rows
+                if (compare_keys(row[0][:len(cursor)], cursor) < 0 if before else compare_keys(row[0][:len(cursor)], cursor) <= 0)
+            ]
+
+        documents = [document for _, document in rows][query.offset:]
+        if query.HasField("limit"):
+            documents = documents[:query.limit.value]
+
+        if query.HasField("select"):
+            mask = [field.field_path for field in query.select.fields]
+            documents = [self._project(document, mask) for document in documents]
+        return documents
+
+    def _value(self, document, path: str):
+        if path == "__name__":
+            return Value(reference_value=document.name)
+        return get_field(document.fields, parse_field_path(path))
+
+    def _matches(self, document, where) -> bool:
+        kind = where.WhichOneof("filter_type")
+        if kind == "composite_filter":
+            results = (self._matches(document, f) for f in where.composite_filter.filters)
+            return any(results) if where.composite_filter.op == CompositeOperator.OR else all(results)
+
+        if kind == "unary_filter":
+            value = self._value(document, where.unary_filter.field.field_path)
+            op = where.unary_filter.op
+            if value is None:
+                return False
+            is_null = value.WhichOneof("value_type") == "null_value"
+            is_nan = value.WhichOneof("value_type") == "double_value" and value.double_value != value.double_value
+            return {
+                UnaryOperator.IS_NULL: is_null,
+                UnaryOperator.IS_NOT_NULL: not is_null,
+                UnaryOperator.IS_NAN: is_nan,
+                UnaryOperator.IS_NOT_NAN: not is_nan,
+            }[op]
+
+        field_filter = where.field_filter
+        value = self._value(document, field_filter.field.field_path)
+        if value is None:
+            return False
+
+        op = field_filter.op
+        key = sort_key(value)
+        target = sort_key(field_filter.value)
+
+        if op == FieldOperator.EQUAL:
+            return key == target
+        if op == FieldOperator.NOT_EQUAL:
+            return key != target and key[0] != 0
+        if op == FieldOperator.ARRAY_CONTAINS:
+            return any(sort_key(item) == target for item in value.array_value.values)
+        if op == FieldOperator.ARRAY_CONTAINS_ANY:
+            options = {sort_key(item) for item in field_filter.value.array_value.values}
+            return any(sort_key(item) in options for item in value.array_value.values)
+        if op == FieldOperator.IN:
+            return key in {sort_key(item) for item in field_filter.value.array_value.values}
+        if op == FieldOperator.NOT_IN:
+            return key not in {sort_key(item) for item in field_filter.value.array_value.values} and key[0] != 0
+
+        # Desigualdades: solo entre valores del mismo tipo
+        if key[0] != target[0]:
+            return False
+        return {
+            FieldOperator.LESS_THAN: key < target,
+            FieldOperator.LESS_THAN_OR_EQUAL: key <= target,
+            FieldOperator.GREATER_THAN: key > target,
+            FieldOperator.GREATER_THAN_OR_EQUAL: key >= target,
+        }[op]
+
+    # --- Listeners ---
+
+    def drop_listeners(self, code: grpc.StatusCode = grpc.StatusCode.PERMISSION_DENIED):
+        """
+        Corta los listeners abiertos con `code`. El SDK reconecta solo ante
+        errores recuperables (UNAVAILABLE...); con el resto el listener muere.
+        """
+        for queue in self._listeners:
+            queue.put_nowait(code)
+
+    async def listen(self, request_iterator, context):
+        self._count("Listen")
+        async for request in request_iterator:
+            break
+        target = request.add_target
+        parent, structured_query = target.query.parent, target.query.structured_query
+        response_type = firestore_types.ListenResponse.pb()
+        change_type = response_type().target_change.TargetChangeType
+
+        def changed(document):
+            response = response_type()
+            response.document_change.document.CopyFrom(document)
+            response.document_change.target_ids.append(target.target_id)
+            return response
+
+        def in_sync(read_time):
+            # NO_CHANGE sin target_ids: instantánea consistente, el SDK la entrega
+            response = response_type()
+            response.target_change.target_change_type = change_type.NO_CHANGE
+            response.target_change.read_time.CopyFrom(read_time)
+            response.target_change.resume_token = read_time.SerializeToString()
+            return response
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.append(queue)
+        try:
+            response = response_type()
+            response.target_change.target_change_type = change_type.ADD
+            response.target_change.target_ids.append(target.target_id)
+            yield response
+
+            matching = {document.name for document in self._query(parent, structured_query)}
+            for document in self._query(parent, structured_query):
+                yield changed(document)
+
+            response = response_type()
+            response.target_change.target_change_type = change_type.CURRENT
+            response.target_change.target_ids.append(target.target_id)
+            yield response
+            yield in_sync(self._now())
+
+            while True:
+                item = await queue.get()
+                if isinstance(item, grpc.StatusCode):
+                    await context.abort(item, "Listener cortado")
+                read_time, names = item
+
+                now_matching = {document.name: document for document in self._query(parent, structured_query)}
+                for name in names:
+                    if name in now_matching:
+                        yield changed(now_matching[name])
+                    elif name in matching:
+                        response = response_type()
+                        response.document_remove.document = name
+                        response.document_remove.removed_target_ids.append(target.target_id)
+                        yield response
+                matching = set(now_matching)
+                yield in_sync(read_time)
+        finally:
+            self._listeners.remove(queue)
+
+    # --- Escrituras ---
+
+    async def begin_transaction(self, request, context):
+        self._count("BeginTransaction")
+        await self._delay()
+        return firestore_types.BeginTransactionResponse.pb()(
+            transaction=str(next(self._transactions)).encode()
+        )
+
+    async def rollback(self, request, context):
+        self._count("Rollback")
+        self._transaction_reads.pop(request.transaction, None)
+        return empty_pb2.Empty()
+
+    async def commit(self, request, context):
+        self._count("Commit")
+        await self._delay()
+        if request.transaction and self._conflicts(request.transaction):
+            self._count("Aborted")
+            await context.abort(grpc.StatusCode.ABORTED, "Transaction conflict")
+        commit_time = self._now()
+        staged = dict(self.documents)
+        results = []
+        names = []
+
+        for write in request.writes:
+            operation = write.WhichOneof("operation")
+            if operation == "update":
+                name = write.update.name
+            elif operation == "delete":
+                name = write.delete
+            else:
+                name = write.transform.document
+            names.append(name)
+            existing = staged.get(name)
+
+            if write.HasField("current_document"):
+                condition = write.current_document
+                if condition.WhichOneof("condition_type") == "exists":
+                    if condition.exists and existing is None:
+                        await context.abort(grpc.StatusCode.NOT_FOUND, f"No document to update: {name}")
+                    if not condition.exists and existing is not None:
+                        await context.abort(grpc.StatusCode.ALREADY_EXISTS, f"Document already exists: {name}")
+                elif existing is None or existing.update_time != condition.update_time:
+                    await context.abort(grpc.StatusCode.FAILED_PRECONDITION, f"Stale update_time: {name}")
+
+            if operation == "delete":
+                staged.pop(name, None)
+                results.append([])
+                continue
+
+            document = Document(name=name)
+            if existing is not None:
+                document.CopyFrom(existing)
+            else:
+                document.create_time.CopyFrom(commit_time)
+            document.update_time.CopyFrom(commit_time)
+
+            if operation == "update":
+                if write.HasField("update_mask"):
+                    for path in write.update_mask.field_paths:
+                        parts = parse_field_path(path)
+                        value = get_field(write.update.fields, parts)
+                        if value is None:
+                            delete_field(document.fields, parts)
+                        else:
+                            set_field(document.fields, parts, value)
+                else:
+                    document.ClearField("fields")
+                    for key, value in write.update.fields.items():
+                        document.fields[key].CopyFrom(value)
+                transforms = write.update_transforms
+            else:
+                transforms = write.transform.field_transforms
+
+            transform_results = [self._transform(document, transform, commit_time) for transform in transforms]
+            staged[name] = document
+            results.append(transform_results)
+
+        self.documents = staged
+        for queue in self._listeners:
+            queue.put_nowait((commit_time, names))
+
+        response = firestore_types.CommitResponse.pb()(commit_time=commit_time)
+        for transform_results in results:
+            write_result = response.write_results.add()
+            write_result.update_time.CopyFrom(commit_time)
+            for value in transform_results:
+                write_result.transform_results.add().CopyFrom(value)
+        return response
+
+    def _transform(self, document, transform, commit_time):
+        parts = parse_field_path(transform.field_path)
+        current = get_field(document.fields, parts)
+        kind = transform.WhichOneof("transform_type")
+
+        if kind == "set_to_server_value":
+            value = Value(timestamp_value=commit_time)
+        elif kind in ("increment", "maximum", "minimum"):
+            operand = getattr(transform, kind)
+            base = _number(current)
+            delta = _number(operand)
+            integer = operand.WhichOneof("value_type") == "integer_value" and (
+                base is None or current.WhichOneof("value_type") == "integer_value"
+            )
+            if base is None:
+                result = delta
+            elif kind == "increment":
+                result = base + delta
+            elif kind == "maximum":
+                result = max(base, delta)
+            else:
+                result = min(base, delta)
+            value = _number_value(result, integer)
+        elif kind == "append_missing_elements":
+            value = Value()
+            value.array_value.SetInParent()
+            existing = list(current.array_value.values) if current is not None else []
+            seen = set()
+            for item in existing + list(transform.append_missing_elements.values):
+                if sort_key(item) not in seen:
+                    seen.add(sort_key(item))
+                    value.array_value.values.add().CopyFrom(item)
+        else:
+            removed = {sort_key(item) for item in transform.remove_all_from_array.values}
+            value = Value()
+            value.array_value.SetInParent()
+            for item in (current.array_value.values if current is not None else []):
+                if sort_key(item) not in removed:
+                    value.array_value.values.add().CopyFrom(item)
+
+        set_field(document.fields, parts, value)
+        return value
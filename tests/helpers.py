@@ -0,0 +1,30 @@
+# Token -> claims que devolvería Firebase Auth
+TOKENS = {
+    "admin-token": {"uid": "admin", "email": "admin@test.com", "role": "admin"},
+    "reader-token": {"uid": "reader", "email": "reader@test.com", "role": "lector"},
+}
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+READER = {"Authorization": "Bearer reader-token"}
+
+
+async def add_user(db, uid: str, **data):
+    profile = {"username": uid, "email": f"{uid}@test.com", "role": "lector", **data}
+    await db.collection("users").document(uid).set(profile)
+
+
+async def add_book(db, book_id: str, **data):
+    book = {
+        "title": f"Libro {book_id}",
+        "author": "Autora",
+        "coverImage": "https://img/cover.jpg",
+        "coverAlt": "Portada",
+        "description": "Descripción",
+        "genres": [{"genre": "Fantasía"}],
+        "rating": 0.0,
+        "reviewCount": 0,
+        "reviews": [],
+        **data,
+    }
+    await db.collection("books").document(book_id).set(book)
+    return book
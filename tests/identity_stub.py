@@ -0,0 +1,117 @@
+"""
+Servidor HTTP local que imita los endpoints de Firebase Auth que usa
+router_auth: accounts:signInWithPassword (Identity Toolkit) y token
+(Secure Token). Corre con uvicorn en un puerto libre, así el cliente HTTP
+compartido hace conexiones TCP reales y se puede comprobar que las reutiliza.
+"""
+from typing import Dict, Optional, Set, Tuple
+import asyncio
+import itertools
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import uvicorn
+
+
+def _error(message: str) -> JSONResponse:
+    return JSONResponse({"error": {"code": 400, "message": message}}, status_code=400)
+
+
+class IdentityStub:
+    """
+    Cuentas en memoria (email -> contraseña, uid, deshabilitada). Cuenta las
+    peticiones y las conexiones distintas (puerto de origen) que recibe.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.accounts: Dict[str, dict] = {}
+        self.refresh_tokens: Dict[str, str] = {}
+        self.requests = 0
+        self.connections: Set[Tuple[str, int]] = set()
+        self._tokens = itertools.count(1)
+        self._server: Optional[uvicorn.Server] = None
+        self._task: Optional[asyncio.Task] = None
+        self.app = Starlette(routes=[
+            Route("/identitytoolkit/v1/accounts:signInWithPassword", self.sign_in, methods=["POST"]),
+            Route("/securetoken/v1/token", self.refresh, methods=["POST"]),
+        ])
+
+    def add_account(self, email: str, password: str, uid: str, disabled: bool = False):
+        self.accounts[email] = {"password": password, "uid": uid, "disabled": disabled}
+
+    def _issue(self, uid: str) -> Tuple[str, str]:
+        number = next(self._tokens)
+        refresh_token = f"refresh-{number}"
+        self.refresh_tokens[refresh_token] = uid
+        return f"id-token-{number}", refresh_token
+
+    # --- Arranque ---
+
+    async def start(self) -> str:
+        """
+        Arranca el servidor y devuelve su URL base (http://127.0.0.1:<puerto>).
+        """
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=0, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.01)
+
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._task
+            self._server = None
+
+    # --- Endpoints ---
+
+    async def _received(self, request: Request):
+        self.requests += 1
+        self.connections.add((request.client.host, request.client.port))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def sign_in(self, request: Request):
+        await self._received(request)
+        if not request.query_params.get("key"):
+            return _error("API_KEY_INVALID")
+
+        body = await request.json()
+        account = self.accounts.get(body.get("email"))
+        if account is None:
+            return _error("EMAIL_NOT_FOUND")
+        if account["password"] != body.get("password"):
+            return _error("INVALID_PASSWORD")
+        if account["disabled"]:
+            return _error("USER_DISABLED")
+
+        id_token, refresh_token = self._issue(account["uid"])
+        return JSONResponse({
+            "idToken": id_token,
+            "refreshToken": refresh_token,
+            "expiresIn": "3600",
+            "localId": account["uid"],
+        })
+
+    async def refresh(self, request: Request):
+        await self._received(request)
+        body = await request.json()
+        uid = self.refresh_tokens.pop(body.get("refresh_token"), None)
+        if body.get("grant_type") != "refresh_token" or uid is None:
+            return _error("INVALID_REFRESH_TOKEN")
+
+        id_token, refresh_token = self._issue(uid)
+        return JSONResponse({
+            "access_token": id_token,
+            "refresh_token": refresh_token,
+            "expires_in": "3600",
+            "user_id": uid,
+        })
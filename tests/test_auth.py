@@ -0,0 +1,82 @@
+import pytest
+
+from app.core import settings
+from app.services.http_client import close_http_client
+from tests.helpers import add_user
+from tests.identity_stub import IdentityStub
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def identity(monkeypatch):
+    stub = IdentityStub()
+    base_url = await stub.start()
+    monkeypatch.setattr(settings, "FIREBASE_IDENTITY_TOOLKIT_URL", f"{base_url}/identitytoolkit/v1")
+    monkeypatch.setattr(settings, "FIREBASE_SECURE_TOKEN_URL", f"{base_url}/securetoken/v1")
+    stub.add_account("reader@test.com", "secreto123", "reader")
+    stub.add_account("baja@test.com", "secreto123", "baja", disabled=True)
+    try:
+        yield stub
+    finally:
+        await close_http_client()
+        await stub.stop()
+
+
+async def login(api, email: str, password: str = "secreto123"):
+    return await api.post("/clankers/auth/login", json={"email": email, "password": password})
+
+
+async def test_login_returns_tokens_and_profile(api, db, identity):
+    await add_user(db, "reader")
+
+    response = await login(api, "reader@test.com")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["localId"] == "reader"
+    assert body["idToken"] and body["refreshToken"]
+    assert body["userData"]["username"] == "reader"
+
+    profile = (await db.collection("users").document("reader").get()).to_dict()
+    assert "lastConection" in profile
+
+
+@pytest.mark.parametrize("email, password, status_code", [
+    ("reader@test.com", "otra", 400),
+    ("nadie@test.com", "secreto123", 400),
+    ("baja@test.com", "secreto123", 403),
+])
+async def test_login_maps_identity_errors(api, db, identity, email, password, status_code):
+    response = await login(api, email, password)
+    assert response.status_code == status_code
+
+
+async def test_logins_reuse_pooled_connections(api, db, identity):
+    await add_user(db, "reader")
+    for _ in range(5):
+        assert (await login(api, "reader@test.com")).status_code == 200
+
+    assert identity.requests == 5
+    assert len(identity.connections) == 1
+
+
+async def test_refresh_rotates_tokens(api, db, identity):
+    await add_user(db, "reader")
+    refresh_token = (await login(api, "reader@test.com")).json()["refreshToken"]
+
+    response = await api.post("/clankers/auth/refresh", json={"refreshToken": refresh_token})
+    assert response.status_code == 200, response.text
+    assert response.json()["localId"] == "reader"
+    assert response.json()["refreshToken"] != refresh_token
+
+    reused = await api.post("/clankers/auth/refresh", json={"refreshToken": refresh_token})
+    assert reused.status_code == 401
+
+
+async def test_login_reports_unavailable_identity_service(api, db, identity, monkeypatch):
+    monkeypatch.setattr(settings, "FIREBASE_IDENTITY_TOOLKIT_URL", "http://127.0.0.1:9/v1")
+    monkeypatch.setattr(settings, "HTTP_RETRIES", 0)
+    await close_http_client()
+
+    response = await login(api, "reader@test.com")
+    assert response.status_code == 503
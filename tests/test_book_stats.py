@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from google.cloud.firestore import async_transactional
+
+from app.jobs import rebuild_book_stats
+from app.services import book_stats
+from app.services.book_stats import SHARDS_COLLECTION, add_rating, read_totals
+from tests.helpers import add_book
+
+pytestmark = pytest.mark.anyio
+
+
+async def apply_rating(db, book_ref, **change):
+    batch = db.batch()
+    add_rating(batch, book_ref, **change)
+    await batch.commit()
+
+
+async def test_edit_within_the_same_bucket_keeps_the_histogram(db, monkeypatch):
+    monkeypatch.setattr("app.services.book_stats.settings.RATING_SHARDS", 1)
+    await add_book(db, "b1")
+    book_ref = db.collection("books").document("b1")
+
+    await apply_rating(db, book_ref, added=7)
+    await apply_rating(db, book_ref, added=9)
+    await apply_rating(db, book_ref, added=7.4, removed=7)
+
+    total, count, histogram = await read_totals(book_ref)
+    assert (total, count) == (16.4, 2)
+    assert histogram["7"] == 1
+    assert histogram["9"] == 1
+
+
+async def test_rebuild_job_recomputes_shards_and_book(db, monkeypatch):
+    monkeypatch.setattr(rebuild_book_stats, "init_firebase", lambda: None)
+    await add_book(db, "b1")
+    await add_book(db, "b2")
+    reviews = db.collection("books").document("b1").collection("reviews")
+    await reviews.document("r1").set({"rating": 8, "userId": "u1"})
+    await reviews.document("r2").set({"rating": 6, "userId": "u2"})
+
+    await rebuild_book_stats.main()
+
+    shards = [s.to_dict() async for s in db.collection("books").document("b1").collection(SHARDS_COLLECTION).stream()]
+    assert len(shards) == 1
+    assert shards[0]["count"] == 2 and shards[0]["hist"]["8"] == 1
+
+    book = (await db.collection("books").document("b1").get()).to_dict()
+    assert (book["rating"], book["reviewCount"]) == (7.0, 2)
+    assert book["ratingHistogram"]["6"] == 1
+    assert (await db.collection("books").document("b2").get()).to_dict()["reviewCount"] == 0
+
+
+async def test_concurrent_ratings_on_one_book_never_abort(firestore, db):
+    await add_book(db, "b1")
+    book_ref = db.collection("books").document("b1")
+
+    await asyncio.gather(*(apply_rating(db, book_ref, added=rating) for rating in range(1, 11)))
+
+    assert firestore.calls.get("Aborted", 0) == 0
+    total, count, _ = await read_totals(book_ref)
+    assert (total, count) == (55, 10)
+
+
+async def test_fake_aborts_transaction_whose_reads_changed(firestore, db):
+    # Lo que el benchmark de reseñas mide sobre la transacción de books/{id}
+    await add_book(db, "b1")
+    book_ref = db.collection("books").document("b1")
+
+    @async_transactional
+    async def increment(transaction):
+        snapshot = await book_ref.get(transaction=transaction)
+        await book_ref.update({"reviewCount": 5})
+        transaction.update(book_ref, {"reviewCount": snapshot.get("reviewCount") + 1})
+
+    with pytest.raises(ValueError):
+        await increment(db.transaction(max_attempts=1))
+
+    assert firestore.calls["Aborted"] == 1
+    assert (await book_ref.get()).get("reviewCount") == 5
+
+
+async def test_materialization_retries_when_a_rating_lands_mid_read(firestore, db, monkeypatch):
+    monkeypatch.setattr("app.services.book_stats.settings.RATING_SHARDS", 1)
+    await add_book(db, "b1")
+    book_ref = db.collection("books").document("b1")
+    await apply_rating(db, book_ref, added=8)
+
+    latest_reviews = book_stats.latest_reviews
+
+    async def rating_in_between(*args, **kwargs):
+        # Otro worker suma una reseña después de que se leyeran los shards
+        if not firestore.calls.get("Aborted"):
+            await apply_rating(db, book_ref, added=4)
+        return await latest_reviews(*args, **kwargs)
+
+    monkeypatch.setattr(book_stats, "latest_reviews", rating_in_between)
+
+    await book_stats.materialize_book_stats("b1")
+
+    assert firestore.calls["Aborted"] == 1
+    book = (await book_ref.get()).to_dict()
+    assert (book["rating"], book["reviewCount"]) == (6.0, 2)
+
+
+async def test_shutdown_flushes_pending_materializations(db, monkeypatch):
+    monkeypatch.setattr("app.services.book_stats.settings.RATING_MATERIALIZE_DELAY", 60)
+    await add_book(db, "b1")
+    book_ref = db.collection("books").document("b1")
+    await apply_rating(db, book_ref, added=9)
+
+    book_stats.schedule_materialization("b1")
+    await book_stats.flush_materializations()
+
+    assert not book_stats._pending
+    book = (await book_ref.get()).to_dict()
+    assert (book["rating"], book["reviewCount"]) == (9.0, 1)
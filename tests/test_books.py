@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from app.utils import encode_cursor, iter_pages
+from tests.helpers import ADMIN, READER, add_book
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_list_books_paginates_by_id(api, db):
+    for book_id in ("c", "a", "b"):
+        await add_book(db, book_id)
+
+    first = await api.get("/clankers/books/?limit=2", headers=READER)
+    assert first.status_code == 200
+    page = first.json()
+    assert [book["id"] for book in page["items"]] == ["a", "b"]
+    assert page["nextCursor"]
+
+    second = await api.get(f"/clankers/books/?limit=2&start_after={page['nextCursor']}", headers=READER)
+    assert second.status_code == 200
+    assert [book["id"] for book in second.json()["items"]] == ["c"]
+    assert second.json()["nextCursor"] is None
+
+
+async def test_list_books_rejects_invalid_cursor(api, db):
+    response = await api.get("/clankers/books/?start_after=no-es-un-cursor", headers=READER)
+    assert response.status_code == 400
+
+
+async def test_list_books_requires_token(api, db):
+    response = await api.get("/clankers/books/")
+    assert response.status_code in (401, 403)
+
+
+async def export_lines(api, query: str = ""):
+    response = await api.get(f"/clankers/books/export{query}", headers=ADMIN)
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def test_export_streams_books_reviews_and_checkpoints(api, db):
+    await add_book(db, "a")
+    await add_book(db, "b")
+    await db.collection("books").document("a").collection("reviews").document("r1").set({"rating": 8})
+
+    records = await export_lines(api)
+    assert [(r["type"], r.get("id")) for r in records] == [
+        ("book", "a"), ("review", "r1"), ("checkpoint", None),
+        ("book", "b"), ("checkpoint", None),
+    ]
+
+    resumed = await export_lines(api, f"?start_after={records[2]['cursor']}")
+    assert [r.get("id") for r in resumed if r["type"] == "book"] == ["b"]
+
+
+class StubQuery:
+    """
+    Consulta paginable sobre una lista, que cuenta los streams abiertos.
+    """
+
+    def __init__(self, docs, streams, offset=0, size=None):
+        self.docs, self.streams, self.offset, self.size = docs, streams, offset, size
+
+    def limit(self, size):
+        return StubQuery(self.docs, self.streams, self.offset, size)
+
+    def start_after(self, doc):
+        return StubQuery(self.docs, self.streams, self.docs.index(doc) + 1, self.size)
+
+    async def stream(self):
+        self.streams["open"] += 1
+        try:
+            for doc in self.docs[self.offset:self.offset + self.size]:
+                yield doc
+        finally:
+            self.streams["open"] -= 1
+
+
+async def test_iter_pages_closes_each_stream_before_yielding():
+    streams = {"open": 0}
+    seen = []
+    async for doc in iter_pages(StubQuery(list(range(5)), streams), 2):
+        assert streams["open"] == 0
+        seen.append(doc)
+    assert seen == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("cursor", [{"id": 7}, {"id": "a/reviews/r1"}, {"id": ""}])
+async def test_export_rejects_invalid_cursor_before_streaming(api, db, cursor):
+    response = await api.get(f"/clankers/books/export?start_after={encode_cursor(cursor)}", headers=ADMIN)
+    assert response.status_code == 400
+
+
+async def test_batch_returns_books_in_request_order(api, db):
+    await add_book(db, "a")
+    await add_book(db, "b")
+
+    response = await api.post("/clankers/books/batch", json={"ids": ["b", "zz", "a", "b"]}, headers=READER)
+    assert response.status_code == 200
+    assert [(item["id"], item["found"]) for item in response.json()] == [
+        ("b", True), ("zz", False), ("a", True), ("b", True),
+    ]
+
+
+@pytest.mark.parametrize("book_id", ["a/b", "x/reviews/r1", "", "__name__"])
+async def test_batch_rejects_ids_that_are_not_document_ids(api, db, book_id):
+    await add_book(db, "x")
+    await db.collection("books").document("x").collection("reviews").document("r1").set({"rating": 8})
+
+    response = await api.post("/clankers/books/batch", json={"ids": ["x", book_id]}, headers=READER)
+    assert response.status_code == 422
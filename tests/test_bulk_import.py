@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from app.services import bulk_import
+from tests.helpers import ADMIN, add_book
+
+pytestmark = pytest.mark.anyio
+
+
+def book_row(**data):
+    return {
+        "title": "Importado", "author": "Autora", "coverImage": "https://img/c.jpg",
+        "coverAlt": "Portada", "description": "Descripción", "genres": ["Fantasía"], **data,
+    }
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    tags = set()
+
+    async def invalidate_tags(*names):
+        tags.update(names)
+        return 0
+
+    monkeypatch.setattr(bulk_import, "invalidate_tags", invalidate_tags)
+    return tags
+
+
+async def run_import(api, rows):
+    body = "\n".join(json.dumps(row) for row in rows)
+    response = await api.post("/clankers/books/import", content=body, headers=ADMIN)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_import_creates_updates_and_reports_bad_rows(api, db, invalidated):
+    await add_book(db, "x", genres=[{"genre": "Terror"}], rating=8.0)
+
+    report = await run_import(api, [
+        book_row(title="Nuevo"),
+        book_row(id="x", title="Actualizado"),
+        book_row(id="x/reviews/r1"),
+        {"title": "sin más campos"},
+    ])
+
+    assert (report["rows"], report["created"], report["updated"], report["failed"]) == (4, 1, 1, 2)
+    assert [error["line"] for error in report["errors"]] == [3, 4]
+
+    existing = (await db.collection("books").document("x").get()).to_dict()
+    assert (existing["title"], existing["rating"]) == ("Actualizado", 8.0)
+    assert {"catalog", "book:x", "genre:Terror", "genre:Fantasía"} <= invalidated
+
+
+async def test_failed_chunk_is_reported_per_row_and_cache_still_invalidated(api, db, invalidated, monkeypatch):
+    monkeypatch.setattr(bulk_import.settings, "IMPORT_BATCH_SIZE", 2)
+    await add_book(db, "x", genres=[{"genre": "Terror"}])
+    real_get_all = db.get_all
+
+    def get_all(refs, *args, **kwargs):
+        if any(ref.id == "roto" for ref in refs):
+            raise RuntimeError("Firestore no disponible")
+        return real_get_all(refs, *args, **kwargs)
+
+    monkeypatch.setattr(db, "get_all", get_all)
+
+    report = await run_import(api, [
+        book_row(id="roto"), book_row(),
+        book_row(id="x"), book_row(),
+    ])
+
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 2)
+    assert [error["line"] for error in report["errors"]] == [1, 2]
+    assert {"catalog", "book:x", "genre:Terror"} <= invalidated
+
+
+async def test_cache_is_invalidated_when_the_input_breaks(db, invalidated):
+    async def rows():
+        yield 1, book_row()
+        raise ConnectionError("cliente desconectado")
+
+    with pytest.raises(ConnectionError):
+        await bulk_import.import_books(rows(), created_by="admin")
+
+    assert "catalog" in invalidated
+
+
+async def test_invalid_utf8_is_reported_per_row(api, db, invalidated):
+    body = b"\n".join([
+        json.dumps(book_row(title="Bien")).encode(),
+        json.dumps(book_row(title="Mal")).encode().replace(b"Mal", b"M\xe1l"),
+        json.dumps(book_row(title="Bien también")).encode(),
+    ])
+    response = await api.post("/clankers/books/import", content=body, headers=ADMIN)
+
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["created"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["line"] == 2
+
+
+async def test_invalid_utf8_in_csv_fails_only_its_record():
+    async def chunks():
+        yield b"title,author\nUno,Autora\n"
+        yield b'"Dos\nl\xedneas",Autora\nTres,Autora\n'
+
+    rows = [row async for row in bulk_import.parse_csv(bulk_import.iter_lines(chunks()))]
+
+    assert [line for line, _ in rows] == [2, 3, 5]
+    assert isinstance(rows[1][1], ValueError)
+    assert rows[2][1]["title"] == "Tres"
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+from app.services import cache_config
+from app.services.cache_config import invalidate_tags, read_entry, write_entry
+from tests.helpers import READER, add_book
+
+pytestmark = pytest.mark.anyio
+
+
+async def get_title(api, book_id):
+    response = await api.get(f"/clankers/books/{book_id}", headers=READER)
+    assert response.status_code == 200, response.text
+    return response.json()["title"]
+
+
+async def test_book_entry_is_dropped_by_its_tag(api, db):
+    await add_book(db, "a", title="Antes")
+    assert await get_title(api, "a") == "Antes"
+
+    await db.collection("books").document("a").update({"title": "Después"})
+    assert await get_title(api, "a") == "Antes"
+
+    assert await invalidate_tags("book:a") == 1
+    assert await get_title(api, "a") == "Después"
+
+
+async def test_batch_entries_are_tagged_like_the_single_route(api, db):
+    await add_book(db, "a", title="Antes")
+    response = await api.post("/clankers/books/batch", json={"ids": ["a"]}, headers=READER)
+    assert response.status_code == 200
+    assert response.json()[0]["found"], response.text
+
+    await db.collection("books").document("a").update({"title": "Después"})
+    assert await invalidate_tags("book:a") == 1
+    assert await get_title(api, "a") == "Después"
+
+
+async def test_uncached_responses_leave_no_tags_behind(api, db):
+    response = await api.get("/clankers/books/no-existe", headers=READER)
+    assert response.status_code == 404
+    response = await api.get("/clankers/books/?start_after=no-es-un-cursor", headers=READER)
+    assert response.status_code == 400
+
+    assert not FastAPICache.get_backend().tag_index._keys
+
+
+async def expire_cached_entries():
+    """
+    Marca como caducadas (pero aún servibles) todas las entradas del cache.
+    """
+    for key in list(InMemoryBackend._store):
+        entry = await read_entry(key)
+        await write_entry(key, entry["value"], expire=-1)
+
+
+async def list_titles(api):
+    response = await api.get("/clankers/books/", headers=READER)
+    assert response.status_code == 200, response.text
+    return [book["title"] for book in response.json()["items"]]
+
+
+async def test_concurrent_misses_share_one_query(api, firestore, db):
+    await add_book(db, "a", title="Antes")
+    firestore.latency = 0.05
+
+    results = await asyncio.gather(*(list_titles(api) for _ in range(20)))
+
+    assert results == [["Antes"]] * 20
+    assert firestore.calls["RunQuery"] == 1
+
+
+async def test_expired_entry_is_served_stale_while_one_refresh_runs(api, firestore, db):
+    await add_book(db, "a", title="Antes")
+    assert await list_titles(api) == ["Antes"]
+
+    await db.collection("books").document("a").update({"title": "Después"})
+    await expire_cached_entries()
+    firestore.latency = 0.05
+    queries = firestore.calls["RunQuery"]
+
+    results = await asyncio.gather(*(list_titles(api) for _ in range(20)))
+    assert results == [["Antes"]] * 20
+    assert FastAPICache.get_backend().stale["todos_libros"] == 20
+
+    await asyncio.gather(*cache_config._inflight.values())
+    assert firestore.calls["RunQuery"] == queries + 1
+    assert await list_titles(api) == ["Después"]
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from app.services import catalog_indexes
+from tests.helpers import READER, add_book
+
+pytestmark = pytest.mark.anyio
+
+
+async def seed_catalog(db):
+    await add_book(db, "hobbit", title="El Hobbit", author="J. R. R. Tolkien", reviewCount=40,
+                   description="Un viaje inesperado de Bilbo", genres=[{"genre": "Fantasía"}])
+    await add_book(db, "comunidad", title="El Señor de los Anillos: La Comunidad", author="J. R. R. Tolkien",
+                   reviewCount=90, description="Frodo y el anillo único",
+                   genres=[{"genre": "Fantasía"}, {"genre": "Aventura"}])
+    await add_book(db, "torres", title="El Señor de los Anillos: Las Dos Torres", author="J. R. R. Tolkien",
+                   reviewCount=0, genres=[{"genre": "Fantasía"}, {"genre": "Aventura"}])
+    await add_book(db, "dune", title="Dune", author="Frank Herbert", reviewCount=70,
+                   description="Arena, especia y gusanos", genres=[{"genre": "Ciencia ficción"}])
+
+
+async def test_indexed_routes_after_load(api, db):
+    await seed_catalog(db)
+    assert (await api.get("/clankers/books/search?q=anillo", headers=READER)).status_code == 503
+
+    assert await catalog_indexes.load_catalog_indexes() == 4
+
+    search = await api.get("/clankers/books/search?q=frodo", headers=READER)
+    assert search.status_code == 200
+    assert [hit["id"] for hit in search.json()] == ["comunidad"]
+
+    suggest = await api.get("/clankers/books/suggest?prefix=j r r", headers=READER)
+    assert suggest.status_code == 200
+    assert suggest.json()[0] == {"text": "J. R. R. Tolkien", "type": "author", "bookId": None, "weight": 130}
+
+    similar = await api.get("/clankers/books/comunidad/similar", headers=READER)
+    assert similar.status_code == 200
+    assert [hit["id"] for hit in similar.json()][0] == "torres"
+
+
+async def test_load_is_retried_until_it_succeeds(db, monkeypatch):
+    await seed_catalog(db)
+    monkeypatch.setattr(catalog_indexes, "RETRY_MIN_SECONDS", 0.01)
+
+    original = catalog_indexes.load_catalog_indexes
+    attempts = []
+
+    async def flaky_load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("Firestore no disponible")
+        return await original()
+
+    monkeypatch.setattr(catalog_indexes, "load_catalog_indexes", flaky_load)
+
+    catalog_indexes.start_catalog_indexes()
+    try:
+        for _ in range(200):
+            if catalog_indexes.indexes_ready():
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await catalog_indexes.stop_catalog_indexes()
+
+    assert catalog_indexes.indexes_ready()
+    assert len(attempts) == 2
+    assert catalog_indexes.index_stats()["failures"] == 1
+
+
+def book(title: str) -> dict:
+    return {"title": title, "author": "Autora", "description": "", "genres": [], "reviewCount": 1}
+
+
+async def test_build_yields_to_the_event_loop(monkeypatch):
+    monkeypatch.setattr(catalog_indexes, "LOAD_SLICE_SECONDS", 0)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(len(catalog_indexes._books))
+            await asyncio.sleep(0)
+
+    async def books():
+        for i in range(200):
+            yield f"b{i}", book(f"Libro {i}")
+
+    task = asyncio.ensure_future(ticker())
+    try:
+        assert await catalog_indexes.build_catalog_indexes(books()) == 200
+    finally:
+        task.cancel()
+
+    # El ticker corrió entre libro y libro, no solo al principio y al final
+    assert len({count for count in ticks if 0 < count < 200}) > 100
+
+
+async def test_writes_during_the_build_win_over_older_pages():
+    async def books():
+        yield "a", book("A")
+        # Peticiones atendidas mientras se construye, después de leer la página
+        catalog_indexes.index_book("b", {"title": "B editado", "reviewCount": 5})
+        catalog_indexes.unindex_book("c")
+        catalog_indexes.index_book("d", book("D nuevo"))
+        yield "b", book("B viejo")
+        yield "c", book("C")
+
+    assert await catalog_indexes.build_catalog_indexes(books()) == 3
+
+    assert catalog_indexes.indexed_book("b")["title"] == "B editado"
+    assert catalog_indexes.indexed_book("b")["author"] == "Autora"
+    assert catalog_indexes.indexed_book("c") is None
+    assert catalog_indexes.indexed_book("d")["title"] == "D nuevo"
+
+    # Terminada la carga, las escrituras ya no se registran
+    catalog_indexes.index_book("b", {"title": "B otra vez"})
+    assert catalog_indexes._changes_during_load is None
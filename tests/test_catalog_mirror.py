@@ -0,0 +1,105 @@
+import asyncio
+import importlib
+
+import pytest
+from google.cloud.firestore import Client
+
+from app.core import settings
+from app.services.catalog_mirror import CatalogMirror
+from tests.helpers import READER, add_book
+
+pytestmark = pytest.mark.anyio
+
+# app.services reexporta la instancia con el mismo nombre que el módulo
+mirror_module = importlib.import_module("app.services.catalog_mirror")
+
+
+@pytest.fixture
+async def mirror(firestore, monkeypatch):
+    # El listener usa el cliente síncrono del SDK, aquí contra el servidor en memoria
+    monkeypatch.setattr(mirror_module.firestore, "client", lambda: Client(project="test-project"))
+    monkeypatch.setattr(settings, "CATALOG_MIRROR_CHECK_INTERVAL", 0.05)
+    instance = CatalogMirror()
+    monkeypatch.setattr("app.routers.router_libro.catalog_mirror", instance)
+    try:
+        yield instance
+    finally:
+        instance.stop()
+
+
+async def eventually(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "la condición no se cumplió a tiempo"
+        await asyncio.sleep(0.02)
+
+
+async def test_mirror_loads_and_follows_changes(api, db, firestore, mirror):
+    await add_book(db, "a", title="Primero")
+    await mirror.start(timeout=5)
+    assert mirror.available and mirror.get("a")["title"] == "Primero"
+
+    await add_book(db, "b", genres=[{"genre": "Terror"}])
+    await db.collection("books").document("a").delete()
+    await eventually(lambda: mirror.get("b") is not None and mirror.get("a") is None)
+    assert [book["id"] for book in mirror.by_genre("Terror")] == ["b"]
+
+    reads = firestore.reads()
+    response = await api.get("/clankers/books/b", headers=READER)
+    assert response.status_code == 200
+    assert firestore.reads() == reads
+
+
+async def test_failed_apply_resubscribes_and_reloads(api, db, mirror, monkeypatch):
+    await add_book(db, "a", title="Antes")
+    await mirror.start(timeout=5)
+    # Intervalo largo: da tiempo a ver el espejo caído antes de que se resuscriba
+    monkeypatch.setattr(settings, "CATALOG_MIRROR_CHECK_INTERVAL", 0.5)
+
+    index_book = mirror_module.index_book
+    failures = []
+
+    def failing_index_book(book_id, data):
+        if not failures:
+            failures.append(book_id)
+            raise RuntimeError("índice roto")
+        index_book(book_id, data)
+
+    monkeypatch.setattr(mirror_module, "index_book", failing_index_book)
+    await db.collection("books").document("a").update({"title": "Después"})
+    await eventually(lambda: mirror.state == "failed")
+    assert failures == ["a"] and not mirror.available
+
+    await eventually(lambda: mirror.available)
+    assert mirror.metrics["resyncs"] == 1
+    assert mirror.get("a")["title"] == "Después"
+
+    # El listener nuevo sigue recibiendo cambios
+    await add_book(db, "c")
+    await eventually(lambda: mirror.get("c") is not None)
+
+
+# El SDK relanza en su propio hilo el error con el que se cerró el listener
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+async def test_closed_listener_falls_back_and_resubscribes(api, db, firestore, mirror, monkeypatch):
+    await add_book(db, "a", title="Antes")
+    await add_book(db, "b")
+    await mirror.start(timeout=5)
+    monkeypatch.setattr(settings, "CATALOG_MIRROR_CHECK_INTERVAL", 0.5)
+    await asyncio.sleep(0.1)
+
+    firestore.drop_listeners()
+    await eventually(lambda: mirror.state == "failed")
+
+    # Mientras está caído las rutas leen de Firestore
+    await db.collection("books").document("a").update({"title": "Después"})
+    await db.collection("books").document("b").delete()
+    reads = firestore.reads()
+    response = await api.get("/clankers/books/a", headers=READER)
+    assert response.json()["title"] == "Después"
+    assert firestore.reads() == reads + 1
+
+    await eventually(lambda: mirror.available)
+    assert mirror.get("a")["title"] == "Después"
+    assert mirror.get("b") is None
+    assert mirror.stats()["state"] == "live"
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.db import DocumentLoader, loader_stats
+from tests.helpers import add_book
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reads_in_one_tick_share_one_get_all(firestore, db):
+    for book_id in ("a", "b"):
+        await add_book(db, book_id)
+    refs = [db.collection("books").document(book_id) for book_id in ("a", "b", "a", "zz")]
+    calls = firestore.calls.get("BatchGetDocuments", 0)
+
+    first, second = DocumentLoader(), DocumentLoader()
+    snapshots, again = await asyncio.gather(first.load_many(refs), second.load(refs[0]))
+
+    assert [snap.exists for snap in snapshots] == [True, True, True, False]
+    assert again.get("title") == "Libro a"
+    assert firestore.calls["BatchGetDocuments"] == calls + 1
+
+
+async def test_concurrent_request_joins_read_in_flight(firestore, db):
+    await add_book(db, "a")
+    ref = db.collection("books").document("a")
+    firestore.latency = 0.05
+
+    first = asyncio.ensure_future(DocumentLoader().load(ref))
+    await asyncio.sleep(0.01)
+    joined = loader_stats()["joined"]
+    await DocumentLoader().load(ref)
+    await first
+
+    assert loader_stats()["joined"] == joined + 1
+
+
+async def test_load_after_own_write_skips_read_sent_before_it(firestore, db):
+    await add_book(db, "a", title="Antes")
+    ref = db.collection("books").document("a")
+    firestore.latency = 0.05
+
+    # Otra petición lee el libro; su respuesta sigue en vuelo durante la escritura
+    other = asyncio.ensure_future(DocumentLoader().load(ref))
+    await asyncio.sleep(0.01)
+
+    loader = DocumentLoader()
+    firestore.latency = 0
+    await ref.update({"title": "Después"})
+    loader.clear(ref)
+
+    assert (await loader.load(ref)).get("title") == "Después"
+    assert (await other).get("title") == "Antes"
+
+
+async def test_write_does_not_prevent_joining_later_reads(firestore, db):
+    await add_book(db, "a")
+    ref = db.collection("books").document("a")
+
+    loader = DocumentLoader()
+    await ref.update({"title": "Después"})
+    loader.clear(ref)
+    firestore.latency = 0.05
+
+    later = asyncio.ensure_future(DocumentLoader().load(ref))
+    await asyncio.sleep(0.01)
+    joined = loader_stats()["joined"]
+
+    assert (await loader.load(ref)).get("title") == "Después"
+    assert loader_stats()["joined"] == joined + 1
+    await later
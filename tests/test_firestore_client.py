@@ -0,0 +1,36 @@
+import os
+
+import grpc
+import pytest
+from google.cloud.firestore import AsyncClient
+
+from app.core.metrics import firestore_documents
+from app.db import get_db
+from app.db.firestore_client import attach_channel, channel_interceptors, channel_options
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_managed_channel_counts_documents(firestore):
+    # Mismo canal que el pool de producción, sin TLS hacia el servidor en memoria
+    channel = grpc.aio.insecure_channel(
+        os.environ["FIRESTORE_EMULATOR_HOST"], options=channel_options(), interceptors=channel_interceptors()
+    )
+    client = AsyncClient(project="test-project")
+    attach_channel(client, channel)
+    reads, writes = firestore_documents._values[("read",)], firestore_documents._values[("write",)]
+
+    try:
+        await client.collection("books").document("a").set({"title": "Libro"})
+        snapshot = await client.collection("books").document("a").get()
+        missing = await client.collection("books").document("b").get()
+    finally:
+        await channel.close()
+
+    assert snapshot.get("title") == "Libro" and not missing.exists
+    assert firestore_documents._values[("write",)] == writes + 1
+    assert firestore_documents._values[("read",)] == reads + 1
+
+
+async def test_override_replaces_the_client_everywhere(db):
+    assert get_db() is db
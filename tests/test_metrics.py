@@ -0,0 +1,36 @@
+import pytest
+
+from app.core import settings
+from tests.helpers import READER, add_book
+
+pytestmark = pytest.mark.anyio
+
+
+def sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+async def test_requests_are_recorded_by_route_template(api, db):
+    await add_book(db, "a")
+    series = 'clankers_http_requests_total{method="GET",route="/clankers/books/{book_id}",status="200"}'
+    before = sample((await api.get("/metrics")).text, series)
+
+    for _ in range(3):
+        assert (await api.get("/clankers/books/a", headers=READER)).status_code == 200
+
+    text = (await api.get("/metrics")).text
+    assert sample(text, series) == before + 3
+    assert 'clankers_http_request_duration_seconds_bucket{method="GET",route="/clankers/books/{book_id}",le="+Inf"}' in text
+    assert "/clankers/books/a" not in text
+
+
+async def test_metrics_token_is_required_when_configured(api, db, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secreto")
+
+    assert (await api.get("/metrics")).status_code == 401
+    response = await api.get("/metrics", headers={"Authorization": "Bearer secreto"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,49 @@
+import pytest
+
+from app.jobs import build_recommendations
+from app.services.recommendations import GENRE_TOP_COLLECTION, NEIGHBORS_COLLECTION, genre_doc_id
+from tests.helpers import READER, add_book, add_user
+
+pytestmark = pytest.mark.anyio
+
+RATINGS = {
+    "u1": {"a": 9, "b": 9, "c": 2},
+    "u2": {"a": 8, "b": 9, "c": 3},
+    "reader": {"a": 10, "d": 4},
+}
+
+
+async def test_job_builds_neighbors_served_as_recommendations(api, db, monkeypatch):
+    monkeypatch.setattr(build_recommendations, "init_firebase", lambda: None)
+    await add_user(db, "reader")
+    for book_id in "abcd":
+        await add_book(db, book_id, rating=8.0, reviewCount=2)
+    for uid, rated in RATINGS.items():
+        for book_id, rating in rated.items():
+            review = db.collection("books").document(book_id).collection("reviews").document(f"{uid}-{book_id}")
+            await review.set({"userId": uid, "rating": rating})
+
+    await build_recommendations.main()
+
+    neighbors = (await db.collection(NEIGHBORS_COLLECTION).document("a").get()).to_dict()["neighbors"]
+    assert neighbors[0]["bookId"] == "b"
+    assert "c" not in [n["bookId"] for n in neighbors]
+    genre_top = (await db.collection(GENRE_TOP_COLLECTION).document(genre_doc_id("Fantasía")).get()).to_dict()
+    assert len(genre_top["books"]) == 4
+
+    response = await api.get("/clankers/users/me/recommendations", headers=READER)
+    assert response.status_code == 200, response.text
+    assert response.json()[0]["bookId"] == "b"
+
+
+async def test_genre_names_that_are_not_valid_document_ids(api, db, monkeypatch):
+    monkeypatch.setattr(build_recommendations, "init_firebase", lambda: None)
+    await add_user(db, "reader", preferences=["..", "", "__x__", "a/b"])
+    await add_book(db, "a", genres=[{"genre": ".."}], rating=8.0, reviewCount=2)
+    await add_book(db, "b", genres=[{"genre": "__x__"}], rating=6.0, reviewCount=2)
+
+    await build_recommendations.main()
+
+    response = await api.get("/clankers/users/me/recommendations", headers=READER)
+    assert response.status_code == 200, response.text
+    assert [book["bookId"] for book in response.json()] == ["a", "b"]
@@ -0,0 +1,106 @@
+import datetime
+import json
+import sys
+
+import fakeredis
+import pytest
+from fakeredis.aioredis import FakeRedis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+
+from app.jobs import import_books
+from app.services import cache_config
+from app.services.cache_config import CACHE_PREFIX, CompactJsonCoder, RedisTagIndex, invalidate_tags
+from tests.helpers import READER, add_book
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """
+    Un servidor Redis en memoria compartido por todos los clientes que se creen,
+    como varios workers contra el mismo Redis.
+    """
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache_config.settings, "CACHE_BACKEND", "redis")
+    monkeypatch.setattr(cache_config, "Redis", lambda connection_pool: FakeRedis(server=server))
+    return server
+
+
+@pytest.fixture
+async def redis_api(redis_server, api):
+    FastAPICache.reset()
+    await cache_config.init_cache()
+    try:
+        yield api
+    finally:
+        await cache_config.close_cache()
+        FastAPICache.reset()
+        InMemoryBackend._store.clear()
+
+
+async def test_routes_are_cached_in_redis_as_compact_json(redis_api, redis_server, db):
+    await add_book(db, "a", title="Señor")
+    response = await redis_api.get("/clankers/books/a", headers=READER)
+    assert response.status_code == 200
+
+    raw = await FakeRedis(server=redis_server).get(f"{CACHE_PREFIX}:libro:a")
+    assert b'"title":"Se\xc3\xb1or"' in raw
+    assert CompactJsonCoder.decode(raw)["value"]["id"] == "a"
+
+
+async def test_invalidation_reaches_entries_written_by_other_workers(redis_api, redis_server, db):
+    await add_book(db, "a", title="Antes")
+    assert (await redis_api.get("/clankers/books/a", headers=READER)).json()["title"] == "Antes"
+    await db.collection("books").document("a").update({"title": "Después"})
+
+    # Otro worker, con su propio cliente, invalida el tag del libro
+    other_worker = RedisTagIndex(FakeRedis(server=redis_server))
+    assert await other_worker.invalidate(None, ["book:a"]) == 1
+
+    assert (await redis_api.get("/clankers/books/a", headers=READER)).json()["title"] == "Después"
+    assert await invalidate_tags("book:a") == 1
+
+
+async def test_tag_sets_expire_and_are_removed_on_invalidation(redis_server):
+    redis = FakeRedis(server=redis_server)
+    index = RedisTagIndex(redis)
+    await redis.set("k1", b"1")
+    await redis.set("k2", b"2")
+    await index.add("k1", ["genre:terror", "catalog"])
+    await index.add("k2", ["catalog"])
+
+    assert 0 < await redis.ttl(f"{CACHE_PREFIX}:tag:catalog") <= cache_config.settings.CACHE_TAG_TTL
+    assert await index.invalidate(None, ["catalog", "genre:terror"]) == 2
+    assert await redis.keys("*") == []
+
+
+def test_compact_json_coder_roundtrip():
+    entry = {
+        "value": [{"id": "b1", "title": "Cien años de soledad", "rating": 8.5, "genres": [{"genre": "Realismo"}]}],
+        "freshUntil": 1700000000.5,
+    }
+    assert CompactJsonCoder.decode(CompactJsonCoder.encode(entry)) == entry
+
+    when = datetime.datetime(2024, 5, 1, 12, 30)
+    assert CompactJsonCoder.decode(CompactJsonCoder.encode({"createdAt": when})) == {"createdAt": "2024-05-01T12:30:00"}
+
+
+async def test_import_cli_invalidates_the_servers_cache(redis_api, db, tmp_path, monkeypatch):
+    await add_book(db, "a", title="Antes")
+    assert (await redis_api.get("/clankers/books/a", headers=READER)).json()["title"] == "Antes"
+
+    path = tmp_path / "catalogo.ndjson"
+    path.write_text(json.dumps({
+        "id": "a", "title": "Importado", "author": "Autora", "coverImage": "https://img/c.jpg",
+        "coverAlt": "Portada", "description": "Descripción", "genres": ["Fantasía"],
+    }), encoding="utf-8")
+    monkeypatch.setattr(import_books, "init_firebase", lambda: None)
+    monkeypatch.setattr(sys, "argv", ["import_books", str(path)])
+
+    # El CLI es otro proceso: no hereda el cache inicializado por el servidor
+    FastAPICache.reset()
+    await import_books.main()
+
+    assert (await redis_api.get("/clankers/books/a", headers=READER)).json()["title"] == "Importado"
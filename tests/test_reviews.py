@@ -0,0 +1,38 @@
+import pytest
+
+from app.utils import encode_cursor
+from tests.helpers import READER, add_book, add_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def post_review(api, book_id: str, rating: float, text: str):
+    response = await api.post(
+        f"/clankers/reviews/{book_id}/reviews",
+        json={"rating": rating, "reviewText": text},
+        headers=READER
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_review_listing_is_paginated_newest_first(api, db):
+    await add_user(db, "reader")
+    await add_book(db, "b1")
+    created = [await post_review(api, "b1", rating, f"reseña {rating}") for rating in (4, 7, 9)]
+
+    first = await api.get("/clankers/reviews/b1/reviews?limit=2", headers=READER)
+    assert first.status_code == 200
+    page = first.json()
+    assert [r["id"] for r in page["items"]] == [created[2]["id"], created[1]["id"]]
+
+    second = await api.get(f"/clankers/reviews/b1/reviews?limit=2&start_after={page['nextCursor']}", headers=READER)
+    assert second.status_code == 200
+    assert [r["id"] for r in second.json()["items"]] == [created[0]["id"]]
+    assert second.json()["nextCursor"] is None
+
+
+async def test_review_listing_rejects_cursor_with_path(api, db):
+    cursor = encode_cursor({"createdAt": "2024-01-01T00:00:00+00:00", "id": "x/reviews/r1"})
+    response = await api.get(f"/clankers/reviews/b1/reviews?start_after={cursor}", headers=READER)
+    assert response.status_code == 400
@@ -0,0 +1,183 @@
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from firebase_admin import auth
+from google.cloud.firestore_v1.async_document import AsyncDocumentReference
+
+from app.core import security
+from app.jobs import backfill_claims
+from tests.helpers import ADMIN, READER, TOKENS, add_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_admin_check_sees_revocations_made_elsewhere(monkeypatch):
+    revoked = set()
+    checks = []
+    verify_id_token = auth.verify_id_token
+
+    def verify_with_revocation(id_token, check_revoked=False):
+        if check_revoked:
+            checks.append(id_token)
+            if id_token in revoked:
+                raise auth.RevokedIdTokenError("Sesión revocada")
+        return verify_id_token(id_token, check_revoked=check_revoked)
+
+    monkeypatch.setattr(auth, "verify_id_token", verify_with_revocation)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="admin-token")
+
+    for _ in range(3):
+        assert (await security.get_current_admin(credentials))["role"] == "admin"
+    # La revocación se consulta una vez por token y ventana, no en cada petición
+    assert checks == ["admin-token"]
+
+    # Otro worker cambió el rol y revocó las sesiones: se ve al vencer la ventana
+    revoked.add("admin-token")
+    security._revocation_cache.clear()
+    with pytest.raises(HTTPException) as error:
+        await security.get_current_admin(credentials)
+    assert error.value.status_code == 401
+
+
+async def test_non_admins_are_rejected_without_revocation_check(monkeypatch):
+    checks = []
+    verify_id_token = auth.verify_id_token
+
+    def verify(id_token, check_revoked=False):
+        if check_revoked:
+            checks.append(id_token)
+        return verify_id_token(id_token)
+
+    monkeypatch.setattr(auth, "verify_id_token", verify)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="reader-token")
+
+    with pytest.raises(HTTPException) as error:
+        await security.get_current_admin(credentials)
+    assert error.value.status_code == 403
+    assert checks == []
+
+
+@pytest.mark.parametrize("expires_in, ttl", [(100, 100), (3600, 300)])
+async def test_token_cache_never_outlives_the_token(monkeypatch, expires_in, ttl):
+    monkeypatch.setattr(auth, "verify_id_token", lambda id_token: {**TOKENS[id_token], "exp": time.time() + expires_in})
+
+    await security.verify_token("reader-token")
+
+    expires_at, _ = security._token_cache._data[security._token_key("reader-token")]
+    assert expires_at - time.monotonic() == pytest.approx(ttl, abs=1)
+
+
+async def test_profile_update_is_visible_on_the_next_request(api, db):
+    await add_user(db, "reader", username="lector1")
+    assert (await api.get("/clankers/users/me", headers=READER)).json()["username"] == "lector1"
+
+    response = await api.patch("/clankers/users/me", json={"profileImgURL": "https://img/yo.jpg"}, headers=READER)
+    assert response.status_code == 200, response.text
+
+    assert security._user_cache.get("reader") is None
+    assert (await api.get("/clankers/users/me", headers=READER)).json()["profileImgURL"] == "https://img/yo.jpg"
+
+
+async def test_deleted_account_loses_its_cached_profile_and_token(api, db, monkeypatch):
+    await add_user(db, "reader", username="lector1")
+    monkeypatch.setattr(auth, "delete_user", lambda uid: monkeypatch.delitem(TOKENS, "reader-token"))
+    assert (await api.get("/clankers/users/me", headers=READER)).status_code == 200
+
+    assert (await api.delete("/clankers/users/me", headers=READER)).status_code == 200
+
+    assert security._user_cache.get("reader") is None
+    assert security._token_cache.get(security._token_key("reader-token")) is None
+    # Las rutas que solo validan el token ya no lo aceptan
+    assert (await api.get("/clankers/books/", headers=READER)).status_code == 401
+
+
+class FakeClaims:
+    """
+    Custom claims de Firebase Auth en memoria, con fallos a demanda.
+    """
+
+    def __init__(self, monkeypatch, **claims):
+        self.claims = claims
+        self.fail_set = False
+        self.revoked = []
+        monkeypatch.setattr(auth, "get_user", self.get_user)
+        monkeypatch.setattr(auth, "set_custom_user_claims", self.set_custom_user_claims)
+        monkeypatch.setattr(auth, "revoke_refresh_tokens", self.revoked.append)
+
+    def get_user(self, uid):
+        return SimpleNamespace(uid=uid, custom_claims=self.claims.get(uid))
+
+    def set_custom_user_claims(self, uid, claims):
+        if self.fail_set:
+            raise RuntimeError("Firebase Auth no disponible")
+        self.claims[uid] = claims
+
+
+async def test_role_change_updates_claims_profile_and_sessions(api, db, monkeypatch):
+    await add_user(db, "u1", username="usuario1")
+    fake = FakeClaims(monkeypatch, u1={"role": "lector"})
+    security._user_cache.set("u1", {"id": "u1", "role": "lector"})
+
+    response = await api.put("/clankers/users/u1/role", json={"role": "admin"}, headers=ADMIN)
+
+    assert response.status_code == 200
+    assert fake.claims["u1"] == {"role": "admin"}
+    assert (await db.collection("users").document("u1").get()).get("role") == "admin"
+    assert fake.revoked == ["u1"]
+    assert security._user_cache.get("u1") is None
+
+
+async def test_role_change_leaves_profile_untouched_when_claims_fail(api, db, monkeypatch):
+    await add_user(db, "u1", username="usuario1")
+    fake = FakeClaims(monkeypatch, u1={"role": "lector"})
+    fake.fail_set = True
+    security._user_cache.set("u1", {"id": "u1", "role": "lector"})
+
+    response = await api.put("/clankers/users/u1/role", json={"role": "admin"}, headers=ADMIN)
+
+    assert response.status_code == 500
+    assert (await db.collection("users").document("u1").get()).get("role") == "lector"
+    assert fake.revoked == []
+    assert security._user_cache.get("u1") is None
+
+
+async def test_role_change_restores_claims_when_profile_write_fails(api, db, monkeypatch):
+    await add_user(db, "u1", username="usuario1")
+    fake = FakeClaims(monkeypatch, u1={"role": "lector"})
+
+    async def failing_update(self, *args, **kwargs):
+        raise RuntimeError("Firestore no disponible")
+
+    monkeypatch.setattr(AsyncDocumentReference, "update", failing_update)
+
+    response = await api.put("/clankers/users/u1/role", json={"role": "admin"}, headers=ADMIN)
+
+    assert response.status_code == 500
+    assert fake.claims["u1"] == {"role": "lector"}
+    assert fake.revoked == []
+
+
+async def test_backfill_claims_copies_roles_from_profiles(db, monkeypatch):
+    await add_user(db, "u1", role="admin")
+    await add_user(db, "u2")
+    await add_user(db, "u3", role="lector")
+
+    claims = {"u1": None, "u2": {"plan": "pro"}, "u3": {"role": "lector"}}
+    written = {}
+
+    def get_users(identifiers):
+        users = [SimpleNamespace(uid=i.uid, custom_claims=claims[i.uid]) for i in identifiers]
+        return SimpleNamespace(users=users, not_found=[])
+
+    monkeypatch.setattr(auth, "get_users", get_users)
+    monkeypatch.setattr(auth, "set_custom_user_claims", lambda uid, value: written.update({uid: value}))
+    monkeypatch.setattr(backfill_claims, "init_firebase", lambda: None)
+    monkeypatch.setattr(sys, "argv", ["backfill_claims"])
+
+    await backfill_claims.main()
+
+    assert written == {"u1": {"role": "admin"}, "u2": {"plan": "pro", "role": "lector"}}
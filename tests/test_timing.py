@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app.core import settings
+from tests.helpers import ADMIN, READER, add_book
+
+pytestmark = pytest.mark.anyio
+
+OPT_IN = {"X-Server-Timing": "1"}
+
+
+def phases(header: str) -> dict:
+    entries = {}
+    for entry in header.split(", "):
+        name, _, value = entry.partition(";")
+        entries[name] = value
+    return entries
+
+
+async def test_admin_can_ask_for_server_timing(api, db):
+    await add_book(db, "a")
+
+    response = await api.get("/clankers/books/a", headers={**ADMIN, **OPT_IN})
+
+    assert response.status_code == 200
+    entries = phases(response.headers["server-timing"])
+    assert {"auth", "datastore", "db-reads", "db-writes", "total"} <= set(entries)
+    assert entries["db-reads"] == 'desc="1"'
+
+
+async def test_non_admins_never_get_server_timing_on_request(api, db):
+    await add_book(db, "a")
+
+    response = await api.get("/clankers/books/a", headers={**READER, **OPT_IN})
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+
+async def test_server_timing_enabled_adds_the_header_to_every_response(api, db, monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+    await add_book(db, "a")
+
+    response = await api.get("/clankers/books/a", headers=READER)
+
+    assert "total" in phases(response.headers["server-timing"])
+
+
+async def test_only_slow_requests_are_logged(api, db, monkeypatch, capsys):
+    await add_book(db, "a")
+    assert (await api.get("/clankers/books/a", headers=READER)).status_code == 200
+    assert "request {" not in capsys.readouterr().out
+
+    monkeypatch.setattr(settings, "SLOW_REQUEST_MS", 0)
+    assert (await api.get("/clankers/books/missing", headers=READER)).status_code == 404
+
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith("INFO:     request ")]
+    assert len(lines) == 1
+    record = json.loads(lines[0][len("INFO:     request "):])
+    assert (record["method"], record["route"], record["status"]) == ("GET", "/clankers/books/{book_id}", 404)
+    assert record["reads"] == 1 and "auth" in record["phasesMs"]
@@ -0,0 +1,63 @@
+import random
+
+from app.services import typeahead
+from app.services.typeahead import TOP_CAPACITY, TypeaheadIndex, normalize_key
+
+
+def brute_force(books: dict, key: str, limit: int):
+    """
+    Referencia: recorre todos los títulos y autores del prefijo.
+    """
+    authors = {}
+    candidates = []
+    for book_id, book in books.items():
+        title_key, author_key = normalize_key(book["title"]), normalize_key(book["author"])
+        if title_key.startswith(key):
+            candidates.append((-book["reviewCount"], title_key, "title", book_id))
+        authors[author_key] = authors.get(author_key, 0) + book["reviewCount"]
+    candidates += [(-weight, a, "author", a) for a, weight in authors.items() if a.startswith(key)]
+    return [(kind, ref, -weight) for weight, _, kind, ref in sorted(candidates)[:limit]]
+
+
+def as_tuples(suggestions):
+    return [(s["type"], s["bookId"] if s["type"] == "title" else normalize_key(s["text"]), s["weight"]) for s in suggestions]
+
+
+def test_suggestions_prefer_weight_and_fold_accents():
+    index = TypeaheadIndex()
+    index.add("1", {"title": "Cien años de soledad", "author": "Gabriel García Márquez", "reviewCount": 5})
+    index.add("2", {"title": "Ciencia ficción", "author": "Otra", "reviewCount": 9})
+
+    assert [s["bookId"] for s in index.suggest("CIEN", 10)] == ["2", "1"]
+    assert [s["bookId"] for s in index.suggest("cien a", 10)] == ["1"]
+    assert index.suggest("gabriel garcia", 10) == [
+        {"text": "Gabriel García Márquez", "type": "author", "bookId": None, "weight": 5}
+    ]
+
+
+def test_incremental_updates_match_a_full_scan(monkeypatch):
+    # Que también los prefijos largos pasen a tener su propio top
+    monkeypatch.setattr(typeahead, "LONG_PREFIX_MIN_RANGE", 2)
+    rng = random.Random(7)
+    words = ["la", "el", "los", "lago", "luz", "lobo", "sol", "sal", "mar", "marea"]
+    authors = ["ana", "andres", "luis", "lucia", "mar"]
+    index, books = TypeaheadIndex(), {}
+
+    for step in range(3000):
+        book_id = str(rng.randrange(300))
+        if book_id in books:
+            index.remove(book_id)
+            del books[book_id]
+        if rng.random() < 0.8:
+            book = {
+                "title": " ".join(rng.choice(words) for _ in range(rng.randint(1, 3))),
+                "author": rng.choice(authors),
+                "reviewCount": rng.randrange(50),
+            }
+            index.add(book_id, book)
+            books[book_id] = book
+
+        if step % 100 == 0:
+            for prefix in ("l", "la", "lo", "m", "mar", "s", "an", "lago", "la l", "la la", "marea", "el lobo"):
+                for limit in (1, 5, 20, TOP_CAPACITY + 5):
+                    assert as_tuples(index.suggest(prefix, limit)) == brute_force(books, prefix, limit), (prefix, limit)